@@ -1,7 +1,11 @@
 from typing import List, Literal, Tuple
+from anyio import from_thread
 from fastapi import APIRouter, HTTPException, Request, Depends
 from elasticsearch import Elasticsearch, NotFoundError
 
+from app.api.waypoints import invalidate_waypoint_index
+from app.api.geo_ws import broadcast_geo_changes, change
+
 router = APIRouter()
 
 # Use app-state ES (same as geo/images)
@@ -56,4 +60,13 @@ def hard_delete(
         raise HTTPException(status_code=400, detail="Unsupported entity")
     _cascade_delete(es, entity, entity_id)
     _delete_primary(es, entity, entity_id)
+    if entity == "waypoint":
+        invalidate_waypoint_index()
+    if entity in ("waypoint", "track"):
+        # sync route: runs in the threadpool, so hop back to the loop to send
+        kind = "wpt" if entity == "waypoint" else "trk"
+        try:
+            from_thread.run(broadcast_geo_changes, [change("deleted", kind, entity_id)])
+        except Exception:
+            pass
     return {"ok": True, "entity": entity, "id": entity_id, "mode": "hard"}
@@ -2,18 +2,43 @@ from __future__ import annotations
 from fastapi import APIRouter, UploadFile, File, HTTPException, Request, Query, Body, Form
 from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime, timezone
-from elasticsearch import Elasticsearch
+from elasticsearch import Elasticsearch, NotFoundError, helpers
+import asyncio
+import math
+import os
 import uuid
-import xml.etree.ElementTree as ET
 
 # WebSocket notifier from ws module
-from app.api.geo_ws import broadcast_geo_refresh, ws_connection_count
+from app.api.geo_ws import broadcast_geo_changes, broadcast_geo_refresh, change, ws_connection_count
+from app.api.waypoints import invalidate_waypoint_index
+from lib.services.geo import WaypointIndex, M_PER_DEG_LAT
+from lib.services.geo_vec import simplify_line
+from lib.services.geo_parse import iter_features, line_coordinates, to_geojson
 
 router = APIRouter(prefix="/geo", tags=["geo"])
 
 WAYPOINTS_INDEX = "waypoints-v1"
 TRACKS_INDEX    = "tracks-v1"
 
+# Precomputed Douglas–Peucker levels stored with every track, in metres of
+# allowed deviation.  /geo/features serves the coarsest level that stays
+# under ~1 screen pixel at the requested zoom.
+LOD_TOLERANCES_M = (2.0, 10.0, 40.0, 160.0, 640.0)
+_LOD_MAPPING = {"type": "object", "enabled": False}   # stored, never indexed
+# `lod` can't be queried (exists never matches inside a disabled object), so
+# tracks also carry an indexed lod_version; bump it when LOD_TOLERANCES_M change.
+LOD_VERSION = 1
+
+# Below this zoom dense point layers come back as geotile_grid clusters
+# (count + centroid) instead of individual features.  Grid cells are
+# 2**CLUSTER_GRID_OFFSET finer than the map zoom (~128px on a 512px tile).
+CLUSTER_BELOW_ZOOM = float(os.getenv("GEO_CLUSTER_BELOW_ZOOM", "12"))
+CLUSTER_GRID_OFFSET = 2
+
+# Geotagged photos: (index, geo_point field)
+IMAGE_LOCATION_SOURCES = (("images-v1", "geo"), ("tactacam-images", "location"))
+_lod_mapping_checked = False
+
 # ---------------- ES wiring ----------------
 def es_dep(request: Request) -> Elasticsearch:
     es = getattr(request.app.state, "es", None)
@@ -53,6 +78,8 @@ def ensure_indices(es: Elasticsearch) -> None:
                 "properties": {
                     "name":        {"type": "keyword"},
                     "geometry":    {"type": "geo_shape"},       # LineString
+                    "lod":         _LOD_MAPPING,                # {"t10": [[lon,lat],...], ...}
+                    "lod_version": {"type": "integer"},
                     "source":      {"type": "keyword"},
                     "source_name": {"type": "keyword"},
                     "created_at":  {"type": "date"},
@@ -60,104 +87,303 @@ def ensure_indices(es: Elasticsearch) -> None:
                 }
             }
         )
-
-# ---------------- GPX/KML parsers ----------------
-def _parse_gpx(file_bytes: bytes) -> List[Dict[str, Any]]:
-    feats: List[Dict[str, Any]] = []
-    try:
-        root = ET.fromstring(file_bytes)
-    except ET.ParseError as e:
-        raise HTTPException(status_code=400, detail=f"Invalid GPX: {e}")
-    ns = {'gpx': root.tag.split('}')[0].strip('{')} if '}' in root.tag else {}
-    # waypoints
-    for wpt in root.findall('.//gpx:wpt', ns) if ns else root.findall('.//wpt'):
-        lat = float(wpt.get('lat')); lon = float(wpt.get('lon'))
-        name_el = wpt.find('gpx:name', ns) if ns else wpt.find('name')
-        feats.append({"type":"Feature","geometry":{"type":"Point","coordinates":[lon,lat]},
-                      "properties":{"name": name_el.text if name_el is not None else None, "kind":"wpt"}})
-    # tracks
-    trk_path = './/gpx:trk' if ns else './/trk'
-    trkseg_path = './/gpx:trkseg' if ns else './/trkseg'
-    trkpt_path = './/gpx:trkpt' if ns else './/trkpt'
-    for trk in root.findall(trk_path, ns):
-        coords=[]
-        for trkseg in trk.findall(trkseg_path, ns):
-            for trkpt in trkseg.findall(trkpt_path, ns):
-                coords.append([float(trkpt.get('lon')), float(trkpt.get('lat'))])
-        if coords:
-            name_el = trk.find('gpx:name', ns) if ns else trk.find('name')
-            feats.append({"type":"Feature","geometry":{"type":"LineString","coordinates":coords},
-                          "properties":{"name": name_el.text if name_el is not None else None, "kind":"trk"}})
-    return feats
-
-def _parse_kml(file_bytes: bytes) -> List[Dict[str, Any]]:
-    feats: List[Dict[str, Any]] = []
-    try:
-        root = ET.fromstring(file_bytes)
-    except ET.ParseError as e:
-        raise HTTPException(status_code=400, detail=f"Invalid KML: {e}")
-    ns={'kml': 'http://www.opengis.net/kml/2.2'}
-    for pm in root.findall('.//kml:Placemark', ns):
-        name_el = pm.find('kml:name', ns)
-        pt = pm.find('.//kml:Point/kml:coordinates', ns)
-        line = pm.find('.//kml:LineString/kml:coordinates', ns)
-        if pt is not None and pt.text:
-            lon,lat,*_ = [float(x) for x in pt.text.strip().split(',')]
-            feats.append({"type":"Feature","geometry":{"type":"Point","coordinates":[lon,lat]},
-                          "properties":{"name": name_el.text if name_el is not None else None, "kind":"wpt"}})
-        elif line is not None and line.text:
-            coords=[]
-            for pair in line.text.strip().split():
-                lon,lat,*_ = [float(x) for x in pair.split(',')]
-                coords.append([lon,lat])
-            feats.append({"type":"Feature","geometry":{"type":"LineString","coordinates":coords},
-                          "properties":{"name": name_el.text if name_el is not None else None, "kind":"trk"}})
-    return feats
-
-def _split(features: List[Dict[str,Any]]) -> Tuple[List[Dict[str,Any]], List[Dict[str,Any]]]:
+    _ensure_lod_mapping(es)
+
+def _ensure_lod_mapping(es: Elasticsearch) -> None:
+    """Older tracks-v1 indices predate `lod`; add it once so it isn't dynamically indexed."""
+    global _lod_mapping_checked
+    if _lod_mapping_checked:
+        return
+    es.indices.put_mapping(index=TRACKS_INDEX, properties={"lod": _LOD_MAPPING, "lod_version": {"type": "integer"}})
+    _lod_mapping_checked = True
+
+# ---------------- Track level-of-detail ----------------
+def _lod_key(tolerance_m: float) -> str:
+    return f"t{int(tolerance_m)}"
+
+def _build_lods(coords) -> Dict[str, List[List[float]]]:
+    """coords: flat [lon, lat, ...] buffer or [[lon, lat], ...]"""
+    return {_lod_key(t): simplify_line(coords, t).tolist() for t in LOD_TOLERANCES_M}
+
+def pick_lod(zoom: Optional[float], tolerance_m: Optional[float], lat: float) -> Optional[str]:
+    """Coarsest stored level within the tolerance; None means full geometry."""
+    if tolerance_m is None:
+        if zoom is None:
+            return None
+        # Web-mercator metres per pixel (512px tiles, as Mapbox GL uses)
+        tolerance_m = 78271.517 * math.cos(math.radians(lat)) / (2 ** zoom)
+    usable = [t for t in LOD_TOLERANCES_M if t <= tolerance_m]
+    return _lod_key(max(usable)) if usable else None
+
+# ---------------- GPX/KML/KMZ/GeoJSON readers ----------------
+def _collect(stream, filename: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
     pts, lines = [], []
-    for f in features:
-        g = f.get("geometry", {})
-        if g.get("type") == "Point":
-            pts.append(f)
-        elif g.get("type") == "LineString":
-            lines.append(f)
+    for f in iter_features(stream, filename):
+        (pts if f["kind"] == "wpt" else lines).append(f)
     return pts, lines
 
+async def _read_upload(file: UploadFile) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Stream-parse the spooled upload in a worker thread (never on the event loop)."""
+    file.file.seek(0)
+    try:
+        return await asyncio.to_thread(_collect, file.file, file.filename or "")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 # ---------------- Dedupe / nearest search ----------------
-def _find_nearest_point_id(es: Elasticsearch, lat: float, lon: float, max_meters: float) -> Optional[str]:
+def _load_candidates(es: Elasticsearch, pts: List[Dict[str, Any]], pad_meters: float) -> List[Dict[str, Any]]:
+    """
+    Existing waypoints inside the file's bounding box (padded by the dedupe
+    radius), fetched in one scan so dedupe can run in memory.
+    """
+    if not pts:
+        return []
+    lons = [p["lon"] for p in pts]
+    lats = [p["lat"] for p in pts]
+    pad_lat = pad_meters / M_PER_DEG_LAT
+    edge = min(max(abs(min(lats)), abs(max(lats))) + pad_lat, 89.9)
+    pad_lon = pad_lat / math.cos(math.radians(edge))
     q = {
-        "size": 1,
-        "query": {"match_all": {}},
-        "sort": [{
-            "_geo_distance": {
+        "query": {"bool": {"filter": [{"geo_bounding_box": {"location": {
+            "top_left": {"lat": min(max(lats) + pad_lat, 90.0), "lon": max(min(lons) - pad_lon, -180.0)},
+            "bottom_right": {"lat": max(min(lats) - pad_lat, -90.0), "lon": min(max(lons) + pad_lon, 180.0)},
+        }}}]}},
+        "_source": ["location"],
+    }
+    out: List[Dict[str, Any]] = []
+    for hit in helpers.scan(es, index=WAYPOINTS_INDEX, query=q, size=1000):
+        loc = (hit.get("_source") or {}).get("location")
+        if isinstance(loc, dict):
+            out.append({"id": hit["_id"], "lat": float(loc["lat"]), "lon": float(loc["lon"])})
+    return out
+
+def _write_features(
+    es: Elasticsearch,
+    pts: List[Dict[str, Any]],
+    lines: List[Dict[str, Any]],
+    source_name: Optional[str],
+    dedupe_meters: float,
+    trailcam_obj: Optional[Dict[str, Any]],
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """Dedupe + bulk write; returns (map deltas, summary)."""
+    now = datetime.now(timezone.utc).isoformat()
+
+    # Dedupe in memory: existing waypoints near the file, plus every new
+    # waypoint from this file as it is accepted (so repeats within the file
+    # collapse too).
+    index = WaypointIndex(_load_candidates(es, pts, dedupe_meters), cell_m=max(dedupe_meters, 1.0))
+    new_docs: Dict[str, Dict[str, Any]] = {}
+    updates: Dict[str, Dict[str, Any]] = {}
+    merged = 0
+
+    for p in pts:
+        lat, lon, pname = p["lat"], p["lon"], p["name"]
+        match, _ = index.nearest(lat, lon, max_m=dedupe_meters)
+        if match is not None and match["id"] in new_docs:
+            if pname:
+                new_docs[match["id"]]["name"] = pname
+            merged += 1
+        elif match is not None:
+            doc = updates.setdefault(match["id"], {"updated_at": now})
+            if pname:
+                doc["name"] = pname
+            if trailcam_obj:
+                doc["trailcam"] = trailcam_obj
+        else:
+            doc_id = uuid.uuid4().hex
+            new_docs[doc_id] = {
+                "name": pname,
+                "tags": [],
+                "type": None,
                 "location": {"lat": lat, "lon": lon},
-                "unit": "m",
-                "order": "asc"
+                "trailcam": trailcam_obj,
+                "source": "gpx_kml",
+                "source_name": source_name,
+                "created_at": now,
+                "updated_at": now,
             }
-        }],
-        "_source": False
+            index.add({"id": doc_id, "lat": lat, "lon": lon})
+
+    track_ids = [uuid.uuid4().hex for _ in lines]
+
+    def actions():
+        for doc_id, body in new_docs.items():
+            yield {"_op_type": "index", "_index": WAYPOINTS_INDEX, "_id": doc_id, "_source": body}
+        for doc_id, doc in updates.items():
+            yield {"_op_type": "update", "_index": WAYPOINTS_INDEX, "_id": doc_id, "doc": doc}
+        # Track vertices stay packed until their bulk chunk is serialized
+        for doc_id, l in zip(track_ids, lines):
+            yield {
+                "_op_type": "index",
+                "_index": TRACKS_INDEX,
+                "_id": doc_id,
+                "_source": {
+                    "name": l["name"],
+                    "geometry": {"type": "LineString", "coordinates": line_coordinates(l["coords"])},
+                    "lod": _build_lods(l["coords"]),
+                    "lod_version": LOD_VERSION,
+                    "source": "gpx_kml",
+                    "source_name": source_name,
+                    "created_at": now,
+                    "updated_at": now,
+                },
+            }
+
+    errors: List[Any] = []
+    if new_docs or updates or lines:
+        _, errors = helpers.bulk(es, actions(), chunk_size=500, raise_on_error=False)
+
+    # Map deltas: updated waypoints carry only the changed properties; tracks
+    # go out at a coarse LOD (clients refetch detail on their next pan).
+    changes = [change("created", "wpt", i, _waypoint_feature({"_id": i, "_source": b})) for i, b in new_docs.items()]
+    for doc_id, doc in updates.items():
+        changes.append(change("updated", "wpt", doc_id, {
+            "type": "Feature", "id": doc_id,
+            "properties": {k: v for k, v in doc.items() if k in ("name", "trailcam")},
+        }))
+    for doc_id, l in zip(track_ids, lines):
+        coarse = simplify_line(l["coords"], LOD_TOLERANCES_M[1]).tolist()
+        changes.append(change("created", "trk", doc_id,
+                              _track_feature(doc_id, l["name"], {"type": "LineString", "coordinates": coarse})))
+
+    return changes, {
+        "ok": not errors,
+        "waypoints_created": len(new_docs),
+        "waypoints_updated": len(updates),
+        "waypoints_merged": merged,
+        "tracks_indexed": len(lines),
+        "errors": len(errors),
     }
-    res = es.search(index=WAYPOINTS_INDEX, body=q)
-    hits = res.get("hits", {}).get("hits", [])
-    if not hits:
-        return None
-    dist = hits[0].get("sort", [None])[0]
-    if dist is not None and dist <= max_meters:
-        return hits[0]["_id"]
-    return None
+
+# ---------------- Clustering ----------------
+def _parse_bbox(bbox: str) -> Tuple[float, float, float, float]:
+    try:
+        min_lon, min_lat, max_lon, max_lat = [float(x) for x in bbox.split(",")]
+    except Exception:
+        raise HTTPException(status_code=400, detail="bbox must be minLon,minLat,maxLon,maxLat")
+    return min_lon, min_lat, max_lon, max_lat
+
+def _bbox_filter(field: str, min_lon: float, min_lat: float, max_lon: float, max_lat: float) -> Dict[str, Any]:
+    return {"geo_bounding_box": {field: {
+        "top_left": {"lat": max_lat, "lon": min_lon},
+        "bottom_right": {"lat": min_lat, "lon": max_lon},
+    }}}
+
+def _should_cluster(cluster: bool, zoom: Optional[float], cluster_below_zoom: float) -> bool:
+    return cluster and zoom is not None and zoom < cluster_below_zoom
+
+def _grid_clusters(
+    es: Elasticsearch,
+    index: str,
+    field: str,
+    bounds: Tuple[float, float, float, float],
+    zoom: float,
+    max_cells: int,
+    source: List[str],
+) -> List[Dict[str, Any]]:
+    """
+    geotile_grid buckets for `field` inside bounds: [{"cell", "count", "lat",
+    "lon", "hit"}].  `hit` is the bucket's only document when count == 1, so
+    singletons can be drawn as ordinary features.
+    """
+    min_lon, min_lat, max_lon, max_lat = bounds
+    body = {
+        "size": 0,
+        "query": {"bool": {"filter": [_bbox_filter(field, *bounds)]}},
+        "aggs": {"cells": {
+            "geotile_grid": {
+                "field": field,
+                "precision": min(int(zoom) + CLUSTER_GRID_OFFSET, 29),
+                "size": max_cells,
+                "bounds": {"top_left": {"lat": max_lat, "lon": min_lon},
+                           "bottom_right": {"lat": min_lat, "lon": max_lon}},
+            },
+            "aggs": {
+                "centroid": {"geo_centroid": {"field": field}},
+                "sample": {"top_hits": {"size": 1, "_source": source}},
+            },
+        }},
+    }
+    res = es.search(index=index, body=body)
+    out: List[Dict[str, Any]] = []
+    for b in ((res.get("aggregations") or {}).get("cells") or {}).get("buckets", []):
+        loc = (b.get("centroid") or {}).get("location")
+        if not loc:
+            continue
+        hits = ((b.get("sample") or {}).get("hits") or {}).get("hits") or []
+        out.append({
+            "cell": b["key"],
+            "count": b["doc_count"],
+            "lat": loc["lat"],
+            "lon": loc["lon"],
+            "hit": hits[0] if b["doc_count"] == 1 and hits else None,
+        })
+    return out
+
+def _cluster_feature(c: Dict[str, Any], layer: str) -> Dict[str, Any]:
+    return {
+        "type": "Feature",
+        "id": f"cluster:{layer}:{c['cell']}",
+        "geometry": {"type": "Point", "coordinates": [c["lon"], c["lat"]]},
+        "properties": {"kind": "cluster", "layer": layer, "count": c["count"], "cell": c["cell"]},
+    }
+
+def _waypoint_feature(hit: Dict[str, Any]) -> Dict[str, Any]:
+    src = hit["_source"]
+    return {
+        "type": "Feature",
+        "id": hit["_id"],
+        "geometry": {"type": "Point", "coordinates": [src["location"]["lon"], src["location"]["lat"]]},
+        "properties": {
+            "name": src.get("name"),
+            "kind": "wpt",
+            "trailcam": src.get("trailcam"),
+            "type": src.get("type"),
+        }
+    }
+
+def _image_feature(hit: Dict[str, Any], field: str) -> Dict[str, Any]:
+    src = hit["_source"]
+    loc = src[field]
+    return {
+        "type": "Feature",
+        "id": hit["_id"],
+        "geometry": {"type": "Point", "coordinates": [loc["lon"], loc["lat"]]},
+        "properties": {
+            "kind": "img",
+            "index": hit["_index"],
+            "captured_at": src.get("captured_at") or src.get("@timestamp"),
+            "camera_name": src.get("camera_name"),
+        }
+    }
+
+def _track_feature(doc_id: str, name: Optional[str], geometry: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "type": "Feature",
+        "id": doc_id,
+        "geometry": geometry,
+        "properties": {"name": name, "kind": "trk"},
+    }
+
+async def _geo_changed(changes: Optional[List[Dict[str, Any]]] = None) -> None:
+    """
+    Geo write event: drop the cached waypoint index and notify map clients,
+    with typed deltas when we have them or a full refresh otherwise.
+    """
+    invalidate_waypoint_index()
+    try:
+        if changes is None:
+            await broadcast_geo_refresh()
+        else:
+            await broadcast_geo_changes(changes)
+    except Exception:
+        pass
 
 # ---------------- Public routes ----------------
 @router.post("/upload")
 async def upload_geo(file: UploadFile = File(...)):
-    name = (file.filename or "").lower()
-    raw = await file.read()
-    if name.endswith(".gpx"):
-        feats = _parse_gpx(raw)
-    elif name.endswith(".kml"):
-        feats = _parse_kml(raw)
-    else:
-        raise HTTPException(status_code=400, detail="Unsupported file type. Use .gpx or .kml.")
+    pts, lines = await _read_upload(file)
+    feats = [to_geojson(f) for f in pts + lines]
     return {"ok": True, "count": len(feats), "features": feats}
 
 @router.post("/ingest")
@@ -174,18 +400,7 @@ async def ingest_geo(
     es = es_dep(request)
     ensure_indices(es)
 
-    name = (file.filename or "").lower()
-    raw = await file.read()
-    if name.endswith(".gpx"):
-        feats = _parse_gpx(raw)
-    elif name.endswith(".kml"):
-        feats = _parse_kml(raw)
-    else:
-        raise HTTPException(status_code=400, detail="Unsupported file type. Use .gpx or .kml.")
-
-    pts, lines = _split(feats)
-    now = datetime.now(timezone.utc).isoformat()
-
+    pts, lines = await _read_upload(file)
     trailcam_obj = None
     if trailcam_id or trailcam_name or trailcam_make or trailcam_model:
         trailcam_obj = {
@@ -195,54 +410,13 @@ async def ingest_geo(
             "model": trailcam_model,
         }
 
-    created, updated = 0, 0
+    changes, result = await asyncio.to_thread(
+        _write_features, es, pts, lines, source_name or file.filename, dedupe_meters, trailcam_obj,
+    )
 
-    for p in pts:
-        lon, lat = p["geometry"]["coordinates"]
-        existing_id = _find_nearest_point_id(es, lat=lat, lon=lon, max_meters=dedupe_meters)
-        if existing_id:
-            doc: Dict[str, Any] = {"updated_at": now}
-            pname = (p.get("properties") or {}).get("name")
-            if pname:
-                doc["name"] = pname
-            if trailcam_obj:
-                doc["trailcam"] = trailcam_obj
-            es.update(index=WAYPOINTS_INDEX, id=existing_id, body={"doc": doc})
-            updated += 1
-        else:
-            doc_id = uuid.uuid4().hex
-            body = {
-                "name": (p.get("properties") or {}).get("name"),
-                "tags": [],
-                "type": None,
-                "location": {"lat": lat, "lon": lon},
-                "trailcam": trailcam_obj,
-                "source": "gpx_kml",
-                "source_name": source_name or file.filename,
-                "created_at": now,
-                "updated_at": now,
-            }
-            es.index(index=WAYPOINTS_INDEX, id=doc_id, document=body)
-            created += 1
-
-    for l in lines:
-        doc_id = uuid.uuid4().hex
-        body = {
-            "name": (l.get("properties") or {}).get("name"),
-            "geometry": l["geometry"],
-            "source": "gpx_kml",
-            "source_name": source_name or file.filename,
-            "created_at": now,
-            "updated_at": now,
-        }
-        es.index(index=TRACKS_INDEX, id=doc_id, document=body)
-
-    try:
-        await broadcast_geo_refresh()
-    except Exception:
-        pass
+    await _geo_changed(changes)
 
-    return {"ok": True, "waypoints_created": created, "waypoints_updated": updated, "tracks_indexed": len(lines)}
+    return result
 
 @router.post("/waypoints")
 async def create_waypoint(
@@ -274,10 +448,7 @@ async def create_waypoint(
     }
     es.index(index=WAYPOINTS_INDEX, id=doc_id, document=body)
 
-    try:
-        await broadcast_geo_refresh()
-    except Exception:
-        pass
+    await _geo_changed([change("created", "wpt", doc_id, _waypoint_feature({"_id": doc_id, "_source": body}))])
 
     return {"ok": True, "id": doc_id}
 
@@ -302,6 +473,8 @@ async def create_track(
     body = {
         "name": name,
         "geometry": {"type": "LineString", "coordinates": coordinates},
+        "lod": _build_lods(coordinates),
+        "lod_version": LOD_VERSION,
         "source": "manual",
         "source_name": source_name,
         "created_at": now,
@@ -309,10 +482,7 @@ async def create_track(
     }
     es.index(index=TRACKS_INDEX, id=doc_id, document=body)
 
-    try:
-        await broadcast_geo_refresh()
-    except Exception:
-        pass
+    await _geo_changed([change("created", "trk", doc_id, _track_feature(doc_id, name, body["geometry"]))])
 
     return {"ok": True, "id": doc_id}
 
@@ -322,14 +492,18 @@ def get_features_bbox(
     bbox: str = Query(..., description="minLon,minLat,maxLon,maxLat"),
     limit_points: int = Query(2000, ge=1, le=10000),
     limit_lines: int = Query(1000, ge=1, le=10000),
+    zoom: Optional[float] = Query(None, ge=0, le=24, description="Map zoom; picks a simplified track LOD"),
+    tolerance_m: Optional[float] = Query(None, gt=0, description="Max track deviation in metres (overrides zoom)"),
+    cluster: bool = Query(True, description="Cluster waypoints below cluster_below_zoom"),
+    cluster_below_zoom: float = Query(CLUSTER_BELOW_ZOOM, ge=0, le=24),
 ):
     es = es_dep(request)
     ensure_indices(es)
 
-    try:
-        min_lon, min_lat, max_lon, max_lat = [float(x) for x in bbox.split(",")]
-    except Exception:
-        raise HTTPException(status_code=400, detail="bbox must be minLon,minLat,maxLon,maxLat")
+    min_lon, min_lat, max_lon, max_lat = _parse_bbox(bbox)
+    clustered = _should_cluster(cluster, zoom, cluster_below_zoom)
+
+    lod = pick_lod(zoom, tolerance_m, (min_lat + max_lat) / 2)
 
     q_points = {
         "size": limit_points,
@@ -365,38 +539,87 @@ def get_features_bbox(
                 ]
             }
         },
-        "_source": ["name", "geometry"]
+        "_source": ["name", f"lod.{lod}"] if lod else ["name", "geometry"]
     }
 
-    pts = es.search(index=WAYPOINTS_INDEX, body=q_points)
     lns = es.search(index=TRACKS_INDEX,    body=q_lines)
 
     features: List[Dict[str, Any]] = []
 
-    for hit in pts.get("hits", {}).get("hits", []):
-        src = hit["_source"]
-        features.append({
-            "type": "Feature",
-            "id": hit["_id"],
-            "geometry": {"type": "Point", "coordinates": [src["location"]["lon"], src["location"]["lat"]]},
-            "properties": {
-                "name": src.get("name"),
-                "kind": "wpt",
-                "trailcam": src.get("trailcam"),
-                "type": src.get("type"),
-            }
-        })
+    if clustered:
+        for c in _grid_clusters(es, WAYPOINTS_INDEX, "location", (min_lon, min_lat, max_lon, max_lat),
+                                zoom, limit_points, q_points["_source"]):
+            features.append(_waypoint_feature(c["hit"]) if c["hit"] else _cluster_feature(c, "waypoints"))
+    else:
+        pts = es.search(index=WAYPOINTS_INDEX, body=q_points)
+        for hit in pts.get("hits", {}).get("hits", []):
+            features.append(_waypoint_feature(hit))
+
+    line_hits = lns.get("hits", {}).get("hits", [])
+    geometries: Dict[str, Dict[str, Any]] = {}
+    if lod:
+        for hit in line_hits:
+            coords = ((hit["_source"].get("lod") or {}).get(lod))
+            if coords:
+                geometries[hit["_id"]] = {"type": "LineString", "coordinates": coords}
+        # Tracks indexed before LODs existed: fall back to full geometry
+        missing = [h["_id"] for h in line_hits if h["_id"] not in geometries]
+        if missing:
+            res = es.mget(index=TRACKS_INDEX, ids=missing, _source=["geometry"])
+            for doc in res.get("docs", []):
+                if doc.get("found"):
+                    geometries[doc["_id"]] = doc["_source"]["geometry"]
+    else:
+        geometries = {h["_id"]: h["_source"]["geometry"] for h in line_hits}
 
-    for hit in lns.get("hits", {}).get("hits", []):
-        src = hit["_source"]
+    for hit in line_hits:
+        if hit["_id"] not in geometries:
+            continue
         features.append({
             "type": "Feature",
             "id": hit["_id"],
-            "geometry": src["geometry"],
-            "properties": {"name": src.get("name"), "kind": "trk"}
+            "geometry": geometries[hit["_id"]],
+            "properties": {"name": hit["_source"].get("name"), "kind": "trk", "lod": lod}
         })
 
-    return {"type": "FeatureCollection", "features": features}
+    return {"type": "FeatureCollection", "features": features, "clustered": clustered}
+
+@router.get("/images/locations")
+def get_image_locations(
+    request: Request,
+    bbox: str = Query(..., description="minLon,minLat,maxLon,maxLat"),
+    zoom: Optional[float] = Query(None, ge=0, le=24),
+    limit: int = Query(2000, ge=1, le=10000),
+    cluster: bool = Query(True),
+    cluster_below_zoom: float = Query(CLUSTER_BELOW_ZOOM, ge=0, le=24),
+):
+    """
+    Where photos were taken.  Clusters (count + centroid) below
+    cluster_below_zoom, individual images past it.
+    """
+    es = es_dep(request)
+    bounds = _parse_bbox(bbox)
+    clustered = _should_cluster(cluster, zoom, cluster_below_zoom)
+
+    features: List[Dict[str, Any]] = []
+    for index, field in IMAGE_LOCATION_SOURCES:
+        try:
+            if clustered:
+                for c in _grid_clusters(es, index, field, bounds, zoom, limit,
+                                        [field, "captured_at", "@timestamp", "camera_name"]):
+                    features.append(_image_feature(c["hit"], field) if c["hit"] else _cluster_feature(c, index))
+            else:
+                res = es.search(index=index, body={
+                    "size": limit,
+                    "query": {"bool": {"filter": [_bbox_filter(field, *bounds)]}},
+                    "_source": [field, "captured_at", "@timestamp", "camera_name"],
+                })
+                for hit in res.get("hits", {}).get("hits", []):
+                    features.append(_image_feature(hit, field))
+        except NotFoundError:
+            continue
+
+    return {"type": "FeatureCollection", "features": features, "clustered": clustered}
 
 @router.patch("/waypoints/{waypoint_id}")
 async def update_waypoint(
@@ -424,13 +647,38 @@ async def update_waypoint(
         raise HTTPException(status_code=400, detail="Nothing to update")
 
     es.update(index=WAYPOINTS_INDEX, id=waypoint_id, body={"doc": doc})
-    try:
-        await broadcast_geo_refresh()
-    except Exception:
-        pass
+
+    # Partial feature: changed properties, plus geometry if it moved
+    feature: Dict[str, Any] = {
+        "type": "Feature",
+        "id": waypoint_id,
+        "properties": {k: v for k, v in doc.items() if k in ("name", "type", "trailcam")},
+    }
+    if "location" in doc:
+        feature["geometry"] = {"type": "Point", "coordinates": [lon, lat]}
+    await _geo_changed([change("updated", "wpt", waypoint_id, feature)])
 
     return {"ok": True, "id": waypoint_id}
 
+@router.post("/tracks/lod/backfill")
+def backfill_track_lods(request: Request):
+    """Compute LOD geometries for tracks without current ones (missing or older lod_version)."""
+    es = es_dep(request)
+    ensure_indices(es)
+    q = {"query": {"bool": {"must_not": [{"range": {"lod_version": {"gte": LOD_VERSION}}}]}},
+         "_source": ["geometry"]}
+
+    def actions():
+        for hit in helpers.scan(es, index=TRACKS_INDEX, query=q, size=200):
+            geom = (hit.get("_source") or {}).get("geometry") or {}
+            if geom.get("type") != "LineString" or not geom.get("coordinates"):
+                continue
+            yield {"_op_type": "update", "_index": TRACKS_INDEX, "_id": hit["_id"],
+                   "doc": {"lod": _build_lods(geom["coordinates"]), "lod_version": LOD_VERSION}}
+
+    updated, errors = helpers.bulk(es, actions(), chunk_size=200, raise_on_error=False)
+    return {"ok": not errors, "tracks_updated": updated, "errors": len(errors)}
+
 @router.get("/ws_status")
 def ws_status():
     return {"connections": ws_connection_count()}
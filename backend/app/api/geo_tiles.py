@@ -0,0 +1,256 @@
+# backend/app/api/geo_tiles.py
+"""
+Mapbox Vector Tiles for the map: /api/geo/tiles/{z}/{x}/{y}.mvt
+
+Layers:
+    waypoints   waypoints-v1 + onx-waypoints (from the shared waypoint index)
+    tracks      tracks-v1, reading the stored LOD that matches the zoom
+    markups     onx-markups tracks / lines / shapes
+    land_areas  onx-land-areas property boundaries
+
+OnX markups and land areas store raw GeoJSON that isn't geo-indexed, so they
+are held in memory with precomputed bounding boxes and filtered per tile.
+Only the sync service writes them, so they are reloaded on a TTL rather than
+on geo events.  Encoded tiles are cached by z/x/y; every geo event clears the
+cache, and the same TTL covers OnX syncs.  The ETag is a hash of the tile
+bytes, so it stays valid across API workers whatever each one has cached.
+"""
+from __future__ import annotations
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from fastapi import APIRouter, HTTPException, Request, Response
+from elasticsearch import Elasticsearch, helpers
+
+from app.api.geo import TRACKS_INDEX, es_dep, pick_lod
+from app.api.geo_ws import add_refresh_hook
+from app.api.waypoints import get_waypoint_index
+from lib.services.mvt import Layer, encode_tile, tile_bounds
+
+router = APIRouter(prefix="/geo", tags=["geo"])
+log = logging.getLogger("ridgeline.geo_tiles")
+
+MARKUPS_INDEX = "onx-markups"
+LAND_AREAS_INDEX = "onx-land-areas"
+
+TILE_CACHE_SIZE = int(os.getenv("GEO_TILE_CACHE_SIZE", "4096"))
+TILE_TTL_SECONDS = float(os.getenv("GEO_TILE_TTL_SECONDS", "300"))
+MAX_TRACKS_PER_TILE = int(os.getenv("GEO_TILE_MAX_TRACKS", "2000"))
+MAX_ZOOM = 22
+MVT_MEDIA_TYPE = "application/vnd.mapbox-vector-tile"
+
+
+# ---------------- Tile cache ----------------
+_tiles: "OrderedDict[Tuple[int, int, int], Tuple[float, bytes, str]]" = OrderedDict()
+_tiles_lock = threading.Lock()
+_generation = 0
+
+
+def invalidate_tiles() -> None:
+    """Drop every cached tile (the OnX shapes are not touched by geo events)."""
+    global _generation
+    with _tiles_lock:
+        _tiles.clear()
+        _generation += 1
+
+
+add_refresh_hook(invalidate_tiles)
+
+
+def _etag(data: bytes) -> str:
+    return '"%s"' % hashlib.blake2b(data, digest_size=12).hexdigest()
+
+
+def _cached(key: Tuple[int, int, int]) -> Optional[Tuple[bytes, str]]:
+    with _tiles_lock:
+        hit = _tiles.get(key)
+        if hit is None:
+            return None
+        if time.monotonic() - hit[0] >= TILE_TTL_SECONDS:
+            del _tiles[key]
+            return None
+        _tiles.move_to_end(key)
+        return hit[1], hit[2]
+
+
+def _store(key: Tuple[int, int, int], data: bytes, etag: str, generation: int) -> None:
+    with _tiles_lock:
+        if generation != _generation:
+            return              # built from data that has since changed
+        _tiles[key] = (time.monotonic(), data, etag)
+        _tiles.move_to_end(key)
+        while len(_tiles) > TILE_CACHE_SIZE:
+            _tiles.popitem(last=False)
+
+
+# ---------------- OnX shapes (in memory) ----------------
+class _ShapeSet:
+    """GeoJSON features with a bbox array for vectorized tile filtering."""
+
+    def __init__(self, features: List[Tuple[str, Dict[str, Any], Dict[str, Any]]]):
+        self.features = features          # (layer, geometry, properties)
+        boxes = [_bbox(g) for _, g, _ in features]
+        self.boxes = np.array(boxes, dtype=np.float64).reshape(-1, 4)
+
+    def intersecting(self, min_lon: float, min_lat: float, max_lon: float, max_lat: float):
+        b = self.boxes
+        hit = (b[:, 0] <= max_lon) & (b[:, 2] >= min_lon) & (b[:, 1] <= max_lat) & (b[:, 3] >= min_lat)
+        for i in np.nonzero(hit)[0]:
+            yield self.features[i]
+
+
+def _bbox(geometry: Dict[str, Any]) -> Tuple[float, float, float, float]:
+    pts = np.asarray(_flatten(geometry.get("coordinates")), dtype=np.float64).reshape(-1, 2)
+    if not len(pts):
+        return (np.inf, np.inf, -np.inf, -np.inf)
+    return (pts[:, 0].min(), pts[:, 1].min(), pts[:, 0].max(), pts[:, 1].max())
+
+
+def _flatten(coords) -> List[float]:
+    out: List[float] = []
+    stack = [coords]
+    while stack:
+        c = stack.pop()
+        if not isinstance(c, list) or not c:
+            continue
+        if isinstance(c[0], (int, float)):
+            out.extend(c[:2])
+        else:
+            stack.extend(c)
+    return out
+
+
+_shapes: Optional[_ShapeSet] = None
+_shapes_built_at = 0.0
+_shapes_lock = threading.Lock()
+
+
+def _load_shapes(es: Elasticsearch) -> _ShapeSet:
+    features: List[Tuple[str, Dict[str, Any], Dict[str, Any]]] = []
+    try:
+        for hit in helpers.scan(
+            es, index=MARKUPS_INDEX,
+            query={"query": {"exists": {"field": "geojson_coordinates"}},
+                   "_source": ["name", "type", "color", "geometry_type", "geojson_coordinates"]},
+            size=500,
+        ):
+            src = hit.get("_source") or {}
+            if not src.get("geometry_type"):
+                continue
+            geometry = {"type": src["geometry_type"], "coordinates": src["geojson_coordinates"]}
+            features.append(("markups", geometry, {
+                "id": hit["_id"], "name": src.get("name"), "type": src.get("type"), "color": src.get("color"),
+            }))
+    except Exception as exc:
+        log.warning("Could not load %s: %s", MARKUPS_INDEX, exc)
+    try:
+        for hit in helpers.scan(
+            es, index=LAND_AREAS_INDEX,
+            query={"query": {"match_all": {}}, "_source": ["name", "area_sqm", "geometry", "style"]},
+            size=200,
+        ):
+            src = hit.get("_source") or {}
+            geometry = src.get("geometry")
+            if not isinstance(geometry, dict):
+                continue
+            style = src.get("style") if isinstance(src.get("style"), dict) else {}
+            features.append(("land_areas", geometry, {
+                "id": hit["_id"], "name": src.get("name"), "area_sqm": src.get("area_sqm"),
+                "color": style.get("color") or style.get("fillColor"),
+            }))
+    except Exception as exc:
+        log.warning("Could not load %s: %s", LAND_AREAS_INDEX, exc)
+    return _ShapeSet(features)
+
+
+def _get_shapes(es: Elasticsearch) -> _ShapeSet:
+    global _shapes, _shapes_built_at
+    shapes = _shapes
+    if shapes is not None and time.monotonic() - _shapes_built_at < TILE_TTL_SECONDS:
+        return shapes
+    with _shapes_lock:
+        if _shapes is None or time.monotonic() - _shapes_built_at >= TILE_TTL_SECONDS:
+            _shapes = _load_shapes(es)
+            _shapes_built_at = time.monotonic()
+        return _shapes
+
+
+# ---------------- Tile building ----------------
+def _build_tile(es: Elasticsearch, z: int, x: int, y: int) -> bytes:
+    min_lon, min_lat, max_lon, max_lat = tile_bounds(z, x, y)
+
+    waypoints = Layer("waypoints")
+    for w in get_waypoint_index(es).in_bbox(min_lat, min_lon, max_lat, max_lon):
+        waypoints.add(
+            {"type": "Point", "coordinates": [w["lon"], w["lat"]]},
+            {"id": w["id"], "name": w.get("name"), "type": w.get("type"), "source": w.get("source")},
+            z, x, y,
+        )
+
+    tracks = Layer("tracks")
+    lod = pick_lod(z, None, (min_lat + max_lat) / 2)
+    res = es.search(index=TRACKS_INDEX, body={
+        "size": MAX_TRACKS_PER_TILE,
+        "query": {"bool": {"filter": [{"geo_shape": {"geometry": {
+            "shape": {"type": "envelope", "coordinates": [[min_lon, max_lat], [max_lon, min_lat]]},
+            "relation": "intersects",
+        }}}]}},
+        "_source": ["name", f"lod.{lod}"] if lod else ["name", "geometry"],
+    })
+    hits = res.get("hits", {}).get("hits", [])
+    geometries: Dict[str, Any] = {}
+    for hit in hits:
+        src = hit["_source"]
+        coords = (src.get("lod") or {}).get(lod) if lod else None
+        geometries[hit["_id"]] = {"type": "LineString", "coordinates": coords} if coords else src.get("geometry")
+    # Tracks indexed before LODs existed
+    missing = [i for i, g in geometries.items() if not g]
+    if missing:
+        for doc in es.mget(index=TRACKS_INDEX, ids=missing, _source=["geometry"]).get("docs", []):
+            if doc.get("found"):
+                geometries[doc["_id"]] = doc["_source"].get("geometry")
+    for hit in hits:
+        geometry = geometries.get(hit["_id"])
+        if geometry:
+            tracks.add(geometry, {"id": hit["_id"], "name": hit["_source"].get("name")}, z, x, y)
+
+    markups, land_areas = Layer("markups"), Layer("land_areas")
+    by_name = {"markups": markups, "land_areas": land_areas}
+    for layer, geometry, props in _get_shapes(es).intersecting(min_lon, min_lat, max_lon, max_lat):
+        by_name[layer].add(geometry, props, z, x, y)
+
+    return encode_tile([land_areas, markups, tracks, waypoints])
+
+
+@router.get("/tiles/{z}/{x}/{y}.mvt")
+def get_tile(z: int, x: int, y: int, request: Request):
+    if not (0 <= z <= MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise HTTPException(status_code=400, detail="Tile out of range")
+    es = es_dep(request)
+
+    key = (z, x, y)
+    hit = _cached(key)
+    if hit is not None:
+        data, etag = hit
+    else:
+        generation = _generation
+        data = _build_tile(es, z, x, y)
+        etag = _etag(data)
+        _store(key, data, etag, generation)
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=data, media_type=MVT_MEDIA_TYPE, headers=headers)
+
+
+@router.get("/tiles/status")
+def tiles_status():
+    with _tiles_lock:
+        return {"cached_tiles": len(_tiles), "generation": _generation}
@@ -1,61 +1,279 @@
 # backend/app/api/geo_ws.py
+"""
+Live geo events for map clients.
+
+Writes publish versioned events (geo_delta / geo_refresh).  With Redis
+available they go through a Redis stream: a Lua script assigns the version
+and appends atomically, and every API worker/replica tails the stream and
+delivers to its own sockets — so clients see the same ordered sequence no
+matter which worker they are connected to, and each worker runs its refresh
+hooks (cache invalidation) for writes made elsewhere.  Without Redis the
+same events are delivered in-process only.
+
+Each socket has a bounded outbound queue drained by its own sender task, so
+a slow client never stalls the others; a client that falls too far behind
+is disconnected and catches up by reconnecting with ?since=.
+"""
 from __future__ import annotations
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from typing import Dict, Set
+from collections import deque
+from typing import TYPE_CHECKING, Any, Callable, Deque, Dict, List, Optional
 import asyncio
+import json
 import logging
+import os
+import uuid
+
+if TYPE_CHECKING:  # imported on connect; redis.asyncio is slow to load
+    import redis.asyncio as aioredis
 
 router = APIRouter()
 log = logging.getLogger("geo_ws")
 
-_connections: Set[WebSocket] = set()
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+GEO_EVENTS_STREAM = os.getenv("GEO_EVENTS_STREAM", "geo:events")
+_VERSION_KEY = f"{GEO_EVENTS_STREAM}:version"
+_EPOCH_KEY = f"{GEO_EVENTS_STREAM}:epoch"
+
+HISTORY = int(os.getenv("GEO_WS_HISTORY", "1000"))
+QUEUE_SIZE = int(os.getenv("GEO_WS_QUEUE_SIZE", "256"))
+
+# Deltas larger than this are sent as a single geo_refresh instead
+MAX_DELTA_CHANGES = int(os.getenv("GEO_WS_MAX_DELTA_CHANGES", "500"))
+
+# Socket -> its outbound queue
+_connections: Dict[WebSocket, asyncio.Queue] = {}
+
+# Every change event carries a version that increases by one per event.
+# `epoch` identifies the version sequence: a client whose epoch differs
+# (sequence reset) or whose `since` has fallen out of the replay history
+# gets a versioned geo_refresh and reloads its bbox instead.  In Redis mode
+# these mirror the shared stream.
+_epoch = uuid.uuid4().hex[:12]
+_version = 0
+_history: Deque[Dict[str, Any]] = deque(maxlen=HISTORY)
+
+_redis: Optional[aioredis.Redis] = None
+_listener: Optional[asyncio.Task] = None
+
+# Atomically: version = INCR, then XADD with that version, so stream order
+# and version order always agree across workers.  If either key is gone
+# (flush, failover, eviction) INCR restarts at 1, so the epoch must change
+# with it: ARGV[3] is a fresh id minted per publish, never a cached epoch.
+_PUBLISH_LUA = """
+local epoch = redis.call('GET', KEYS[3])
+if not epoch or redis.call('EXISTS', KEYS[1]) == 0 then
+  epoch = ARGV[3]
+  redis.call('SET', KEYS[3], epoch)
+end
+local v = redis.call('INCR', KEYS[1])
+redis.call('XADD', KEYS[2], 'MAXLEN', '~', ARGV[2], '*', 'version', v, 'epoch', epoch, 'event', ARGV[1])
+return v
+"""
+
+# Startup: adopt the shared epoch/version, minting a new epoch (ARGV[1]) when
+# the version counter is missing so a restarted sequence is never mistaken
+# for a continuation.
+_INIT_LUA = """
+local epoch = redis.call('GET', KEYS[2])
+if not epoch or redis.call('EXISTS', KEYS[1]) == 0 then
+  epoch = ARGV[1]
+  redis.call('SET', KEYS[2], epoch)
+  redis.call('SETNX', KEYS[1], 0)
+end
+return {epoch, redis.call('GET', KEYS[1])}
+"""
+
+# Server-side caches that must be dropped whenever map data changes
+_refresh_hooks: List[Callable[[], None]] = []
+
+def add_refresh_hook(fn: Callable[[], None]) -> None:
+    _refresh_hooks.append(fn)
+
+def run_refresh_hooks() -> None:
+    for fn in _refresh_hooks:
+        try:
+            fn()
+        except Exception as e:
+            log.warning("geo refresh hook %s failed: %s", getattr(fn, "__name__", fn), e)
 
 def ws_connection_count() -> int:
     return len(_connections)
 
-async def _broadcast(payload: Dict):
-    dead = []
+# ---------------- Local delivery ----------------
+def _enqueue(ws: WebSocket, payload: Dict[str, Any]) -> None:
+    q = _connections.get(ws)
+    if q is None:
+        return
+    try:
+        q.put_nowait(payload)
+    except asyncio.QueueFull:
+        log.warning("WS client too slow (queue full); disconnecting")
+        _connections.pop(ws, None)
+        asyncio.create_task(_close(ws, code=1013))
+
+async def _close(ws: WebSocket, code: int = 1000) -> None:
+    try:
+        await ws.close(code=code)
+    except Exception:
+        pass
+
+def _deliver(event: Dict[str, Any]) -> None:
+    """Record an event and queue it for every socket on this worker."""
+    global _version, _epoch
+    if event["epoch"] != _epoch:
+        # sequence was reset (e.g. Redis flushed): start a fresh history
+        _epoch = event["epoch"]
+        _history.clear()
+        _version = event["version"]
+    else:
+        _version = max(_version, event["version"])
+    _history.append(event)
+    run_refresh_hooks()
     for ws in list(_connections):
+        _enqueue(ws, event)
+
+async def _sender(ws: WebSocket, q: asyncio.Queue) -> None:
+    try:
+        while True:
+            await ws.send_json(await q.get())
+    except Exception as e:
+        log.warning("WS send failed: %s", e)
+        _connections.pop(ws, None)
+
+# ---------------- Redis fan-out ----------------
+def _decode_entry(fields: Dict[bytes, bytes]) -> Dict[str, Any]:
+    event = json.loads(fields[b"event"])
+    event["version"] = int(fields[b"version"])
+    event["epoch"] = fields[b"epoch"].decode()
+    return event
+
+async def start_fanout() -> None:
+    """Connect to Redis and start tailing the event stream (API startup)."""
+    global _redis, _listener, _epoch, _version
+    try:
+        import redis.asyncio as aioredis
+
+        r = aioredis.from_url(REDIS_URL)
+        await r.ping()
+        epoch, version = await r.eval(_INIT_LUA, 2, _VERSION_KEY, _EPOCH_KEY, _epoch)
+        _epoch, _version = epoch.decode(), int(version)
+        # Seed replay history so reconnects that land on this worker can catch up
+        last_id = "0-0"
+        for entry_id, fields in reversed(await r.xrevrange(GEO_EVENTS_STREAM, count=HISTORY)):
+            event = _decode_entry(fields)
+            if event["epoch"] == _epoch:
+                _history.append(event)
+            last_id = entry_id
+    except Exception as e:
+        log.warning("Geo event fan-out disabled (Redis unavailable: %s); events stay in-process", e)
+        return
+    _redis = r
+    _listener = asyncio.create_task(_listen(last_id))
+    log.info("Geo event fan-out via Redis stream %s (version=%d)", GEO_EVENTS_STREAM, _version)
+
+async def stop_fanout() -> None:
+    global _redis, _listener
+    if _listener:
+        _listener.cancel()
+        _listener = None
+    if _redis:
+        await _redis.close()
+        _redis = None
+
+async def _listen(last_id) -> None:
+    while True:
         try:
-            await ws.send_json(payload)
+            resp = await _redis.xread({GEO_EVENTS_STREAM: last_id}, block=5000, count=100)
+            for _, entries in resp or []:
+                for entry_id, fields in entries:
+                    last_id = entry_id
+                    _deliver(_decode_entry(fields))
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
-            log.warning("WS send failed: %s", e)
-            dead.append(ws)
-    for ws in dead:
-        _connections.discard(ws)
+            log.warning("Geo event stream read failed: %s", e)
+            await asyncio.sleep(1)
+
+async def _publish(payload: Dict[str, Any]) -> None:
+    global _version
+    if _redis is not None:
+        try:
+            await _redis.eval(_PUBLISH_LUA, 3, _VERSION_KEY, GEO_EVENTS_STREAM, _EPOCH_KEY,
+                              json.dumps(payload), HISTORY, uuid.uuid4().hex[:12])
+            return              # delivered to every worker (us included) by _listen
+        except Exception as e:
+            log.warning("Geo event publish to Redis failed, delivering locally: %s", e)
+    _deliver({**payload, "version": _version + 1, "epoch": _epoch})
+
+# ---------------- Socket ----------------
+def _replay(since: Optional[int], epoch: Optional[str]) -> List[Dict[str, Any]]:
+    """Events a reconnecting client missed, or a refresh if we can't replay them."""
+    if since is None or since >= _version and epoch == _epoch:
+        return []
+    if epoch == _epoch and _history and _history[0]["version"] <= since + 1:
+        return [e for e in _history if e["version"] > since]
+    return [{"type": "geo_refresh", "version": _version, "epoch": _epoch}]
 
 @router.websocket("/ws")
-async def geo_ws(ws: WebSocket):
+async def geo_ws(ws: WebSocket, since: Optional[int] = None, epoch: Optional[str] = None):
     await ws.accept()
-    _connections.add(ws)
+    q: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+    _connections[ws] = q
     log.info("WS connected. total=%d", len(_connections))
 
-    # greet & keepalive
+    # greet (with the current version) & replay anything missed since `since`;
+    # events arriving meanwhile wait in the queue (clients skip versions they
+    # already have)
     try:
-        await ws.send_json({"type": "hello", "ok": True})
+        await ws.send_json({"type": "hello", "ok": True, "version": _version, "epoch": _epoch})
+        for event in _replay(since, epoch):
+            await ws.send_json(event)
     except Exception:
         pass
 
+    sender = asyncio.create_task(_sender(ws, q))
+
     async def keepalive():
-        try:
-            while True:
-                await asyncio.sleep(20)
-                await ws.send_json({"type": "ping"})
-        except Exception:
-            pass
+        while True:
+            await asyncio.sleep(20)
+            _enqueue(ws, {"type": "ping"})
 
     ka = asyncio.create_task(keepalive())
 
     try:
         while True:
-            # optional: read to detect client liveness
-            await ws.receive_text()
-    except WebSocketDisconnect:
+            # clients may ask to resync: {"type": "resync", "since": N, "epoch": "..."}
+            text = await ws.receive_text()
+            try:
+                msg = json.loads(text)
+            except ValueError:
+                continue
+            if isinstance(msg, dict) and msg.get("type") == "resync":
+                for event in _replay(msg.get("since"), msg.get("epoch")):
+                    _enqueue(ws, event)
+    except (WebSocketDisconnect, RuntimeError):
         pass
     finally:
         ka.cancel()
-        _connections.discard(ws)
+        sender.cancel()
+        _connections.pop(ws, None)
         log.info("WS disconnected. total=%d", len(_connections))
 
+def change(op: str, kind: str, id: str, feature: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """One entry of a geo_delta: op is created|updated|deleted, kind wpt|trk."""
+    return {"op": op, "kind": kind, "id": id, "feature": feature}
+
+async def broadcast_geo_changes(changes: List[Dict[str, Any]]):
+    """Send typed deltas so clients can patch their layers in place."""
+    if not changes:
+        run_refresh_hooks()
+        return
+    if len(changes) > MAX_DELTA_CHANGES:
+        await _publish({"type": "geo_refresh"})
+        return
+    await _publish({"type": "geo_delta", "changes": changes})
+
 async def broadcast_geo_refresh():
-    await _broadcast({"type": "geo_refresh"})
+    """Full reload for changes that can't be expressed as deltas."""
+    await _publish({"type": "geo_refresh"})
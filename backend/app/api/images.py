@@ -1,14 +1,12 @@
 from __future__ import annotations
+import asyncio
 import os
 import uuid
 import re
 import json
 from datetime import datetime, timezone
 from typing import Optional, Dict, Any, List
-from botocore.config import Config
 
-import boto3
-import botocore
 from fastapi import (
     APIRouter,
     Depends,
@@ -20,9 +18,9 @@ from fastapi import (
     Query,
 )
 from elasticsearch import Elasticsearch
-import redis.asyncio as aioredis
 
 from lib.search.images_index import (
+    INDEX,
     ensure_index,
     build_doc,
     index_one,
@@ -32,8 +30,9 @@ from lib.search.images_index import (
     search_similar_by_embedding,
 )
 from lib.images.exif import extract as extract_exif
-from app.api.waypoints import FAKE_WAYPOINTS
-from lib.services.geo import nearest_waypoint  # uses haversine in your repo
+from lib.services import ann_index
+from lib.services.vector_codec import decode_vector
+from app.api.waypoints import get_waypoint_index
 
 router = APIRouter(tags=["images"])
 
@@ -84,8 +83,14 @@ S3_ACCESS_KEY = os.getenv("S3_ACCESS_KEY")
 S3_SECRET_KEY = os.getenv("S3_SECRET_KEY")
 PUBLIC_BASE = os.getenv("S3_PUBLIC_BASE")  # e.g., https://cdn.example.com or https://cdn.example.com/{bucket}
 AUTO_CREATE_BUCKET = os.getenv("S3_AUTO_CREATE_BUCKET", "true").lower() in ("1", "true", "yes")
+# Waypoint auto-attach radius; WaypointIndex.within cost grows with its square
+MAX_ATTACH_THRESHOLD_M = float(os.getenv("MAX_ATTACH_THRESHOLD_M", "5000"))
 
 def s3_client():
+    # boto3 costs ~150 ms to import; only pay it on the first storage call
+    import boto3
+    from botocore.config import Config
+
     # MinIO wants path-style: http://minio:9000/bucket/key (NOT bucket.minio:9000/key)
     cfg = Config(
         signature_version="s3v4",
@@ -102,12 +107,14 @@ def s3_client():
     )
 
 def _ensure_bucket(cli) -> None:
+    from botocore.exceptions import ClientError
+
     if not AUTO_CREATE_BUCKET:
         return
     try:
         cli.head_bucket(Bucket=S3_BUCKET)  # exists → return
         return
-    except botocore.exceptions.ClientError as e:
+    except ClientError as e:
         code = (e.response or {}).get("Error", {}).get("Code", "")
         if str(code) not in ("404", "NoSuchBucket", "NotFound"):
             return  # permission/etc: don't spam traces
@@ -122,7 +129,7 @@ def _ensure_bucket(cli) -> None:
                 )
             else:
                 cli.create_bucket(Bucket=S3_BUCKET)
-    except botocore.exceptions.ClientError as e:
+    except ClientError as e:
         code = (e.response or {}).get("Error", {}).get("Code", "")
         if code not in ("BucketAlreadyOwnedByYou", "BucketAlreadyExists"):
             raise
@@ -173,6 +180,8 @@ async def publish_image_uploaded(image_url: Optional[str], doc_id: str, index_na
     channel = os.getenv("IMAGE_UPLOADED_CHANNEL", "image_uploaded")
     redis_url = os.getenv("REDIS_URL", "redis://redis:6379/0")
     payload = {"image_url": image_url, "doc_id": doc_id, "index": index_name, "bucket": bucket, "key": key}
+    import redis.asyncio as aioredis
+
     r = await aioredis.from_url(redis_url)
     try:
         await r.publish(channel, json.dumps(payload))
@@ -201,8 +210,10 @@ async def upload_image(
     # NEW: waypoint behavior
     override_waypoint_id: Optional[str] = Form(None),
     auto_attach: Optional[bool] = Form(True),
-    attach_threshold_meters: Optional[float] = Form(50.0),
+    attach_threshold_meters: Optional[float] = Form(50.0, ge=0, le=MAX_ATTACH_THRESHOLD_M),
 ):
+    from botocore.exceptions import ClientError
+
     index_name = ensure_index(es)
 
     cli = s3_client()
@@ -226,12 +237,13 @@ async def upload_image(
             img_lat, img_lon = gps["lat"], gps["lon"]
 
     # Resolve waypoint (override > nearest-within-threshold > none)
+    # (a stale index is rebuilt with a blocking ES scan, so fetch it off the loop)
     waypoint_doc, distance_m = None, None
     if override_waypoint_id:
-        waypoint_doc = next((w for w in FAKE_WAYPOINTS if w["id"] == override_waypoint_id), None)
+        waypoint_doc = (await asyncio.to_thread(get_waypoint_index, es)).get(override_waypoint_id)
     elif (auto_attach is True) and (img_lat is not None and img_lon is not None):
-        waypoint_doc, distance_m = nearest_waypoint(
-            img_lat, img_lon, FAKE_WAYPOINTS, max_m=float(attach_threshold_meters or 50.0)
+        waypoint_doc, distance_m = (await asyncio.to_thread(get_waypoint_index, es)).nearest(
+            img_lat, img_lon, max_m=float(attach_threshold_meters or 50.0)
         )
 
     _id = uuid.uuid4().hex
@@ -244,7 +256,7 @@ async def upload_image(
             Body=content,
             ContentType=file.content_type or "application/octet-stream",
         )
-    except botocore.exceptions.ClientError as e:
+    except ClientError as e:
         code = e.response.get("Error", {}).get("Code")
         if code in ("NoSuchBucket", "404") and AUTO_CREATE_BUCKET:
             _ensure_bucket(cli)
@@ -322,7 +334,7 @@ async def upload_images_batch(
     # NEW (shared behavior for the batch)
     override_waypoint_id: Optional[str] = Form(None),
     auto_attach: Optional[bool] = Form(True),
-    attach_threshold_meters: Optional[float] = Form(50.0),
+    attach_threshold_meters: Optional[float] = Form(50.0, ge=0, le=MAX_ATTACH_THRESHOLD_M),
     continue_on_error: bool = Form(True),
 ):
     index_name = ensure_index(es)
@@ -334,13 +346,28 @@ async def upload_images_batch(
     to_publish: List[Dict[str, str]] = []
     attached_summary: List[Dict[str, Any]] = []
 
+    def _fail(filename: Optional[str], e: Exception) -> None:
+        if not continue_on_error:
+            raise e
+        results.append({"error": str(e), "filename": filename})
+        attached_summary.append({"filename": filename, "error": str(e)})
+
+    # The index is fetched once for the batch (off the loop: a stale one is
+    # rebuilt with a blocking scan); each point is then a grid lookup.
+    wp_index = None
+    if override_waypoint_id or auto_attach is True:
+        wp_index = await asyncio.to_thread(get_waypoint_index, es)
+    override_doc = wp_index.get(override_waypoint_id) if override_waypoint_id else None
+
+    # One file at a time: read, resolve coords + waypoint, store.  Only the
+    # current file's bytes are held; the docs for the bulk index are small.
     for f in files:
         try:
             content = await f.read()
             exif = extract_exif(content) if "image" in (f.content_type or "") else {}
             cap = exif.get("captured_at") or _infer_timestamp_from_name(f.filename or "") or captured_at
 
-            # Compute per-file coords (inherit provided lat/lon, else EXIF)
+            # inherit provided lat/lon, else EXIF
             img_lat, img_lon = None, None
             if lat is not None and lon is not None:
                 img_lat, img_lon = lat, lon
@@ -349,13 +376,12 @@ async def upload_images_batch(
                 if gps.get("lat") is not None and gps.get("lon") is not None:
                     img_lat, img_lon = gps["lat"], gps["lon"]
 
-            # Resolve waypoint
             waypoint_doc, distance_m = None, None
             if override_waypoint_id:
-                waypoint_doc = next((w for w in FAKE_WAYPOINTS if w["id"] == override_waypoint_id), None)
-            elif (auto_attach is True) and (img_lat is not None and img_lon is not None):
-                waypoint_doc, distance_m = nearest_waypoint(
-                    img_lat, img_lon, FAKE_WAYPOINTS, max_m=float(attach_threshold_meters or 50.0)
+                waypoint_doc = override_doc
+            elif wp_index is not None and img_lat is not None and img_lon is not None:
+                waypoint_doc, distance_m = wp_index.nearest(
+                    img_lat, img_lon, max_m=float(attach_threshold_meters or 50.0)
                 )
 
             _id = uuid.uuid4().hex
@@ -400,11 +426,7 @@ async def upload_images_batch(
             })
 
         except Exception as e:
-            if continue_on_error:
-                results.append({"error": str(e), "filename": getattr(f, "filename", None)})
-                attached_summary.append({"filename": getattr(f, "filename", None), "error": str(e)})
-                continue
-            raise
+            _fail(getattr(f, "filename", None), e)
 
     if docs:
         index_bulk(es, docs)
@@ -447,20 +469,33 @@ def similar_images(
     image_id: str,
     es: Elasticsearch = Depends(es_dep),
     k: int = Query(10, ge=1, le=100),
+    source: str = Query("auto", pattern="^(auto|ann|es)$"),
 ):
-    src = fetch_one(es, image_id)
-    if not src:
-        raise HTTPException(status_code=404, detail="not found")
-    emb = src.get("embedding")
-    if not emb:
-        raise HTTPException(status_code=400, detail="image has no embedding yet")
+    ann = ann_index.get(INDEX) if source != "es" else None
+    query = ann.vector(image_id) if ann is not None else None
+    if query is not None:
+        # cosine -> the (1 + cos) / 2 scale ES reports for cosine kNN
+        results = [(_id, (1.0 + sim) / 2.0) for _id, sim in ann.search(query, k, exclude=image_id)]
+    elif source == "ann":
+        raise HTTPException(status_code=404, detail="image is not in the local ANN index yet")
+    else:
+        src = fetch_one(es, image_id)
+        if not src:
+            raise HTTPException(status_code=404, detail="not found")
+        emb = src.get("embedding")
+        if not emb:
+            raise HTTPException(status_code=400, detail="image has no embedding yet")
+        results = search_similar_by_embedding(es, decode_vector(emb).tolist(), k=k)
+
+    results = [(_id, score) for _id, score in results if _id != image_id]
+    docs: Dict[str, Dict[str, Any]] = {}
+    if results:
+        resp = es.mget(index=INDEX, ids=[_id for _id, _ in results], source=["bucket", "key", "url"])
+        docs = {d["_id"]: d.get("_source") or {} for d in resp.get("docs", []) if d.get("found")}
 
-    results = search_similar_by_embedding(es, emb, k=k)
     items: List[Dict[str, Any]] = []
     for _id, score in results:
-        if _id == image_id:
-            continue
-        other = fetch_one(es, _id) or {}
+        other = docs.get(_id, {})
         url = other.get("url") or (
             build_public_url(other.get("bucket", ""), other.get("key", ""))
             if (other.get("bucket") and other.get("key"))
@@ -15,8 +15,6 @@ import os
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Optional
 
-import anthropic
-import requests
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 
@@ -119,6 +117,8 @@ IMAGES_INDEX = "tactacam-images"
 # ── ES|QL executor ─────────────────────────────────────────────────────────────
 
 def _run_esql(query: str) -> dict:
+    import requests  # deferred, like anthropic below: keeps API startup light
+
     resp = requests.post(
         f"{ELASTIC_HOST}/_query",
         json={"query": query},
@@ -138,6 +138,8 @@ def _esql_to_records(result: dict) -> list[dict]:
 
 def _semantic_search(query: str, limit: int = 6) -> list[dict]:
     """Run ELSER semantic search on ai_notes_semantic, boosting human-verified docs."""
+    import requests
+
     try:
         resp = requests.post(
             f"{ELASTIC_HOST}/{IMAGES_INDEX}/_search",
@@ -228,6 +230,8 @@ def ask(req: AskRequest):
     if not ELASTIC_HOST or not ELASTIC_API_KEY:
         raise HTTPException(status_code=503, detail="Elasticsearch not configured")
 
+    import anthropic  # ~1 s to import; only the first /intel/ask pays it
+
     client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
 
     # Stage 1 — Generate ES|QL query
@@ -3,16 +3,33 @@ Semantic search endpoint using ELSER v2 sparse embeddings on ai_notes_semantic.
 
 Allows natural-language queries like "big buck near food plot" or "doe with fawn
 at dawn" — returns ranked trail-camera images with metadata and a presigned S3 URL.
+
+/search/visual is pure CLIP text → image kNN with cached query embeddings.
+
+/search/hybrid fuses three retrievers with reciprocal rank fusion:
+  elser — semantic query on ai_notes_semantic
+  clip  — kNN on the CLIP image `embedding` using the CLIP text tower
+  bm25  — multi_match over the label / notes text fields
+Structured filters (camera, property, species, date range) are pushed into every
+retriever (knn.filter and bool.filter), so fusion only ever sees matching docs.
 """
 from __future__ import annotations
 
+import base64
+import hashlib
+import json
 import logging
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
 
-import requests
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
-from typing import Optional
+
+from lib.services import ann_index
+from lib.services.image_embed import embed_query, normalize_query
+from lib.services.vector_codec import decode_vector
 
 logger = logging.getLogger(__name__)
 router = APIRouter(tags=["search"])
@@ -24,6 +41,18 @@ S3_BUCKET = os.environ.get("S3_BUCKET", "trailcam-images")
 
 IMAGES_INDEX = "tactacam-images"
 
+# Hybrid search: each retriever returns its top HYBRID_WINDOW ids (capped at
+# HYBRID_MAX_WINDOW).  RRF scores depend on that depth, so page 1 fixes the
+# window in the cursor and every later page of the query fuses over the same one.
+HYBRID_WINDOW = int(os.environ.get("HYBRID_WINDOW", "100"))
+HYBRID_MAX_WINDOW = int(os.environ.get("HYBRID_MAX_WINDOW", "1000"))
+RRF_RANK_CONSTANT = int(os.environ.get("RRF_RANK_CONSTANT", "60"))
+RETRIEVERS = ("elser", "clip", "bm25")
+BM25_FIELDS = [
+    "ai_notes", "human_notes", "ai_antlers", "human_antlers",
+    "ai_species^2", "human_species^3", "animal_name^3", "ai_labels", "camera_name",
+]
+
 
 class SearchResult(BaseModel):
     score: float
@@ -52,6 +81,22 @@ def _image_url(s3_key: str) -> str:
     return f"{S3_PUBLIC_ENDPOINT}/{S3_BUCKET}/{s3_key}"
 
 
+def _es_post(path: str, body: dict, timeout: float = 15) -> dict:
+    import requests  # deferred: keeps API startup light
+
+    resp = requests.post(
+        f"{ELASTIC_HOST}/{IMAGES_INDEX}/{path}",
+        json=body,
+        headers={
+            "Authorization": f"ApiKey {ELASTIC_API_KEY}",
+            "Content-Type": "application/json",
+        },
+        timeout=timeout,
+    )
+    resp.raise_for_status()
+    return resp.json()
+
+
 class SimilarResult(BaseModel):
     score: float
     doc_id: str
@@ -65,15 +110,63 @@ class SimilarResult(BaseModel):
     url: Optional[str] = None
 
 
+def _similar_result(doc_id: str, score: float, src: dict) -> SimilarResult:
+    s3_key = src.get("s3_key")
+    return SimilarResult(
+        score=round(score, 4),
+        doc_id=doc_id,
+        camera_name=src.get("camera_name"),
+        ai_species=src.get("ai_species"),
+        ai_sex=src.get("ai_sex"),
+        ai_age_class=src.get("ai_age_class"),
+        ai_confidence=src.get("ai_confidence"),
+        ai_notes=src.get("ai_notes"),
+        timestamp=src.get("@timestamp"),
+        url=_image_url(s3_key) if s3_key else None,
+    )
+
+
+_SIMILAR_SOURCE = [
+    "camera_name", "ai_species", "ai_sex", "ai_age_class",
+    "ai_confidence", "ai_notes", "@timestamp", "s3_key",
+]
+
+
+def _similar_from_ann(ann: ann_index.AnnIndex, doc_id: str, k: int) -> Optional[list[SimilarResult]]:
+    """Neighbours from the local index, hydrated with a single _mget; None if doc_id has no vector there."""
+    query = ann.vector(doc_id)
+    if query is None:
+        return None
+    hits = ann.search(query, k, exclude=doc_id)
+    if not hits:
+        return []
+    data = _es_post("_mget", {"ids": [h for h, _ in hits], "_source": _SIMILAR_SOURCE}, timeout=10)
+    docs = {d["_id"]: d.get("_source", {}) for d in data.get("docs", []) if d.get("found")}
+    # cosine -> the (1 + cos) / 2 scale ES reports for cosine kNN
+    return [_similar_result(h, (1.0 + sim) / 2.0, docs[h]) for h, sim in hits if h in docs]
+
+
 @router.get("/search/similar/{doc_id}", response_model=list[SimilarResult])
 def similar_images(
     doc_id: str,
     k: int = Query(default=9, ge=1, le=50),
+    source: str = Query(default="auto", pattern="^(auto|ann|es)$",
+                        description="auto: local ANN index when it has the image, else ES kNN"),
 ):
     """
     kNN image similarity search. Fetches the CLIP embedding from the given
     tactacam-images doc and returns the k most visually similar images.
     """
+    ann = ann_index.get(IMAGES_INDEX) if source != "es" else None
+    if ann is not None:
+        results = _similar_from_ann(ann, doc_id, k)
+        if results is not None:
+            return results
+    if source == "ann":
+        raise HTTPException(status_code=404, detail="Image is not in the local ANN index yet")
+
+    import requests
+
     # Fetch embedding from source doc
     get_resp = requests.get(
         f"{ELASTIC_HOST}/{IMAGES_INDEX}/_doc/{doc_id}",
@@ -84,25 +177,21 @@ def similar_images(
         timeout=10,
     )
     get_resp.raise_for_status()
-    source = get_resp.json().get("_source", {})
-    embedding = source.get("embedding")
+    source_doc = get_resp.json().get("_source", {})
+    embedding = source_doc.get("embedding")
     if not embedding:
-        from fastapi import HTTPException
         raise HTTPException(status_code=400, detail="Image has no embedding yet — run the CLIP backfill job first")
 
     body = {
         "knn": {
             "field": "embedding",
-            "query_vector": embedding,
+            "query_vector": decode_vector(embedding).tolist(),
             "k": k + 1,  # +1 to exclude self
             "num_candidates": max((k + 1) * 10, 100),
             "filter": {"bool": {"must_not": [{"ids": {"values": [doc_id]}}]}},
         },
         "size": k,
-        "_source": [
-            "camera_name", "ai_species", "ai_sex", "ai_age_class",
-            "ai_confidence", "ai_notes", "@timestamp", "s3_key",
-        ],
+        "_source": _SIMILAR_SOURCE,
     }
 
     resp = requests.post(
@@ -116,23 +205,16 @@ def similar_images(
     )
     resp.raise_for_status()
 
-    results = []
-    for hit in resp.json().get("hits", {}).get("hits", []):
-        src = hit.get("_source", {})
-        s3_key = src.get("s3_key")
-        results.append(SimilarResult(
-            score=round(hit.get("_score", 0), 4),
-            doc_id=hit["_id"],
-            camera_name=src.get("camera_name"),
-            ai_species=src.get("ai_species"),
-            ai_sex=src.get("ai_sex"),
-            ai_age_class=src.get("ai_age_class"),
-            ai_confidence=src.get("ai_confidence"),
-            ai_notes=src.get("ai_notes"),
-            timestamp=src.get("@timestamp"),
-            url=_image_url(s3_key) if s3_key else None,
-        ))
-    return results
+    return [
+        _similar_result(hit["_id"], hit.get("_score", 0), hit.get("_source", {}))
+        for hit in resp.json().get("hits", {}).get("hits", [])
+    ]
+
+
+@router.get("/search/ann")
+def ann_status():
+    """Local ANN index state (rows, IVF lists, watermark) per images index."""
+    return {"indices": ann_index.all_stats()}
 
 
 @router.get("/search", response_model=SearchResponse)
@@ -159,6 +241,8 @@ def semantic_search(
         ],
     }
 
+    import requests
+
     resp = requests.post(
         f"{ELASTIC_HOST}/{IMAGES_INDEX}/_search",
         json=body,
@@ -194,3 +278,335 @@ def semantic_search(
         ))
 
     return SearchResponse(query=q, total=len(results), results=results)
+
+
+# ── Hybrid search ────────────────────────────────────────────────────────────
+
+class RetrieverStats(BaseModel):
+    latency_ms: float
+    took_ms: Optional[int] = None      # ES-side time
+    embed_ms: Optional[float] = None   # CLIP text encoding (clip only)
+    hits: int = 0
+    error: Optional[str] = None
+
+
+class HybridResult(SearchResult):
+    ranks: Dict[str, int] = {}         # retriever -> 1-based rank
+    animal_name: Optional[str] = None
+    human_species: Optional[str] = None
+
+
+class HybridResponse(BaseModel):
+    query: str
+    results: list[HybridResult]
+    retrievers: Dict[str, RetrieverStats]
+    candidates: int
+    next_cursor: Optional[str] = None
+
+
+_HYBRID_SOURCE = [
+    "camera_name", "ai_species", "ai_sex", "ai_age_class", "ai_antlers",
+    "ai_confidence", "ai_notes", "@timestamp", "s3_key",
+    "weather.temperature", "weather.moon_phase", "animal_name", "human_species",
+]
+
+
+def _hybrid_filters(
+    camera_id: Optional[List[str]],
+    property_id: Optional[str],
+    species: Optional[str],
+    start: Optional[str],
+    end: Optional[str],
+    animals_only: bool,
+) -> List[dict]:
+    filters: List[dict] = []
+    if camera_id:
+        filters.append({"terms": {"camera_id": camera_id}})
+    if property_id:
+        filters.append({"term": {"property_id": property_id}})
+    if species:
+        filters.append({"bool": {"should": [
+            {"term": {"human_species": species}},
+            {"term": {"ai_species": species}},
+        ], "minimum_should_match": 1}})
+    if start or end:
+        rng = {}
+        if start:
+            rng["gte"] = start
+        if end:
+            rng["lte"] = end
+        filters.append({"range": {"@timestamp": rng}})
+    if animals_only:
+        filters.append({"term": {"ai_has_animal": True}})
+    return filters
+
+
+def _ranked_ids(data: dict) -> List[str]:
+    return [h["_id"] for h in data.get("hits", {}).get("hits", [])]
+
+
+def _elser(q: str, filters: List[dict], window: int, stats: RetrieverStats) -> List[str]:
+    data = _es_post("_search", {
+        "query": {"bool": {
+            "must": [{"semantic": {"field": "ai_notes_semantic", "query": q}}],
+            "filter": filters,
+        }},
+        "size": window,
+        "_source": False,
+    })
+    stats.took_ms = data.get("took")
+    return _ranked_ids(data)
+
+
+def _clip(q: str, filters: List[dict], window: int, stats: RetrieverStats) -> List[str]:
+    t0 = time.perf_counter()
+    vector, _ = embed_query(q)
+    stats.embed_ms = round((time.perf_counter() - t0) * 1000, 1)
+    data = _es_post("_search", {
+        "knn": {
+            "field": "embedding",
+            "query_vector": vector,
+            "k": window,
+            "num_candidates": min(max(window * 2, 100), 10000),
+            "filter": filters,
+        },
+        "size": window,
+        "_source": False,
+    })
+    stats.took_ms = data.get("took")
+    return _ranked_ids(data)
+
+
+def _bm25(q: str, filters: List[dict], window: int, stats: RetrieverStats) -> List[str]:
+    data = _es_post("_search", {
+        "query": {"bool": {
+            "must": [{"multi_match": {
+                "query": q,
+                "fields": BM25_FIELDS,
+                "type": "best_fields",
+                "lenient": True,
+            }}],
+            "filter": filters,
+        }},
+        "size": window,
+        "_source": False,
+    })
+    stats.took_ms = data.get("took")
+    return _ranked_ids(data)
+
+
+_RETRIEVER_FNS: Dict[str, Callable[..., List[str]]] = {"elser": _elser, "clip": _clip, "bm25": _bm25}
+
+
+def _run_retriever(name: str, q: str, filters: List[dict], window: int):
+    stats = RetrieverStats(latency_ms=0.0)
+    t0 = time.perf_counter()
+    try:
+        ids = _RETRIEVER_FNS[name](q, filters, window, stats)
+    except Exception as exc:
+        logger.warning("Hybrid retriever %s failed: %s", name, exc)
+        stats.error = str(exc)
+        ids = []
+    stats.latency_ms = round((time.perf_counter() - t0) * 1000, 1)
+    stats.hits = len(ids)
+    return ids, stats
+
+
+def rrf_fuse(rankings: Dict[str, List[str]], rank_constant: int = RRF_RANK_CONSTANT) -> List[tuple]:
+    """
+    Reciprocal rank fusion: score(d) = sum over retrievers of 1 / (k + rank).
+    Returns [(doc_id, score, {retriever: rank})] best first; ties keep doc_id order
+    so pages are stable between requests.
+    """
+    scores: Dict[str, float] = {}
+    ranks: Dict[str, Dict[str, int]] = {}
+    for name, ids in rankings.items():
+        for rank, doc_id in enumerate(ids, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (rank_constant + rank)
+            ranks.setdefault(doc_id, {})[name] = rank
+    order = sorted(scores, key=lambda d: (-scores[d], d))
+    return [(d, scores[d], ranks[d]) for d in order]
+
+
+def _fingerprint(params: Dict[str, Any]) -> str:
+    raw = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode()).hexdigest()[:12]
+
+
+def _encode_cursor(offset: int, fp: str, window: int) -> str:
+    raw = json.dumps({"o": offset, "f": fp, "w": window}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str, fp: str) -> tuple:
+    """(offset, window) from a cursor issued for this query."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        offset, window = int(data["o"]), int(data["w"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if data.get("f") != fp or offset < 0 or not 0 < window <= HYBRID_MAX_WINDOW:
+        raise HTTPException(status_code=400, detail="Cursor does not belong to this query")
+    return offset, window
+
+
+@router.get("/search/hybrid", response_model=HybridResponse)
+def hybrid_search(
+    q: str = Query(..., min_length=1, description="Natural language search query"),
+    limit: int = Query(default=12, ge=1, le=50),
+    cursor: Optional[str] = Query(default=None, description="next_cursor from the previous page"),
+    camera_id: Optional[List[str]] = Query(default=None),
+    property_id: Optional[str] = None,
+    species: Optional[str] = Query(default=None, description="Matches human_species or ai_species"),
+    start: Optional[str] = Query(default=None, description="Earliest @timestamp (ISO date)"),
+    end: Optional[str] = Query(default=None, description="Latest @timestamp (ISO date)"),
+    animals_only: bool = False,
+    retrievers: Optional[List[str]] = Query(default=None, description="Subset of elser, clip, bm25"),
+):
+    """
+    Hybrid ELSER + CLIP + BM25 search fused with reciprocal rank fusion.
+
+    Retrievers run in parallel and each reports its own latency; one failing
+    retriever degrades the ranking instead of failing the request.  Pages are
+    addressed by an opaque cursor tied to the query and filters.
+    """
+    names = [r for r in (retrievers or RETRIEVERS) if r in _RETRIEVER_FNS]
+    if not names:
+        raise HTTPException(status_code=400, detail=f"retrievers must be a subset of {list(RETRIEVERS)}")
+
+    # The cursor fingerprint and every retriever see the same normalized text,
+    # so a cursor can only be replayed against a query that ranks identically.
+    query = q
+    q = normalize_query(q)
+    if not q:
+        raise HTTPException(status_code=400, detail="q must not be blank")
+    filters = _hybrid_filters(camera_id, property_id, species, start, end, animals_only)
+    fp = _fingerprint({"q": q, "filters": filters, "retrievers": sorted(names)})
+    if cursor:
+        offset, window = _decode_cursor(cursor, fp)
+    else:
+        offset, window = 0, min(HYBRID_WINDOW, HYBRID_MAX_WINDOW)
+
+    rankings: Dict[str, List[str]] = {}
+    stats: Dict[str, RetrieverStats] = {}
+    with ThreadPoolExecutor(max_workers=len(names)) as executor:
+        futures = {n: executor.submit(_run_retriever, n, q, filters, window) for n in names}
+        for n, fut in futures.items():
+            rankings[n], stats[n] = fut.result()
+
+    if all(s.error for s in stats.values()):
+        raise HTTPException(status_code=502, detail={n: s.error for n, s in stats.items()})
+
+    fused = rrf_fuse(rankings)
+    page = fused[offset:offset + limit]
+
+    docs: Dict[str, dict] = {}
+    if page:
+        data = _es_post("_mget", {"ids": [d for d, _, _ in page], "_source": _HYBRID_SOURCE})
+        docs = {d["_id"]: d.get("_source", {}) for d in data.get("docs", []) if d.get("found")}
+
+    results = []
+    for doc_id, score, ranks in page:
+        src = docs.get(doc_id)
+        if src is None:
+            continue
+        s3_key = src.get("s3_key")
+        results.append(HybridResult(
+            score=round(score, 6),
+            doc_id=doc_id,
+            camera_name=src.get("camera_name"),
+            ai_species=src.get("ai_species"),
+            ai_sex=src.get("ai_sex"),
+            ai_age_class=src.get("ai_age_class"),
+            ai_antlers=src.get("ai_antlers"),
+            ai_confidence=src.get("ai_confidence"),
+            ai_notes=src.get("ai_notes"),
+            timestamp=src.get("@timestamp"),
+            s3_key=s3_key,
+            url=_image_url(s3_key) if s3_key else None,
+            weather_temp=src.get("weather", {}).get("temperature"),
+            weather_moon=src.get("weather", {}).get("moon_phase"),
+            ranks=ranks,
+            animal_name=src.get("animal_name"),
+            human_species=src.get("human_species"),
+        ))
+
+    next_offset = offset + limit
+    more = next_offset < len(fused)
+    return HybridResponse(
+        query=query,
+        results=results,
+        retrievers=stats,
+        candidates=len(fused),
+        next_cursor=_encode_cursor(next_offset, fp, window) if more else None,
+    )
+
+
+# ── CLIP text → image search ─────────────────────────────────────────────────
+
+class VisualSearchResponse(SearchResponse):
+    embed_ms: float
+    cached: bool                       # query embedding came from the LRU
+    took_ms: Optional[int] = None
+
+
+@router.get("/search/visual", response_model=VisualSearchResponse)
+def visual_search(
+    q: str = Query(..., min_length=1, description='What the photo shows, e.g. "buck at night in snow"'),
+    limit: int = Query(default=12, ge=1, le=50),
+    camera_id: Optional[List[str]] = Query(default=None),
+    property_id: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+):
+    """
+    Text-to-image search: the query is encoded with the CLIP text tower and
+    matched against the CLIP image `embedding` with kNN — no dependence on
+    GPT-written notes.  Query embeddings are cached by normalized text, so
+    repeats and autocomplete prefixes already seen skip the model.
+    """
+    t0 = time.perf_counter()
+    try:
+        vector, cached = embed_query(q)
+    except Exception as exc:
+        logger.error("CLIP text encoding failed: %s", exc)
+        raise HTTPException(status_code=503, detail="CLIP text encoder unavailable")
+    embed_ms = round((time.perf_counter() - t0) * 1000, 1)
+
+    knn = {
+        "field": "embedding",
+        "query_vector": vector,
+        "k": limit,
+        "num_candidates": max(limit * 10, 100),
+    }
+    filters = _hybrid_filters(camera_id, property_id, None, start, end, False)
+    if filters:
+        knn["filter"] = filters
+    data = _es_post("_search", {"knn": knn, "size": limit, "_source": _HYBRID_SOURCE})
+
+    results = []
+    for hit in data.get("hits", {}).get("hits", []):
+        src = hit.get("_source", {})
+        s3_key = src.get("s3_key")
+        results.append(SearchResult(
+            score=round(hit.get("_score", 0), 4),
+            doc_id=hit["_id"],
+            camera_name=src.get("camera_name"),
+            ai_species=src.get("human_species") or src.get("ai_species"),
+            ai_sex=src.get("ai_sex"),
+            ai_age_class=src.get("ai_age_class"),
+            ai_antlers=src.get("ai_antlers"),
+            ai_confidence=src.get("ai_confidence"),
+            ai_notes=src.get("ai_notes"),
+            timestamp=src.get("@timestamp"),
+            s3_key=s3_key,
+            url=_image_url(s3_key) if s3_key else None,
+            weather_temp=src.get("weather", {}).get("temperature"),
+            weather_moon=src.get("weather", {}).get("moon_phase"),
+        ))
+
+    return VisualSearchResponse(
+        query=q, total=len(results), results=results,
+        embed_ms=embed_ms, cached=cached, took_ms=data.get("took"),
+    )
@@ -0,0 +1,220 @@
+# backend/app/api/trailcam_events.py
+"""
+Live image-ingest events for the map and gallery.
+
+The sync service (new photos, AI analysis), the vision worker and the label
+endpoint publish events to the Redis `image_events` channel; every API worker
+subscribes once and pushes each event to its own sockets whose subscription
+matches, so the UI no longer polls /trailcams/{id}/images.
+
+    WS /api/trailcams/events?camera_id=A&camera_id=B&property_id=P
+
+With no filters a socket receives everything.  Clients can change their
+subscription at any time with
+    {"type": "subscribe", "camera_ids": [...], "property_ids": [...]}
+
+Events: {"type": "new_photo" | "analysis_complete" | "label_updated",
+         "image": {id, camera_id, property_id, filename, timestamp, url, ...}}
+        {"type": "camera_refresh", "reason": ..., "count": n,
+         "image": {camera_id, property_id, ...}}   large batches: refetch the camera
+
+Sockets use the same bounded-queue/sender-task scheme as geo_ws.  Events are
+live hints only: a reconnecting client refetches its tiles over REST.
+"""
+from __future__ import annotations
+from fastapi import APIRouter, Query, WebSocket, WebSocketDisconnect
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Set
+import asyncio
+import json
+import logging
+import os
+
+if TYPE_CHECKING:  # imported on connect; redis.asyncio is slow to load
+    import redis.asyncio as aioredis
+
+router = APIRouter()
+log = logging.getLogger("trailcam_events")
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+IMAGE_EVENTS_CHANNEL = os.getenv("IMAGE_EVENTS_CHANNEL", "image_events")
+QUEUE_SIZE = int(os.getenv("IMAGE_EVENTS_QUEUE_SIZE", "256"))
+
+EVENT_TYPES = ("new_photo", "analysis_complete", "label_updated", "camera_refresh")
+
+
+class _Subscription:
+    __slots__ = ("cameras", "properties", "queue")
+
+    def __init__(self, cameras: Set[str], properties: Set[str]):
+        self.cameras = cameras
+        self.properties = properties
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+    def matches(self, image: Dict[str, Any]) -> bool:
+        if not self.cameras and not self.properties:
+            return True
+        return (str(image.get("camera_id")) in self.cameras
+                or str(image.get("property_id")) in self.properties)
+
+
+_connections: Dict[WebSocket, _Subscription] = {}
+
+_redis: Optional[aioredis.Redis] = None
+_listener: Optional[asyncio.Task] = None
+
+# Per-event enrichment run once per worker before fan-out (e.g. presigned URLs)
+_event_hooks: List[Callable[[Dict[str, Any]], None]] = []
+
+def add_event_hook(fn: Callable[[Dict[str, Any]], None]) -> None:
+    _event_hooks.append(fn)
+
+def subscriber_count() -> int:
+    return len(_connections)
+
+# ---------------- Local delivery ----------------
+async def _close(ws: WebSocket, code: int = 1000) -> None:
+    try:
+        await ws.close(code=code)
+    except Exception:
+        pass
+
+def _deliver(event: Dict[str, Any]) -> None:
+    image = event.get("image") or {}
+    targets = [(ws, sub) for ws, sub in list(_connections.items()) if sub.matches(image)]
+    if not targets:
+        return
+    for fn in _event_hooks:
+        try:
+            fn(event)
+        except Exception as e:
+            log.warning("image event hook %s failed: %s", getattr(fn, "__name__", fn), e)
+    for ws, sub in targets:
+        try:
+            sub.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            log.warning("Image events client too slow (queue full); disconnecting")
+            _connections.pop(ws, None)
+            asyncio.create_task(_close(ws, code=1013))
+
+async def _sender(ws: WebSocket, q: asyncio.Queue) -> None:
+    try:
+        while True:
+            await ws.send_json(await q.get())
+    except Exception as e:
+        log.warning("Image events send failed: %s", e)
+        _connections.pop(ws, None)
+
+# ---------------- Redis subscription ----------------
+async def start_listener() -> None:
+    """Subscribe to the image events channel (API startup)."""
+    global _redis, _listener
+    try:
+        import redis.asyncio as aioredis
+
+        r = aioredis.from_url(REDIS_URL)
+        await r.ping()
+    except Exception as e:
+        log.warning("Image events disabled (Redis unavailable: %s); only local label events", e)
+        return
+    _redis = r
+    _listener = asyncio.create_task(_listen())
+    log.info("Image events via Redis channel %s", IMAGE_EVENTS_CHANNEL)
+
+async def stop_listener() -> None:
+    global _redis, _listener
+    if _listener:
+        _listener.cancel()
+        _listener = None
+    if _redis:
+        await _redis.close()
+        _redis = None
+
+async def _listen() -> None:
+    while True:
+        pubsub = _redis.pubsub(ignore_subscribe_messages=True)
+        try:
+            await pubsub.subscribe(IMAGE_EVENTS_CHANNEL)
+            while True:
+                msg = await pubsub.get_message(timeout=5.0)
+                if msg is None:
+                    continue
+                try:
+                    event = json.loads(msg["data"])
+                except (TypeError, ValueError):
+                    log.warning("Non-JSON image event: %r", msg.get("data"))
+                    continue
+                if isinstance(event, dict) and event.get("type") in EVENT_TYPES:
+                    _deliver(event)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log.warning("Image events subscription failed: %s", e)
+            await asyncio.sleep(1)
+        finally:
+            try:
+                await pubsub.close()
+            except Exception:
+                pass
+
+async def publish_image_event(event_type: str, image: Dict[str, Any]) -> None:
+    """Publish from the API itself (label edits); falls back to this worker's sockets."""
+    event = {"type": event_type, "image": image}
+    if _redis is not None:
+        try:
+            await _redis.publish(IMAGE_EVENTS_CHANNEL, json.dumps(event))
+            return              # delivered to every worker (us included) by _listen
+        except Exception as e:
+            log.warning("Image event publish to Redis failed, delivering locally: %s", e)
+    _deliver(event)
+
+# ---------------- Socket ----------------
+def _ids(values: Any) -> Set[str]:
+    if not isinstance(values, list):
+        return set()
+    return {str(v) for v in values if v not in (None, "")}
+
+@router.websocket("/trailcams/events")
+async def trailcam_events_ws(
+    ws: WebSocket,
+    camera_id: List[str] = Query(default=[]),
+    property_id: List[str] = Query(default=[]),
+):
+    await ws.accept()
+    sub = _Subscription(_ids(camera_id), _ids(property_id))
+    _connections[ws] = sub
+    log.info("Image events WS connected. total=%d", len(_connections))
+
+    try:
+        await ws.send_json({"type": "hello", "ok": True, "event_types": list(EVENT_TYPES)})
+    except Exception:
+        pass
+
+    sender = asyncio.create_task(_sender(ws, sub.queue))
+
+    async def keepalive():
+        while True:
+            await asyncio.sleep(20)
+            try:
+                sub.queue.put_nowait({"type": "ping"})
+            except asyncio.QueueFull:
+                pass
+
+    ka = asyncio.create_task(keepalive())
+
+    try:
+        while True:
+            text = await ws.receive_text()
+            try:
+                msg = json.loads(text)
+            except ValueError:
+                continue
+            if isinstance(msg, dict) and msg.get("type") == "subscribe":
+                sub.cameras = _ids(msg.get("camera_ids"))
+                sub.properties = _ids(msg.get("property_ids"))
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        ka.cancel()
+        sender.cancel()
+        _connections.pop(ws, None)
+        log.info("Image events WS disconnected. total=%d", len(_connections))
@@ -10,12 +10,13 @@ import logging
 import os
 from typing import Optional
 
-import boto3
-from botocore.client import Config
+from anyio import from_thread
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from elasticsearch import Elasticsearch
 from pydantic import BaseModel
 
+from app.api.trailcam_events import add_event_hook, publish_image_event
+
 logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["trailcams"])
@@ -42,6 +43,9 @@ def _s3_public():
     # If running inside Docker (minio:9000), swap to localhost for browser access
     if endpoint and "minio:" in endpoint:
         endpoint = endpoint.replace("minio:", "localhost:")
+    import boto3  # deferred: keeps API startup light
+    from botocore.client import Config
+
     return boto3.client(
         "s3",
         endpoint_url=endpoint,
@@ -64,6 +68,32 @@ def _presign(s3, key: str, expires: int = 3600) -> Optional[str]:
         return None
 
 
+# Fields echoed in live label_updated events (enough to re-render a tile)
+_TILE_SOURCE = [
+    "camera_id", "camera_name", "property_id", "property_name", "filename", "s3_key",
+    "@timestamp", "has_headshot", "ai_has_animal", "ai_species", "ai_sex", "ai_age_class",
+    "ai_confidence", "human_labeled", "human_species", "human_sex", "human_age_class",
+    "human_antlers", "human_notes", "animal_name", "animal_id",
+    "reid_animal_id", "reid_animal_name", "reid_score",
+    "burst_id", "burst_rep", "burst_size",
+]
+
+_event_s3 = None
+
+
+def _attach_tile_url(event: dict) -> None:
+    """Live image events carry an s3_key; presign it once per API worker."""
+    global _event_s3
+    image = event.get("image") or {}
+    if image.get("s3_key") and not image.get("url"):
+        if _event_s3 is None:
+            _event_s3 = _s3_public()
+        image["url"] = _presign(_event_s3, image["s3_key"])
+
+
+add_event_hook(_attach_tile_url)
+
+
 @router.get("/trailcams")
 def list_trailcams(request: Request, es: Elasticsearch = Depends(_es)):
     """List all trail cameras from ES with location, status, and AI summary stats."""
@@ -113,11 +143,15 @@ def camera_images(
     es: Elasticsearch = Depends(_es),
     limit: int = Query(6, ge=1, le=50),
     animals_only: bool = Query(False),
+    collapse_bursts: bool = Query(False, description="one frame per burst (its representative)"),
 ):
     """Recent AI-analyzed images for a specific camera, with presigned S3 URLs."""
     must_filters: list = [{"term": {"camera_id": camera_id}}]
     if animals_only:
         must_filters.append({"term": {"ai_has_animal": True}})
+    if collapse_bursts:
+        # burst_rep is absent on photos synced before bursts were grouped
+        must_filters.append({"bool": {"must_not": {"term": {"burst_rep": False}}}})
 
     try:
         resp = es.search(
@@ -135,6 +169,8 @@ def camera_images(
                     "human_labeled", "human_species", "human_sex",
                     "human_age_class", "human_antlers", "human_notes",
                     "animal_name", "animal_id",
+                    "reid_animal_id", "reid_animal_name", "reid_score",
+                    "burst_id", "burst_size",
                     "weather.temperature", "weather.wind_speed", "weather.wind_cardinal",
                     "weather.pressure_hpa", "weather.pressure_tendency",
                     "weather.moon_phase", "weather.sun_phase", "weather.label",
@@ -175,6 +211,12 @@ def camera_images(
             "human_notes": src.get("human_notes"),
             "animal_name": src.get("animal_name"),
             "animal_id": src.get("animal_id"),
+            # suggested by worker_app.jobs.reid_cluster; animal_id above is the human label
+            "reid_animal_id": src.get("reid_animal_id"),
+            "reid_animal_name": src.get("reid_animal_name"),
+            "reid_score": src.get("reid_score"),
+            "burst_id": src.get("burst_id"),
+            "burst_size": src.get("burst_size"),
             "weather": src.get("weather"),
         })
 
@@ -300,8 +342,16 @@ def label_image(doc_id: str, body: ImageLabelUpdate, request: Request, es: Elast
         update["animal_id"] = body.animal_id or None
 
     try:
-        es.update(index=IMAGES_INDEX, id=doc_id, doc=update)
+        resp = es.update(index=IMAGES_INDEX, id=doc_id, doc=update, source=_TILE_SOURCE)
     except Exception as exc:
         raise HTTPException(status_code=502, detail=str(exc))
 
+    src = dict((resp.get("get") or {}).get("_source") or {})
+    if "@timestamp" in src:
+        src["timestamp"] = src.pop("@timestamp")
+    try:
+        from_thread.run(publish_image_event, "label_updated", {"id": doc_id, **src})
+    except Exception as exc:
+        logger.warning("label_updated event for %s not published: %s", doc_id, exc)
+
     return {"ok": True, "doc_id": doc_id, "updated": update}
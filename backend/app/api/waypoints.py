@@ -1,14 +1,119 @@
 from __future__ import annotations
-from fastapi import APIRouter
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, HTTPException, Request
+from elasticsearch import Elasticsearch, helpers
+
+from lib.services.geo import WaypointIndex
+from app.api.geo_ws import add_refresh_hook
 
 router = APIRouter()
+log = logging.getLogger("ridgeline.waypoints")
+
+# Hand-placed waypoints (map / GPX) and waypoints synced from OnX
+WAYPOINT_SOURCES = ("waypoints-v1", "onx-waypoints")
+
+# Geo writes in this process invalidate the index immediately; the TTL picks
+# up writes we don't see (OnX sync runs in the sync service).
+INDEX_TTL_SECONDS = float(os.getenv("WAYPOINT_INDEX_TTL_SECONDS", "300"))
+
+_index: Optional[WaypointIndex] = None
+_built_at = 0.0
+# Bumped by every invalidation; a rebuild that started under an older
+# generation may have scanned pre-write data and is not cached.
+_generation = 0
+_lock = threading.Lock()        # guards _index/_built_at/_generation; held briefly
+_build_lock = threading.Lock()  # one ES scan at a time
+
+
+def _load_waypoints(es: Elasticsearch) -> List[Dict[str, Any]]:
+    out: List[Dict[str, Any]] = []
+    for index in WAYPOINT_SOURCES:
+        try:
+            hits = helpers.scan(
+                es,
+                index=index,
+                query={
+                    "query": {"exists": {"field": "location"}},
+                    "_source": ["name", "location", "type", "icon"],
+                },
+                size=1000,
+            )
+            for hit in hits:
+                src = hit.get("_source") or {}
+                loc = src.get("location")
+                if not isinstance(loc, dict):
+                    continue
+                out.append({
+                    "id": hit["_id"],
+                    "name": src.get("name"),
+                    "lat": float(loc["lat"]),
+                    "lon": float(loc["lon"]),
+                    "type": src.get("type") if index == "waypoints-v1" else src.get("icon"),
+                    "source": index,
+                })
+        except Exception as exc:
+            log.warning("Could not load waypoints from %s: %s", index, exc)
+    return out
+
+
+def _fresh() -> Optional[WaypointIndex]:
+    idx = _index
+    if idx is not None and time.monotonic() - _built_at < INDEX_TTL_SECONDS:
+        return idx
+    return None
+
+
+def get_waypoint_index(es: Elasticsearch) -> WaypointIndex:
+    """
+    Return the cached waypoint index, rebuilding it when invalidated or stale.
+
+    A rebuild is a blocking scan of every waypoint: call this from a thread
+    (asyncio.to_thread) when on the event loop.
+    """
+    global _index, _built_at
+    idx = _fresh()
+    if idx is not None:
+        return idx
+    with _build_lock:
+        idx = _fresh()
+        if idx is not None:
+            return idx
+        with _lock:
+            gen = _generation
+        started = time.perf_counter()
+        idx = WaypointIndex(_load_waypoints(es))
+        with _lock:
+            cached = gen == _generation
+            if cached:
+                _index, _built_at = idx, time.monotonic()
+        log.info(
+            "Waypoint index built: %d waypoints in %.0f ms%s",
+            len(idx), (time.perf_counter() - started) * 1000,
+            "" if cached else " (invalidated during build, not cached)",
+        )
+        return idx
+
+
+def invalidate_waypoint_index() -> None:
+    """Called on geo write events; the next lookup rebuilds from ES."""
+    global _index, _generation
+    with _lock:
+        _generation += 1
+        _index = None
+
+
+# Writes made on other API workers reach us as geo events
+add_refresh_hook(invalidate_waypoint_index)
 
-# TODO: replace with your real store (DB or ES query)
-FAKE_WAYPOINTS = [
-    {"id": "wp_1", "name": "North Ridge", "lat": 41.12345, "lon": -96.45678},
-    {"id": "wp_2", "name": "Creek Bottom", "lat": 41.11890, "lon": -96.46123},
-]
 
 @router.get("/waypoints")
-def list_waypoints():
-    return FAKE_WAYPOINTS
+def list_waypoints(request: Request):
+    es = getattr(request.app.state, "es", None)
+    if es is None:
+        raise HTTPException(status_code=503, detail="Elasticsearch not initialized")
+    return get_waypoint_index(es).all()
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import os
 import logging
+import threading
 from typing import Optional
 
 from fastapi import FastAPI, Request
@@ -11,8 +12,12 @@ from elasticsearch import Elasticsearch
 
 # Routers
 from app.api import events, images, waypoints, trailcams, geo, intel, search
+from app.api import geo_ws, trailcam_events
 from app.api.geo_ws import router as geo_ws_router
+from app.api.geo_tiles import router as geo_tiles_router
 from app.api.delete import router as delete_router
+from lib.services import ann_index
+from lib.services.image_embed import warm as warm_clip
 
 logger = logging.getLogger("ridgeline.api")
 
@@ -53,6 +58,63 @@ def _startup() -> None:
         except Exception as exc:
             logger.warning("Elasticsearch ping failed: %s", exc)
 
+@app.on_event("startup")
+def _warm_clip() -> None:
+    # Keep the CLIP text tower resident so /search/visual never pays the load;
+    # loads in the background so startup isn't blocked on model weights.
+    if os.environ.get("CLIP_WARM_ON_STARTUP", "true").lower() != "true":
+        return
+
+    def _run() -> None:
+        try:
+            warm_clip()
+            logger.info("CLIP text encoder loaded")
+        except Exception as exc:
+            logger.warning("CLIP warm-up failed: %s", exc)
+
+    threading.Thread(target=_run, name="clip-warm", daemon=True).start()
+
+# Local ANN index for similar-image queries: (index, watermark field).  The
+# watermark is when the embedding was written, not when the photo was taken,
+# since embeddings are backfilled after ingest.
+ANN_INDICES = (("tactacam-images", "embedded_at"), ("images-v1", "embedded_at"))
+_ann_stop = threading.Event()
+
+@app.on_event("startup")
+def _start_ann() -> None:
+    es = app.state.es
+    if es is None or os.environ.get("ANN_ENABLED", "true").lower() != "true":
+        return
+    for index, watermark_field in ANN_INDICES:
+        ann_index.register(index, watermark_field)
+    threading.Thread(
+        target=ann_index.run_refresh_loop,
+        args=(es, _ann_stop,
+              float(os.environ.get("ANN_REFRESH_SECONDS", "60")),
+              float(os.environ.get("ANN_FULL_REBUILD_SECONDS", "86400"))),
+        name="ann-refresh", daemon=True,
+    ).start()
+
+@app.on_event("shutdown")
+def _stop_ann() -> None:
+    _ann_stop.set()
+
+@app.on_event("startup")
+async def _start_geo_fanout() -> None:
+    await geo_ws.start_fanout()
+
+@app.on_event("shutdown")
+async def _stop_geo_fanout() -> None:
+    await geo_ws.stop_fanout()
+
+@app.on_event("startup")
+async def _start_image_events() -> None:
+    await trailcam_events.start_listener()
+
+@app.on_event("shutdown")
+async def _stop_image_events() -> None:
+    await trailcam_events.stop_listener()
+
 @app.on_event("shutdown")
 def _shutdown() -> None:
     es = getattr(app.state, "es", None)
@@ -64,10 +126,12 @@ def _shutdown() -> None:
 # REST + WS routers
 app.include_router(geo.router, prefix="/api")
 app.include_router(geo_ws_router, prefix="/api/geo")  # /api/geo/ws
+app.include_router(geo_tiles_router, prefix="/api")   # /api/geo/tiles/{z}/{x}/{y}.mvt
 app.include_router(events.router, prefix="/api")
 app.include_router(images.router, prefix="/api")
 app.include_router(waypoints.router, prefix="/api")
 app.include_router(trailcams.router, prefix="/api")
+app.include_router(trailcam_events.router, prefix="/api")  # WS /api/trailcams/events
 app.include_router(delete_router, prefix="/api")
 app.include_router(intel.router, prefix="/api")
 app.include_router(search.router, prefix="/api")
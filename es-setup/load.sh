@@ -33,7 +33,8 @@ curl -sS -o /dev/null -w "  -> tactacam-images mapping: %{http_code}\n" \
     "properties": {
       "ai_notes_semantic":   { "type": "semantic_text", "inference_id": "ridgeline-elser" },
       "ai_antlers_semantic": { "type": "semantic_text", "inference_id": "ridgeline-elser" },
-      "embedding": { "type": "dense_vector", "dims": 512, "index": true, "similarity": "cosine" }
+      "embedding": { "type": "dense_vector", "dims": 512, "index": true, "similarity": "cosine",
+                     "index_options": { "type": "int8_hnsw", "m": 16, "ef_construction": 100 } }
     }
   }'
 
@@ -93,3 +94,5 @@ echo "Done. Next steps:"
 echo "  - Re-run the enrich policy execute after cameras sync to keep lookup index fresh:"
 echo "    POST ${ELASTIC_SEARCH_HOST}/_enrich/policy/camera-metadata-enrich/_execute"
 echo "  - Backfill CLIP embeddings: docker compose exec worker python -m worker_app.jobs.embed_tactacam"
+echo "  - Existing vectors are only quantized once rewritten; migrate with:"
+echo "    docker compose exec worker python -m worker_app.jobs.reindex_vectors --source tactacam-images"
@@ -1,58 +1,137 @@
-import torch, numpy as np
-import PIL.Image as PImage
-import open_clip
-import io
-
-_PROMPTS = [
-    ("buck", "a wildlife photo of a whitetail buck with antlers, outdoors"),
-    ("doe",  "a wildlife photo of a whitetail doe without antlers"),
-    ("fawn", "a wildlife photo of a whitetail fawn"),
-    ("none", "a wildlife photo without any deer")
-]
-
-class CLIPModel:
-    _model = None
-    _preprocess = None
-    _tokenizer = None
-    _device = "cpu"
-
-    @classmethod
-    def load(cls):
-        if cls._model is None:
-            model, _, preprocess = open_clip.create_model_and_transforms("ViT-B-32", pretrained="openai")
-            tokenizer = open_clip.get_tokenizer("ViT-B-32")
-            cls._model = model.eval()
-            cls._preprocess = preprocess
-            cls._tokenizer = tokenizer
-            cls._device = "cuda" if torch.cuda.is_available() else "cpu"
-            cls._model.to(cls._device)
-        return cls._model, cls._preprocess, cls._tokenizer, cls._device
+import json
+import os
+import threading
 
-def image_embedding_and_scores(raw: bytes):
-    model, preprocess, tok, device = CLIPModel.load()
-    img = PImage.open(io.BytesIO(raw)).convert("RGB")
-    img_t = preprocess(img).unsqueeze(0).to(device)
-    # embed image
-    with torch.no_grad():
-        img_feat = model.encode_image(img_t)
-        img_feat = img_feat / img_feat.norm(dim=-1, keepdim=True)
-    embedding = img_feat.squeeze(0).cpu().numpy().astype(np.float32)
-
-    # zero-shot scores
-    texts = tok([p[1] for p in _PROMPTS]).to(device)
-    with torch.no_grad():
-        txt_feat = model.encode_text(texts)
-        txt_feat = txt_feat / txt_feat.norm(dim=-1, keepdim=True)
-        sims = (img_feat @ txt_feat.T).softmax(dim=-1).squeeze(0).cpu().numpy()  # probabilities
-
-    scores = {k: float(sims[i]) for i, (k, _) in enumerate(_PROMPTS)}
-    deer_kind = max(["buck","doe","fawn","none"], key=lambda k: scores[k])
+import numpy as np
+
+from lib.services import clip_backend
+
+MODEL_NAME = "ViT-B-32"
+PRETRAINED = "openai"
+
+# Zero-shot label set: facet -> label -> prompt(s).  Each facet is scored as its
+# own softmax; a label with several prompts uses their mean embedding.  The
+# "deer" facet drives contains_deer / deer_kind and the legacy `scores` field.
+DEFAULT_LABELS = {
+    "deer": {
+        "buck": "a wildlife photo of a whitetail buck with antlers, outdoors",
+        "doe":  "a wildlife photo of a whitetail doe without antlers",
+        "fawn": "a wildlife photo of a whitetail fawn",
+        "none": "a wildlife photo without any deer",
+    },
+    "species": {
+        "deer":    ["a trail camera photo of a deer", "a trail camera photo of a whitetail deer"],
+        "turkey":  "a trail camera photo of a wild turkey",
+        "bear":    "a trail camera photo of a black bear",
+        "coyote":  "a trail camera photo of a coyote",
+        "hog":     "a trail camera photo of a wild hog",
+        "bobcat":  "a trail camera photo of a bobcat",
+        "raccoon": "a trail camera photo of a raccoon",
+        "person":  "a trail camera photo of a person",
+        "empty":   ["a trail camera photo of an empty forest", "a trail camera photo of an empty field",
+                    "a trail camera photo of branches and grass with no animals"],
+    },
+    "sex": {
+        "male":   "a photo of a male deer with antlers",
+        "female": "a photo of a female deer without antlers",
+    },
+    "age": {
+        "fawn":     "a photo of a spotted whitetail fawn",
+        "yearling": "a photo of a young, slender yearling deer",
+        "mature":   "a photo of a large, mature deer with a thick neck and deep chest",
+    },
+    "weather": {
+        "clear": "a trail camera photo on a clear day",
+        "rain":  "a trail camera photo in the rain",
+        "snow":  "a trail camera photo with snow on the ground",
+        "fog":   "a foggy trail camera photo",
+        "night": "a black and white infrared trail camera photo at night",
+    },
+}
+
+# JSON file in the same shape; its facets replace/extend the defaults
+LABELS_FILE = os.getenv("AI_LABELS_FILE")
+LOGIT_SCALE = 100.0  # CLIP's learned temperature
+
+def load_labels(path=LABELS_FILE) -> dict:
+    labels = dict(DEFAULT_LABELS)
+    if path:
+        with open(path) as f:
+            labels.update(json.load(f))
+    return labels
+
+class ZeroShot:
+    """Prompt embeddings for a label set, encoded once; classify() is one matmul per batch."""
+
+    def __init__(self, clip, labels: dict):
+        self.facets = []   # (facet, [labels], slice into self.text)
+        prompts, owner, n = [], [], 0
+        for facet, entries in labels.items():
+            for label, texts in entries.items():
+                for t in [texts] if isinstance(texts, str) else texts:
+                    prompts.append(t)
+                    owner.append(n)
+                n += 1
+            self.facets.append((facet, list(entries), slice(n - len(entries), n)))
+        feats = clip.encode_text(prompts)
+        # mean of each label's (unit) prompt embeddings, renormalized
+        owner = np.asarray(owner)
+        text = np.stack([feats[owner == i].mean(axis=0) for i in range(n)])
+        self.text = (text / np.linalg.norm(text, axis=1, keepdims=True)).astype(np.float32)
+
+    def classify(self, embeddings: np.ndarray) -> list:
+        """(N, D) unit image embeddings -> per image {facet: {label: prob}}."""
+        logits = LOGIT_SCALE * (np.asarray(embeddings, dtype=np.float32) @ self.text.T)
+        out = [{} for _ in range(len(logits))]
+        for facet, names, sl in self.facets:
+            z = logits[:, sl]
+            p = np.exp(z - z.max(axis=1, keepdims=True))
+            p /= p.sum(axis=1, keepdims=True)
+            for row, probs in zip(out, p):
+                row[facet] = {n: round(float(v), 4) for n, v in zip(names, probs)}
+        return out
+
+_zero_shot = {}
+_zero_shot_lock = threading.Lock()
+
+def zero_shot(clip=None) -> ZeroShot:
+    """ZeroShot for the (process-wide) encoder, built on first use."""
+    clip = clip or clip_backend.get(MODEL_NAME, PRETRAINED)
+    zs = _zero_shot.get(id(clip))
+    if zs is None:
+        with _zero_shot_lock:
+            zs = _zero_shot.get(id(clip))
+            if zs is None:
+                zs = _zero_shot[id(clip)] = ZeroShot(clip, load_labels())
+    return zs
+
+def _summarize(embedding, probs: dict) -> dict:
+    scores = probs.get("deer", {})
+    deer_kind = max(scores, key=scores.get) if scores else "none"
     contains_deer = deer_kind != "none"
-    # crude age bucket heuristic
-    if deer_kind == "fawn":
-        age_bucket = "fawn"
-    elif deer_kind == "buck":
-        age_bucket = "mature" if scores["buck"] > 0.65 else "young"
-    else:
+    age = probs.get("age")
+    if not contains_deer:
         age_bucket = "unknown"
-    return embedding, contains_deer, deer_kind if contains_deer else "unknown", age_bucket, scores
+    elif deer_kind == "fawn" or not age:
+        age_bucket = "fawn" if deer_kind == "fawn" else "unknown"
+    else:
+        age_bucket = max(age, key=age.get)
+    return {
+        "embedding": embedding,
+        "contains_deer": contains_deer,
+        "deer_kind": deer_kind if contains_deer else "unknown",
+        "age_bucket": age_bucket,
+        "scores": scores,
+        "labels": {f: max(p, key=p.get) for f, p in probs.items() if f != "deer"},
+        "label_scores": {f: p for f, p in probs.items() if f != "deer"},
+    }
+
+def classify_images(raws: list) -> list:
+    """Embed and zero-shot classify a batch of image bytes in one encoder pass."""
+    clip = clip_backend.get(MODEL_NAME, PRETRAINED)
+    embeddings = clip.encode_bytes(raws)
+    return [_summarize(e, p) for e, p in zip(embeddings, zero_shot(clip).classify(embeddings))]
+
+def image_embedding_and_scores(raw: bytes):
+    r = classify_images([raw])[0]
+    return r["embedding"], r["contains_deer"], r["deer_kind"], r["age_bucket"], r["scores"]
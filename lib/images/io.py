@@ -1,8 +1,9 @@
 import hashlib, io, time
-from typing import Optional, Tuple, Dict, Any
+from typing import TYPE_CHECKING, Optional, Tuple, Dict, Any
 import exifread
 from PIL import Image
-import boto3
+if TYPE_CHECKING:  # boto3 is imported on first use (slow to load)
+    import boto3
 
 def sha256_bytes(b: bytes) -> str:
     h = hashlib.sha256(); h.update(b); return h.hexdigest()
@@ -33,11 +34,12 @@ def parse_exif(raw: bytes) -> Dict[str, Any]:
     if tags.get("Image Model"): out["camera_model"] = str(tags["Image Model"])
     return out
 
-def put_s3_bytes(*, session: boto3.session.Session, bucket: str, key: str, data: bytes, content_type: str):
+def put_s3_bytes(*, session: "boto3.session.Session", bucket: str, key: str, data: bytes, content_type: str):
     s3 = session.client("s3")
     s3.put_object(Bucket=bucket, Key=key, Body=data, ContentType=content_type)
 
 def get_boto_session(endpoint: str, region: str, access_key: str, secret_key: str):
+    import boto3
     return boto3.session.Session(
         aws_access_key_id=access_key,
         aws_secret_access_key=secret_key,
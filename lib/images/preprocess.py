@@ -0,0 +1,140 @@
+"""
+Fast JPEG decode and CLIP preprocessing.
+
+The naive path (Image.open(...).convert("RGB") then open_clip's transform)
+decodes every 1080p/4K trail-cam JPEG at full resolution only to throw ~98%
+of the pixels away.  Here:
+
+  decode()      Image.draft() makes libjpeg decode straight at 1/2, 1/4 or 1/8
+                scale (the smallest that still covers IMAGE_SIZE), then one
+                bicubic resample does resize-shortest-side + center crop via
+                resize(box=...).  Returns uint8 (S, S, 3).
+  normalize()   uint8 (N, S, S, 3) -> float32 (N, 3, S, S) with CLIP mean/std
+                in two vectorized passes, optionally into a preallocated array.
+  Preprocessor  reusable uint8 and float32 batch buffers plus an optional
+                process pool, so backfills decode on every core while the
+                encoder runs.  Workers ship back 150 KB uint8 crops, never
+                full-size pixels.
+
+Non-JPEG images (PNG from uploads) ignore draft() and take the same path at
+full size.  Output matches open_clip's eval transform to within resampling
+noise (DCT scaling is a box filter before the bicubic one).
+"""
+from __future__ import annotations
+
+import io
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Sequence
+
+import numpy as np
+from PIL import Image
+
+log = logging.getLogger(__name__)
+
+IMAGE_SIZE = 224
+MEAN = np.array([0.48145466, 0.4578275, 0.40821073], dtype=np.float32)
+STD = np.array([0.26862954, 0.26130258, 0.27577711], dtype=np.float32)
+# (x/255 - mean)/std folded into one multiply and one subtract, shaped (3, 1, 1)
+_SCALE = (1.0 / (255.0 * STD)).reshape(3, 1, 1)
+_SHIFT = (MEAN / STD).reshape(3, 1, 1)
+
+PREPROCESS_WORKERS = int(os.getenv("PREPROCESS_WORKERS", str(max(1, min(4, (os.cpu_count() or 2) - 1)))))
+
+
+def _crop(img: Image.Image, size: int) -> np.ndarray:
+    """Resize shortest side to `size` and center-crop, in one resample."""
+    img = img.convert("RGB")
+    w, h = img.size
+    scale = size / min(w, h)
+    nw, nh = max(size, round(w * scale)), max(size, round(h * scale))
+    left, top = (nw - size) // 2, (nh - size) // 2
+    box = (left / scale, top / scale, (left + size) / scale, (top + size) / scale)
+    return np.asarray(img.resize((size, size), Image.Resampling.BICUBIC, box=box), dtype=np.uint8)
+
+
+def decode(image_bytes: bytes, size: int = IMAGE_SIZE) -> np.ndarray:
+    """JPEG/PNG bytes -> uint8 (size, size, 3), decoding JPEGs at reduced scale."""
+    img = Image.open(io.BytesIO(image_bytes))
+    img.draft("RGB", (size, size))  # no-op for non-JPEG
+    return _crop(img, size)
+
+
+def from_image(img: Image.Image, size: int = IMAGE_SIZE) -> np.ndarray:
+    """Already-decoded PIL image -> uint8 (size, size, 3)."""
+    return _crop(img, size)
+
+
+def normalize(pixels: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """uint8 (N, S, S, 3) -> float32 (N, 3, S, S) normalized with CLIP mean/std."""
+    chw = pixels.transpose(0, 3, 1, 2)
+    if out is None:
+        out = np.empty(chw.shape, dtype=np.float32)
+    np.multiply(chw, _SCALE, out=out, casting="unsafe")
+    np.subtract(out, _SHIFT, out=out)
+    return out
+
+
+def batch_from_images(images: Sequence[Image.Image], size: int = IMAGE_SIZE) -> np.ndarray:
+    return normalize(np.stack([from_image(img, size) for img in images]))
+
+
+def batch_from_bytes(blobs: Sequence[bytes], size: int = IMAGE_SIZE) -> np.ndarray:
+    """In-process decode + normalize; raises on an undecodable image."""
+    return normalize(np.stack([decode(b, size) for b in blobs]))
+
+
+def _decode_or_none(args: tuple[bytes, int]) -> Optional[np.ndarray]:
+    image_bytes, size = args
+    try:
+        return decode(image_bytes, size)
+    except Exception as exc:
+        log.warning("could not decode image: %s", exc)
+        return None
+
+
+class Preprocessor:
+    """
+    Batch decoder for backfills.  load() fills buffers allocated once up front,
+    so the returned array is overwritten by the next call: encode it first.
+
+        with Preprocessor(batch_size=32) as pre:
+            x, ok = pre.load(blobs)        # x: (ok.sum(), 3, 224, 224)
+    """
+
+    def __init__(self, batch_size: int, workers: int = PREPROCESS_WORKERS, size: int = IMAGE_SIZE):
+        self.batch_size, self.size = batch_size, size
+        self._pixels = np.empty((batch_size, size, size, 3), dtype=np.uint8)
+        self._out = np.empty((batch_size, 3, size, size), dtype=np.float32)
+        self.workers = workers
+        self._pool = ProcessPoolExecutor(max_workers=workers) if workers > 0 else None
+
+    def load(self, blobs: Sequence[bytes]) -> tuple[np.ndarray, np.ndarray]:
+        """Decode up to batch_size images.  Returns (batch, ok mask over blobs)."""
+        if len(blobs) > self.batch_size:
+            raise ValueError(f"{len(blobs)} images > batch_size {self.batch_size}")
+        args = [(b, self.size) for b in blobs]
+        if self._pool:
+            decoded = self._pool.map(_decode_or_none, args, chunksize=max(1, len(args) // (2 * self.workers)))
+        else:
+            decoded = map(_decode_or_none, args)
+        ok = np.zeros(len(blobs), dtype=bool)
+        n = 0
+        for i, pixels in enumerate(decoded):
+            if pixels is not None:
+                self._pixels[n] = pixels
+                ok[i] = True
+                n += 1
+        return normalize(self._pixels[:n], out=self._out[:n]), ok
+
+    def close(self) -> None:
+        if self._pool:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self) -> "Preprocessor":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -9,6 +9,7 @@ MAPPING = {
             "s3_key": {"type": "keyword"},
             "sha256": {"type": "keyword"},
             "ingested_at": {"type": "date"},
+            "embedded_at": {"type": "date"},  # ANN refresh watermark
             "source_type": {"type": "keyword"},  # trail_camera | cell_phone | digital_camera
             "timestamp": {"type": "date"},
             "gps": {"type": "geo_point"},
@@ -38,7 +39,10 @@ MAPPING = {
                             "fawn": {"type": "float"},
                             "none": {"type": "float"}
                         }
-                    }
+                    },
+                    # top label per zero-shot facet (species, sex, age, weather, ...)
+                    "labels": {"type": "flattened"},
+                    "label_scores": {"type": "object", "enabled": False}
                 }
             },
             # Vector for ANN search (ViT-B/32 => 512 dims)
@@ -46,7 +50,8 @@ MAPPING = {
                 "type": "dense_vector",
                 "dims": 512,
                 "index": True,
-                "similarity": "cosine"
+                "similarity": "cosine",
+                "index_options": {"type": "int8_hnsw"}
             }
         }
     }
@@ -0,0 +1,408 @@
+"""
+Local approximate-nearest-neighbour index over image embeddings.
+
+"More like this" against ES costs a GET for the source vector plus a kNN
+search with num_candidates >= 100.  This keeps every image's (unit-normalised)
+embedding in a memory-mapped float32 matrix on local disk and answers
+similarity queries in process, so the only ES call left is one mget to hydrate
+the page — and a cold or busy cluster doesn't slow the similar-images panel.
+
+Layout per index, under ANN_DIR/<index>/gen-<n>/:
+    vectors.f32   row-major (count, dim) float32, appended in place
+    ids.txt       one ES _id per row
+    assign.npy    IVF list of every row
+    centroids.npy IVF centroids (absent while the index is small)
+    meta.json     count, dim, watermark, trained_count
+
+Search is exact below IVF_MIN_ROWS rows; above that rows are grouped into
+~sqrt(N) inverted lists by spherical k-means and a query scans the NPROBE
+closest lists.  New vectors are assigned to the nearest existing centroid;
+the centroids are retrained once the index has grown by RETRAIN_GROWTH.
+
+Refresh is incremental: only documents whose watermark field is newer than
+the stored watermark are fetched.  A periodic full rebuild into a fresh
+generation directory picks up deletions and documents without the watermark
+field.  Several API workers can share ANN_DIR: writes happen under an
+exclusive file lock and readers reload when another process moves the index
+forward.
+"""
+from __future__ import annotations
+import fcntl
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from elasticsearch import Elasticsearch, helpers
+
+from lib.services.vector_codec import decode_vector
+
+log = logging.getLogger("ann_index")
+
+ANN_DIR = os.getenv("ANN_DIR", "/tmp/ridgeline-ann")
+IVF_MIN_ROWS = int(os.getenv("ANN_IVF_MIN_ROWS", "20000"))
+NPROBE = int(os.getenv("ANN_NPROBE", "8"))
+RETRAIN_GROWTH = float(os.getenv("ANN_RETRAIN_GROWTH", "0.5"))
+KMEANS_ITERS = 10
+KMEANS_SAMPLE = 50000
+BLOCK_ROWS = 16384
+
+
+def _normalize(m: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(m, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (m / norms).astype(np.float32, copy=False)
+
+
+def _assign(vecs: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    out = np.empty(vecs.shape[0], dtype=np.int32)
+    for start in range(0, vecs.shape[0], BLOCK_ROWS):
+        block = np.asarray(vecs[start:start + BLOCK_ROWS])
+        out[start:start + BLOCK_ROWS] = (block @ centroids.T).argmax(axis=1)
+    return out
+
+
+def train_centroids(vecs: np.ndarray, nlist: int, seed: int = 0) -> np.ndarray:
+    """Spherical k-means on (a sample of) unit vectors."""
+    rng = np.random.default_rng(seed)
+    n = vecs.shape[0]
+    sample = np.asarray(vecs[np.sort(rng.choice(n, size=min(n, KMEANS_SAMPLE), replace=False))])
+    centroids = sample[rng.choice(sample.shape[0], size=nlist, replace=False)].copy()
+    for _ in range(KMEANS_ITERS):
+        labels = _assign(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, sample)
+        empty = np.bincount(labels, minlength=nlist) == 0
+        # re-seed empty lists from random points so every list stays useful
+        sums[empty] = sample[rng.choice(sample.shape[0], size=int(empty.sum()))]
+        centroids = _normalize(sums)
+    return centroids
+
+
+class AnnIndex:
+    def __init__(self, index: str, watermark_field: str, dim: int = 512, base_dir: str = ANN_DIR):
+        self.index = index
+        self.watermark_field = watermark_field
+        self.dim = dim
+        self.root = os.path.join(base_dir, index)
+        os.makedirs(self.root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._gen: Optional[str] = None
+        self._count = 0
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._vecs: Optional[np.memmap] = None
+        self._centroids: Optional[np.ndarray] = None
+        self._assign = np.empty(0, dtype=np.int32)
+        self._order = np.empty(0, dtype=np.int64)
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self.watermark: Optional[str] = None
+        self._trained_count = 0
+        self.built_at = 0.0
+        self.refreshed_at = 0.0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, doc_id: str) -> bool:
+        with self._lock:
+            return doc_id in self._rows
+
+    def stats(self) -> dict:
+        return {
+            "index": self.index, "rows": self._count, "generation": self._gen,
+            "lists": 0 if self._centroids is None else int(self._centroids.shape[0]),
+            "watermark": self.watermark, "refreshed_at": self.refreshed_at,
+        }
+
+    # ---------------- Disk ----------------
+    def _gen_dir(self, gen: str) -> str:
+        return os.path.join(self.root, gen)
+
+    def _current_gen(self) -> Optional[str]:
+        try:
+            with open(os.path.join(self.root, "CURRENT")) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _read_meta(self, gen: str) -> Optional[dict]:
+        try:
+            with open(os.path.join(self._gen_dir(gen), "meta.json")) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write_meta(self, gen: str) -> None:
+        meta = {
+            "count": self._count, "dim": self.dim, "watermark": self.watermark,
+            "trained_count": self._trained_count, "built_at": self.built_at,
+        }
+        path = os.path.join(self._gen_dir(gen), "meta.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(meta, f)
+        os.replace(path + ".tmp", path)
+
+    def _map(self, gen: str, count: int) -> Optional[np.memmap]:
+        if count == 0:
+            return None
+        return np.memmap(os.path.join(self._gen_dir(gen), "vectors.f32"),
+                         dtype=np.float32, mode="r+", shape=(count, self.dim))
+
+    def _load(self) -> None:
+        """(Re)load the current generation if another process moved it forward."""
+        gen = self._current_gen()
+        if gen is None:
+            return
+        meta = self._read_meta(gen)
+        if meta is None or (gen == self._gen and meta["count"] == self._count
+                            and meta.get("watermark") == self.watermark):
+            return
+        d = self._gen_dir(gen)
+        with open(os.path.join(d, "ids.txt")) as f:
+            ids = f.read().split("\n")[:meta["count"]]
+        self._gen = gen
+        self._count = meta["count"]
+        self._ids = ids
+        self._rows = {doc_id: i for i, doc_id in enumerate(ids)}
+        self._vecs = self._map(gen, self._count)
+        self.watermark = meta.get("watermark")
+        self._trained_count = meta.get("trained_count", 0)
+        self.built_at = meta.get("built_at", 0.0)
+        cpath = os.path.join(d, "centroids.npy")
+        self._centroids = np.load(cpath) if os.path.exists(cpath) else None
+        apath = os.path.join(d, "assign.npy")
+        self._assign = np.load(apath) if os.path.exists(apath) else np.zeros(self._count, dtype=np.int32)
+        self._reindex_lists()
+        log.info("ANN %s: loaded %d vectors (gen %s)", self.index, self._count, gen)
+
+    def _reindex_lists(self) -> None:
+        if self._centroids is None:
+            self._order = np.empty(0, dtype=np.int64)
+            self._offsets = np.zeros(1, dtype=np.int64)
+            return
+        self._order = np.argsort(self._assign, kind="stable")
+        self._offsets = np.searchsorted(self._assign[self._order], np.arange(self._centroids.shape[0] + 1))
+
+    # ---------------- Build / refresh ----------------
+    def _fetch(self, es: Elasticsearch, since: Optional[str]):
+        query = {"exists": {"field": "embedding"}}
+        if since is not None:
+            query = {"bool": {"filter": [query, {"range": {self.watermark_field: {"gte": since}}}]}}
+        for hit in helpers.scan(es, index=self.index, size=1000,
+                                query={"query": query, "_source": ["embedding", self.watermark_field]}):
+            src = hit.get("_source") or {}
+            vec = decode_vector(src.get("embedding"))
+            if vec.shape != (self.dim,):
+                continue
+            yield hit["_id"], vec, src.get(self.watermark_field)
+
+    def _maybe_train(self, gen: str) -> None:
+        if self._count < IVF_MIN_ROWS:
+            return
+        if self._centroids is not None and self._count < self._trained_count * (1 + RETRAIN_GROWTH):
+            return
+        nlist = max(16, int(np.sqrt(self._count)))
+        t0 = time.perf_counter()
+        self._centroids = train_centroids(self._vecs, nlist)
+        self._assign = _assign(self._vecs, self._centroids)
+        self._trained_count = self._count
+        np.save(os.path.join(self._gen_dir(gen), "centroids.npy"), self._centroids)
+        log.info("ANN %s: trained %d lists over %d vectors in %.1fs",
+                 self.index, nlist, self._count, time.perf_counter() - t0)
+
+    def _apply(self, gen: str, batch: List[Tuple[str, np.ndarray, Optional[str]]]) -> int:
+        """Append new ids / overwrite re-embedded ones in the given generation."""
+        d = self._gen_dir(gen)
+        new_ids, new_vecs, updated = [], [], []
+        for doc_id, vec, wm in batch:
+            if wm is not None and (self.watermark is None or str(wm) > self.watermark):
+                self.watermark = str(wm)
+            row = self._rows.get(doc_id)
+            if row is None:
+                self._rows[doc_id] = self._count + len(new_ids)
+                new_ids.append(doc_id)
+                new_vecs.append(vec)
+            elif not np.allclose(self._vecs[row], _normalize(vec[None, :])[0], atol=1e-6):
+                updated.append((row, vec))
+        if new_ids:
+            with open(os.path.join(d, "vectors.f32"), "ab") as f:
+                f.write(_normalize(np.stack(new_vecs)).tobytes())
+            with open(os.path.join(d, "ids.txt"), "a") as f:
+                f.write("".join(i + "\n" for i in new_ids))
+            self._ids.extend(new_ids)
+            self._count += len(new_ids)
+            self._vecs = self._map(gen, self._count)
+        for row, vec in updated:
+            self._vecs[row] = _normalize(vec[None, :])[0]
+        if self._vecs is not None:
+            self._vecs.flush()
+
+        if self._centroids is not None and (new_ids or updated):
+            grown = np.zeros(self._count, dtype=np.int32)
+            grown[:self._assign.shape[0]] = self._assign
+            rows = np.asarray([r for r, _ in updated] + list(range(self._count - len(new_ids), self._count)))
+            grown[rows] = _assign(self._vecs[rows], self._centroids)
+            self._assign = grown
+        self._maybe_train(gen)
+        if self._centroids is not None:
+            np.save(os.path.join(d, "assign.npy"), self._assign)
+        self._reindex_lists()
+        return len(new_ids) + len(updated)
+
+    def _locked(self):
+        return open(os.path.join(self.root, ".lock"), "w")
+
+    _STATE = ("_gen", "_count", "_ids", "_rows", "_vecs", "_centroids", "_assign", "_order",
+              "_offsets", "watermark", "_trained_count", "built_at", "refreshed_at")
+
+    def rebuild(self, es: Elasticsearch, max_age_s: Optional[float] = None) -> int:
+        """
+        Full build into a new generation, then switch CURRENT to it.  With
+        max_age_s, skip if any process has rebuilt more recently than that.
+        Queries keep using the previous generation until the switch.
+        """
+        with self._locked() as lockf:
+            fcntl.flock(lockf, fcntl.LOCK_EX)
+            with self._lock:
+                self._load()
+            if max_age_s is not None and self.built_at and time.time() - self.built_at < max_age_s:
+                return self._count
+
+            old = self._current_gen()
+            fresh = AnnIndex(self.index, self.watermark_field, dim=self.dim, base_dir=os.path.dirname(self.root))
+            gen = f"gen-{int(time.time() * 1000)}"
+            os.makedirs(fresh._gen_dir(gen))
+            open(os.path.join(fresh._gen_dir(gen), "vectors.f32"), "wb").close()
+            open(os.path.join(fresh._gen_dir(gen), "ids.txt"), "w").close()
+            fresh._gen = gen
+            t0 = time.perf_counter()
+            batch: List[Tuple[str, np.ndarray, Optional[str]]] = []
+            for item in fresh._fetch(es, None):
+                batch.append(item)
+                if len(batch) >= 5000:
+                    fresh._apply(gen, batch)
+                    batch = []
+            fresh._apply(gen, batch)
+            fresh.built_at = fresh.refreshed_at = time.time()
+            fresh._write_meta(gen)
+            with open(os.path.join(self.root, "CURRENT.tmp"), "w") as f:
+                f.write(gen)
+            os.replace(os.path.join(self.root, "CURRENT.tmp"), os.path.join(self.root, "CURRENT"))
+
+            with self._lock:
+                for attr in self._STATE:
+                    setattr(self, attr, getattr(fresh, attr))
+            if old and old != gen:
+                # other processes keep their mappings of the old files until they reload
+                shutil.rmtree(self._gen_dir(old), ignore_errors=True)
+            log.info("ANN %s: built %d vectors in %.1fs", self.index, self._count, time.perf_counter() - t0)
+            return self._count
+
+    def refresh(self, es: Elasticsearch) -> int:
+        """Pull documents embedded since the watermark. Returns rows added or changed."""
+        if self._current_gen() is None:
+            return self.rebuild(es)
+        with self._locked() as lockf:
+            fcntl.flock(lockf, fcntl.LOCK_EX)
+            with self._lock:
+                self._load()
+            batch = list(self._fetch(es, self.watermark))
+            changed = 0
+            if batch:
+                with self._lock:
+                    changed = self._apply(self._gen, batch)
+                    if changed:
+                        self._write_meta(self._gen)
+            self.refreshed_at = time.time()
+            if changed:
+                log.info("ANN %s: %d vectors added/updated (total %d)", self.index, changed, self._count)
+            return changed
+
+    def reload(self) -> None:
+        with self._lock:
+            self._load()
+
+    # ---------------- Query ----------------
+    def vector(self, doc_id: str) -> Optional[np.ndarray]:
+        """Stored vector for doc_id, or None if it isn't (yet) in the mapped rows."""
+        # _apply adds to _rows before remapping _vecs: read both under the lock
+        with self._lock:
+            row, vecs = self._rows.get(doc_id), self._vecs
+        if row is None or vecs is None or row >= vecs.shape[0]:
+            return None
+        return np.array(vecs[row])
+
+    def search(self, query: np.ndarray, k: int, exclude: Optional[str] = None,
+               nprobe: int = NPROBE) -> List[Tuple[str, float]]:
+        """Top-k (doc_id, cosine similarity), best first."""
+        with self._lock:
+            vecs, ids, centroids = self._vecs, self._ids, self._centroids
+            order, offsets = self._order, self._offsets
+        if vecs is None:
+            return []
+        q = _normalize(np.asarray(query, dtype=np.float32).reshape(1, -1))[0]
+        if centroids is None:
+            rows = None
+            sims = np.concatenate([np.asarray(vecs[s:s + BLOCK_ROWS]) @ q
+                                   for s in range(0, vecs.shape[0], BLOCK_ROWS)])
+        else:
+            probes = np.argsort(centroids @ q)[::-1][:max(1, nprobe)]
+            rows = np.concatenate([order[offsets[p]:offsets[p + 1]] for p in probes])
+            rows.sort()                  # sequential reads from the memmap
+            sims = np.asarray(vecs[rows]) @ q
+        want = min(k + 1, sims.shape[0])
+        if want == 0:
+            return []
+        top = np.argpartition(-sims, want - 1)[:want]
+        top = top[np.argsort(-sims[top])]
+        out = []
+        for t in top:
+            doc_id = ids[int(t if rows is None else rows[t])]
+            if doc_id == exclude:
+                continue
+            out.append((doc_id, float(sims[t])))
+        return out[:k]
+
+
+# ---------------- Registry / background refresh ----------------
+_indices: Dict[str, AnnIndex] = {}
+
+
+def register(index: str, watermark_field: str, dim: int = 512) -> AnnIndex:
+    if index not in _indices:
+        _indices[index] = AnnIndex(index, watermark_field, dim=dim)
+    return _indices[index]
+
+
+def get(index: str) -> Optional[AnnIndex]:
+    """The ANN index for `index` if it has been built, else None."""
+    ann = _indices.get(index)
+    return ann if ann is not None and len(ann) else None
+
+
+def all_stats() -> List[dict]:
+    return [ann.stats() for ann in _indices.values()]
+
+
+def run_refresh_loop(es: Elasticsearch, stop: threading.Event, interval_s: float, full_rebuild_s: float) -> None:
+    """Background thread body: incremental refresh, periodic full rebuild."""
+    for ann in _indices.values():
+        try:
+            ann.reload()
+        except Exception as e:
+            log.warning("ANN %s: could not load from disk: %s", ann.index, e)
+    while not stop.is_set():
+        for ann in list(_indices.values()):
+            try:
+                if ann.built_at and time.time() - ann.built_at >= full_rebuild_s:
+                    ann.rebuild(es, max_age_s=full_rebuild_s)
+                else:
+                    ann.refresh(es)
+            except Exception as e:
+                log.warning("ANN %s refresh failed: %s", ann.index, e)
+        stop.wait(interval_s)
@@ -0,0 +1,153 @@
+"""
+Pluggable CLIP inference backends.
+
+Every CLIP caller (image_embed, lib.images.ai, embed_tactacam, enrich) goes
+through get(model, pretrained), which returns a process-wide encoder:
+
+  torch  open_clip in eager PyTorch (default)
+  onnx   the same weights exported to ONNX (worker_app.jobs.export_clip_onnx)
+         and run with ONNX Runtime; no torch import for image embeddings
+  onnx-int8  as onnx, with the dynamically int8-quantized image tower
+
+CLIP_BACKEND          torch | onnx | onnx-int8
+CLIP_ONNX_DIR         export root, one <model>-<pretrained>/ dir per model
+CLIP_ONNX_THREADS     ORT intra-op threads (0 = one per physical core)
+
+Both backends return L2-normalized float32 numpy rows and share one image
+preprocessing path (lib.images.preprocess: reduced-scale JPEG decode, bicubic
+resize, center crop, CLIP mean/std), so they differ only in the model; the
+export job checks end-to-end cosine against torch before an export is used.
+encode_batch takes an already preprocessed (N, 3, 224, 224) array, which is
+what backfills feed from a preprocess.Preprocessor.  Text still needs
+open_clip's tokenizer, so encode_text imports it on first use.
+
+If the ONNX files are missing, get() logs it and falls back to torch.
+"""
+from __future__ import annotations
+
+import abc
+import logging
+import os
+import threading
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+from lib.images import preprocess
+from lib.images.preprocess import IMAGE_SIZE
+
+log = logging.getLogger(__name__)
+
+BACKEND = os.getenv("CLIP_BACKEND", "torch").lower()
+ONNX_DIR = os.getenv("CLIP_ONNX_DIR", "/models/clip-onnx")
+ONNX_THREADS = int(os.getenv("CLIP_ONNX_THREADS", "0"))
+
+
+def _unit(m: np.ndarray) -> np.ndarray:
+    m = np.asarray(m, dtype=np.float32)
+    return m / np.maximum(np.linalg.norm(m, axis=-1, keepdims=True), 1e-12)
+
+
+class _Encoder(abc.ABC):
+    @abc.abstractmethod
+    def encode_batch(self, batch: np.ndarray) -> np.ndarray:
+        """Preprocessed (N, 3, S, S) float32 -> (N, D) unit embeddings."""
+
+    def encode_images(self, images: Sequence[Image.Image]) -> np.ndarray:
+        return self.encode_batch(preprocess.batch_from_images(images))
+
+    def encode_bytes(self, blobs: Sequence[bytes]) -> np.ndarray:
+        return self.encode_batch(preprocess.batch_from_bytes(blobs))
+
+
+def model_dir(model: str, pretrained: str) -> str:
+    return os.path.join(ONNX_DIR, f"{model}-{pretrained}")
+
+
+class TorchClip(_Encoder):
+    name = "torch"
+
+    def __init__(self, model: str, pretrained: str):
+        import open_clip
+        import torch
+
+        self._torch = torch
+        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        m, _, _ = open_clip.create_model_and_transforms(model, pretrained=pretrained)
+        self._model = m.eval().to(self.device)
+        self._tok = open_clip.get_tokenizer(model)
+
+    def encode_batch(self, batch: np.ndarray) -> np.ndarray:
+        with self._torch.inference_mode():
+            x = self._torch.from_numpy(np.ascontiguousarray(batch)).to(self.device)
+            return _unit(self._model.encode_image(x).float().cpu().numpy())
+
+    def encode_text(self, texts: Sequence[str]) -> np.ndarray:
+        with self._torch.inference_mode():
+            return _unit(self._model.encode_text(self._tok(list(texts)).to(self.device)).float().cpu().numpy())
+
+
+class OnnxClip(_Encoder):
+    name = "onnx"
+
+    def __init__(self, model: str, pretrained: str, int8: bool = False, threads: Optional[int] = None):
+        import onnxruntime as ort
+
+        # read at call time so a caller (clip_bench --threads) can override it
+        threads = ONNX_THREADS if threads is None else threads
+
+        self.model, self.dir = model, model_dir(model, pretrained)
+        visual = os.path.join(self.dir, "visual.int8.onnx" if int8 else "visual.onnx")
+        if not os.path.exists(visual):
+            raise FileNotFoundError(visual)
+        self.name = "onnx-int8" if int8 else "onnx"
+        self._opts = ort.SessionOptions()
+        self._opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self._opts.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        self._opts.inter_op_num_threads = 1
+        if threads:
+            self._opts.intra_op_num_threads = threads
+        self._ort = ort
+        self._visual = ort.InferenceSession(visual, self._opts, providers=["CPUExecutionProvider"])
+        self._textual = None
+        self._tok = None
+
+    def encode_batch(self, batch: np.ndarray) -> np.ndarray:
+        return _unit(self._visual.run(None, {"image": np.ascontiguousarray(batch, dtype=np.float32)})[0])
+
+    def encode_text(self, texts: Sequence[str]) -> np.ndarray:
+        if self._textual is None:
+            import open_clip
+
+            self._tok = open_clip.get_tokenizer(self.model)
+            self._textual = self._ort.InferenceSession(
+                os.path.join(self.dir, "textual.onnx"), self._opts, providers=["CPUExecutionProvider"])
+        tokens = np.asarray(self._tok(list(texts)), dtype=np.int64)
+        return _unit(self._textual.run(None, {"text": tokens})[0])
+
+
+_cache: Dict[Tuple[str, str, str], object] = {}
+_lock = threading.Lock()
+
+
+def get(model: str = "ViT-B-32", pretrained: str = "laion2b_s34b_b79k", backend: Optional[str] = None):
+    """Shared encoder for (backend, model, pretrained); backend defaults to CLIP_BACKEND."""
+    backend = (backend or BACKEND).lower()
+    key = (backend, model, pretrained)
+    enc = _cache.get(key)
+    if enc is None:
+        with _lock:
+            enc = _cache.get(key)
+            if enc is None:
+                if backend in ("onnx", "onnx-int8"):
+                    try:
+                        enc = OnnxClip(model, pretrained, int8=backend == "onnx-int8")
+                    except Exception as exc:
+                        log.warning("ONNX CLIP %s/%s unavailable (%s); using torch", model, pretrained, exc)
+                if enc is None:
+                    enc = TorchClip(model, pretrained)
+                log.info("CLIP %s/%s loaded on %s backend", model, pretrained, enc.name)
+                _cache[key] = enc
+    return enc
+
@@ -1,8 +1,12 @@
 import math
-from typing import List, Optional, Dict, Any, Tuple
+from collections import defaultdict
+from typing import Iterable, List, Optional, Dict, Any, Tuple
+
+EARTH_RADIUS_M = 6371000.0
+M_PER_DEG_LAT = math.pi * EARTH_RADIUS_M / 180.0
 
 def haversine_m(lat1, lon1, lat2, lon2) -> float:
-    R = 6371000.0
+    R = EARTH_RADIUS_M
     p1, p2 = math.radians(lat1), math.radians(lat2)
     dphi = math.radians(lat2 - lat1)
     dlmb = math.radians(lon2 - lon1)
@@ -19,3 +23,105 @@ def nearest_waypoint(lat: float, lon: float, waypoints: List[Dict[str, Any]], ma
     if best is None or best_d > max_m:
         return None, None
     return best, best_d
+
+
+class WaypointIndex:
+    """
+    In-memory spatial index over waypoints ({"id", "lat", "lon", ...} dicts).
+
+    Points are bucketed into a uniform lat/lon grid of roughly `cell_m` metres.
+    A radius query only visits the cells overlapping the query circle, so an
+    attach lookup touches a handful of candidates instead of every stand,
+    blind and plot on the property.
+    """
+
+    def __init__(self, waypoints: Iterable[Dict[str, Any]], cell_m: float = 250.0):
+        self.cell_m = cell_m
+        self._cell_deg = cell_m / M_PER_DEG_LAT
+        self._cells: Dict[Tuple[int, int], List[Dict[str, Any]]] = defaultdict(list)
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        self._n = 0  # points in the grid, including any without an id
+        for w in waypoints:
+            self.add(w)
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return math.floor(lat / self._cell_deg), math.floor(lon / self._cell_deg)
+
+    def add(self, w: Dict[str, Any]) -> None:
+        """Insert one waypoint (used to dedupe against points seen earlier in a batch)."""
+        if w.get("lat") is None or w.get("lon") is None:
+            return
+        self._cells[self._cell(w["lat"], w["lon"])].append(w)
+        self._n += 1
+        if w.get("id"):
+            self._by_id[w["id"]] = w
+
+    def get(self, waypoint_id: str) -> Optional[Dict[str, Any]]:
+        return self._by_id.get(waypoint_id)
+
+    def all(self) -> List[Dict[str, Any]]:
+        return list(self._by_id.values())
+
+    def within(self, lat: float, lon: float, max_m: float) -> List[Tuple[Dict[str, Any], float]]:
+        """All waypoints within max_m metres, nearest first."""
+        cy, cx = self._cell(lat, lon)
+        # latitude only spans 180 degrees, so clamp before ceil (max_m may be inf)
+        dy = math.ceil(min(max_m / self.cell_m, 90 / self._cell_deg + 1))
+        # Longitude cells shrink with latitude; size the window for the
+        # poleward edge of the circle so nothing inside it is missed.
+        edge_lat = min(abs(lat) + max_m / M_PER_DEG_LAT, 89.9)
+        dx = math.ceil(min(max_m / (self.cell_m * math.cos(math.radians(edge_lat))), 180 / self._cell_deg))
+
+        # A huge radius would walk billions of empty cells; once the window
+        # has more cells than the grid has occupied ones, scan those instead.
+        if (2 * dy + 1) * (2 * dx + 1) > len(self._cells):
+            cells = self._cells.values()
+        else:
+            cells = (self._cells.get((y, x), ())
+                     for y in range(cy - dy, cy + dy + 1)
+                     for x in range(cx - dx, cx + dx + 1))
+
+        out: List[Tuple[Dict[str, Any], float]] = []
+        for cell in cells:
+            for w in cell:
+                d = haversine_m(lat, lon, w["lat"], w["lon"])
+                if d <= max_m:
+                    out.append((w, d))
+        out.sort(key=lambda wd: wd[1])
+        return out
+
+    def in_bbox(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> List[Dict[str, Any]]:
+        """All waypoints inside a lat/lon box (e.g. a map tile)."""
+        y0, x0 = self._cell(min_lat, min_lon)
+        y1, x1 = self._cell(max_lat, max_lon)
+        # a low-zoom box covers far more cells than are occupied: scan those
+        if (y1 - y0 + 1) * (x1 - x0 + 1) > len(self._cells):
+            cells = self._cells.values()
+        else:
+            cells = (self._cells.get((y, x), ()) for y in range(y0, y1 + 1) for x in range(x0, x1 + 1))
+        return [w for cell in cells for w in cell
+                if min_lat <= w["lat"] <= max_lat and min_lon <= w["lon"] <= max_lon]
+
+    def nearest(self, lat: float, lon: float, max_m: float = 150.0) -> Tuple[Optional[Dict[str, Any]], Optional[float]]:
+        """Drop-in for nearest_waypoint(): (waypoint, metres) or (None, None)."""
+        hits = self.within(lat, lon, max_m)
+        return hits[0] if hits else (None, None)
+
+    def k_nearest(self, lat: float, lon: float, k: int, max_m: Optional[float] = None) -> List[Tuple[Dict[str, Any], float]]:
+        """The k nearest waypoints (optionally bounded by max_m), nearest first."""
+        if max_m is not None:
+            return self.within(lat, lon, max_m)[:k]
+        if k >= self._n:
+            # every point is wanted: no radius can do better than one scan
+            return self.within(lat, lon, math.inf)[:k]
+        # Grow the search radius until it holds k points; everything within
+        # radius r is exact, so the first k of that set are the k nearest.
+        radius = self.cell_m
+        while True:
+            hits = self.within(lat, lon, radius)
+            if len(hits) >= k or len(hits) == self._n or radius > math.pi * EARTH_RADIUS_M:
+                return hits[:k]
+            radius *= 4
@@ -0,0 +1,221 @@
+"""
+Streaming GPX / KML / KMZ / GeoJSON readers.
+
+Features are yielded one at a time while the file is read, and parsed XML
+elements are detached from their parent as soon as they have been consumed,
+so memory tracks the current feature, not the file: a multi-season GPS log
+never sits in memory as a full element tree.  Track vertices are kept
+as flat `array('d')` buffers ([lon0, lat0, lon1, lat1, ...]) — 16 bytes a
+vertex instead of a list of two boxed floats — and are only expanded to
+GeoJSON lists when a track is actually written out.
+
+Feature shapes:
+    {"kind": "wpt", "name": str | None, "lon": float, "lat": float}
+    {"kind": "trk", "name": str | None, "coords": array('d')}
+
+These functions block; callers on an event loop should run them in a thread.
+Malformed input raises ValueError.
+"""
+from __future__ import annotations
+import json
+import zipfile
+import xml.etree.ElementTree as ET
+from array import array
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _child_text(elem: ET.Element, name: str) -> Optional[str]:
+    for child in elem:
+        if _local(child.tag) == name:
+            return child.text
+    return None
+
+
+def _wpt(name: Optional[str], lon: float, lat: float) -> Dict[str, Any]:
+    return {"kind": "wpt", "name": name, "lon": lon, "lat": lat}
+
+
+def _trk(name: Optional[str], coords: array) -> Dict[str, Any]:
+    return {"kind": "trk", "name": name, "coords": coords}
+
+
+# ---------------- GPX ----------------
+_GPX_POINTS = frozenset(("trkpt", "rtept"))
+
+def iter_gpx(stream: BinaryIO) -> Iterator[Dict[str, Any]]:
+    # Open elements, root first.  A consumed element is detached from its
+    # parent as soon as it ends, so neither a long trkseg nor the root ever
+    # accumulates finished children.
+    stack: List[ET.Element] = []
+    coords: Optional[array] = None
+    try:
+        for event, elem in ET.iterparse(stream, events=("start", "end")):
+            tag = _local(elem.tag)
+            if event == "start":
+                stack.append(elem)
+                if tag == "trk":
+                    coords = array("d")
+                continue
+
+            stack.pop()
+            if tag == "trkpt" and coords is not None:
+                coords.append(float(elem.get("lon")))
+                coords.append(float(elem.get("lat")))
+            elif tag == "wpt":
+                yield _wpt(_child_text(elem, "name"), float(elem.get("lon")), float(elem.get("lat")))
+            elif tag == "trk":
+                if coords:
+                    yield _trk(_child_text(elem, "name"), coords)
+                coords = None
+            if stack and (len(stack) == 1 or tag in _GPX_POINTS):
+                # a top-level element (wpt, trk, rte, metadata...) or a point
+                stack[-1].remove(elem)
+    except ET.ParseError as e:
+        raise ValueError(f"Invalid GPX: {e}")
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid GPX coordinates: {e}")
+
+
+# ---------------- KML / KMZ ----------------
+def _kml_coords(text: str) -> array:
+    out = array("d")
+    for tup in text.split():
+        lon, lat, *_ = tup.split(",")
+        out.append(float(lon))
+        out.append(float(lat))
+    return out
+
+
+_KML_CONTAINERS = frozenset(("kml", "Document", "Folder"))
+
+
+def _find_first(elem: ET.Element, name: str) -> Optional[ET.Element]:
+    for e in elem.iter():
+        if _local(e.tag) == name:
+            return e
+    return None
+
+
+def iter_kml(stream: BinaryIO) -> Iterator[Dict[str, Any]]:
+    # Same open-element stack as iter_gpx: anything that ends directly under
+    # a container (Placemarks, Styles, nested Folders) is detached from it,
+    # however deeply the Folders nest.
+    stack: List[ET.Element] = []
+    try:
+        for event, elem in ET.iterparse(stream, events=("start", "end")):
+            if event == "start":
+                stack.append(elem)
+                continue
+            stack.pop()
+
+            if _local(elem.tag) == "Placemark":
+                name = _child_text(elem, "name")
+                pt = _find_first(elem, "Point")
+                line = _find_first(elem, "LineString")
+                pt_coords = _child_text(pt, "coordinates") if pt is not None else None
+                line_coords = _child_text(line, "coordinates") if line is not None else None
+                if pt_coords and pt_coords.strip():
+                    c = _kml_coords(pt_coords)
+                    yield _wpt(name, c[0], c[1])
+                elif line_coords and line_coords.strip():
+                    c = _kml_coords(line_coords)
+                    if c:
+                        yield _trk(name, c)
+            if stack and _local(stack[-1].tag) in _KML_CONTAINERS:
+                stack[-1].remove(elem)
+    except ET.ParseError as e:
+        raise ValueError(f"Invalid KML: {e}")
+    except (IndexError, ValueError) as e:
+        raise ValueError(f"Invalid KML coordinates: {e}")
+
+
+def iter_kmz(stream: BinaryIO) -> Iterator[Dict[str, Any]]:
+    try:
+        zf = zipfile.ZipFile(stream)
+    except zipfile.BadZipFile as e:
+        raise ValueError(f"Invalid KMZ: {e}")
+    with zf:
+        names = [n for n in zf.namelist() if n.lower().endswith(".kml")]
+        if not names:
+            raise ValueError("Invalid KMZ: no .kml document inside archive")
+        # doc.kml is the conventional root document
+        names.sort(key=lambda n: (n.lower() != "doc.kml", n.count("/"), n))
+        with zf.open(names[0]) as kml:
+            yield from iter_kml(kml)
+
+
+# ---------------- GeoJSON ----------------
+def _flat(points: List[List[float]]) -> array:
+    out = array("d")
+    for p in points:
+        out.append(float(p[0]))
+        out.append(float(p[1]))
+    return out
+
+
+def iter_geojson(stream: BinaryIO) -> Iterator[Dict[str, Any]]:
+    # The stdlib has no incremental JSON reader; GeoJSON exports are usually
+    # modest, and coordinates are still compacted feature by feature.
+    try:
+        data = json.load(stream)
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid GeoJSON: {e}")
+    if not isinstance(data, dict):
+        raise ValueError("Invalid GeoJSON: expected an object")
+
+    if data.get("type") == "FeatureCollection":
+        features = data.get("features") or []
+    elif data.get("type") == "Feature":
+        features = [data]
+    else:
+        features = [{"type": "Feature", "geometry": data, "properties": {}}]
+
+    try:
+        for f in features:
+            geom = f.get("geometry") or {}
+            name = (f.get("properties") or {}).get("name")
+            gtype, coords = geom.get("type"), geom.get("coordinates")
+            if gtype == "Point":
+                yield _wpt(name, float(coords[0]), float(coords[1]))
+            elif gtype == "MultiPoint":
+                for c in coords:
+                    yield _wpt(name, float(c[0]), float(c[1]))
+            elif gtype == "LineString" and coords:
+                yield _trk(name, _flat(coords))
+            elif gtype == "MultiLineString":
+                for part in coords:
+                    if part:
+                        yield _trk(name, _flat(part))
+    except (IndexError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid GeoJSON coordinates: {e}")
+
+
+# ---------------- Dispatch / output ----------------
+def iter_features(stream: BinaryIO, filename: str) -> Iterator[Dict[str, Any]]:
+    """Pick a reader from the file extension and stream its features."""
+    name = (filename or "").lower()
+    if name.endswith(".gpx"):
+        return iter_gpx(stream)
+    if name.endswith(".kml"):
+        return iter_kml(stream)
+    if name.endswith(".kmz"):
+        return iter_kmz(stream)
+    if name.endswith((".geojson", ".json")):
+        return iter_geojson(stream)
+    raise ValueError("Unsupported file type. Use .gpx, .kml, .kmz or .geojson.")
+
+
+def line_coordinates(coords: array) -> List[List[float]]:
+    """Flat [lon, lat, ...] buffer -> GeoJSON [[lon, lat], ...]."""
+    return [[coords[i], coords[i + 1]] for i in range(0, len(coords), 2)]
+
+
+def to_geojson(feat: Dict[str, Any]) -> Dict[str, Any]:
+    if feat["kind"] == "wpt":
+        geometry = {"type": "Point", "coordinates": [feat["lon"], feat["lat"]]}
+    else:
+        geometry = {"type": "LineString", "coordinates": line_coordinates(feat["coords"])}
+    return {"type": "Feature", "geometry": geometry, "properties": {"name": feat["name"], "kind": feat["kind"]}}
@@ -0,0 +1,69 @@
+"""
+Vectorized (NumPy) polyline helpers.
+
+Douglas–Peucker simplification for track LODs and vector tiles.  Point-to-
+waypoint matching goes through lib.services.geo.WaypointIndex, whose grid
+only visits nearby candidates.
+
+Coordinates are [lon, lat] degrees, tolerances metres.
+"""
+from __future__ import annotations
+
+import numpy as np
+
+from lib.services.geo import EARTH_RADIUS_M
+
+
+def simplify_mask(xy: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Douglas–Peucker over planar (n, 2) coordinates: boolean mask of the
+    vertices to keep.  Endpoints are always kept.
+    """
+    n = xy.shape[0]
+    keep = np.zeros(n, dtype=bool)
+    if n == 0:
+        return keep
+    keep[0] = keep[-1] = True
+    if tolerance <= 0:
+        keep[:] = True
+        return keep
+
+    stack = [(0, n - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        seg = xy[end] - xy[start]
+        rel = xy[start + 1:end] - xy[start]
+        seg_len = np.hypot(seg[0], seg[1])
+        if seg_len == 0.0:
+            d = np.hypot(rel[:, 0], rel[:, 1])
+        else:
+            d = np.abs(seg[0] * rel[:, 1] - seg[1] * rel[:, 0]) / seg_len
+        i = int(d.argmax())
+        if d[i] > tolerance:
+            mid = start + 1 + i
+            keep[mid] = True
+            stack.append((start, mid))
+            stack.append((mid, end))
+    return keep
+
+
+def simplify_line(coords, tolerance_m: float) -> np.ndarray:
+    """
+    Douglas–Peucker simplification of a [lon, lat] polyline.
+
+    `coords` is anything reshapeable to (n, 2) — a flat array('d') buffer or a
+    GeoJSON coordinate list.  Distances are measured in a local equirectangular
+    projection (metres), which is accurate at track scale.  Returns an (m, 2)
+    array; endpoints are always kept.
+    """
+    pts = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    if pts.shape[0] <= 2 or tolerance_m <= 0:
+        return pts
+
+    m_per_deg = np.pi * EARTH_RADIUS_M / 180.0
+    xy = np.empty_like(pts)
+    xy[:, 0] = pts[:, 0] * m_per_deg * np.cos(np.radians(pts[:, 1].mean()))
+    xy[:, 1] = pts[:, 1] * m_per_deg
+    return pts[simplify_mask(xy, tolerance_m)]
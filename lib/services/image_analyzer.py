@@ -1,11 +1,14 @@
 from typing import Optional, Dict
 from .image_embed import embed_image_bytes
-from .vision_provider_openai import OpenAIVision
-from .vision_provider_local_zero import LocalZeroVision
 
 async def _provider():
     import os
-    return OpenAIVision() if os.getenv("OPENAI_API_KEY") else LocalZeroVision()
+    # providers import their clients on first use, not when the worker starts
+    if os.getenv("OPENAI_API_KEY"):
+        from .vision_provider_openai import OpenAIVision
+        return OpenAIVision()
+    from .vision_provider_local_zero import LocalZeroVision
+    return LocalZeroVision()
 
 async def analyze_bytes(image_bytes: bytes, *, prompt_hint: Optional[str] = None) -> Dict:
     provider = await _provider()
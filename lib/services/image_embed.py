@@ -1,24 +1,56 @@
-import io
-import torch
-import open_clip
-from PIL import Image
-
-_MODEL = None
-_PRE = None
-
-def _load():
-    global _MODEL, _PRE
-    if _MODEL is None:
-        _MODEL, _, _PRE = open_clip.create_model_and_transforms(
-            "ViT-B-32", pretrained="laion2b_s34b_b79k"
-        )
-        _MODEL.eval()
-
-@torch.inference_mode()
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+from lib.services import clip_backend
+
+# Must match the model that wrote `embedding` (worker_app.jobs.embed_tactacam)
+MODEL_NAME = "ViT-B-32"
+PRETRAINED = "laion2b_s34b_b79k"
+
+# Text queries are short and repetitive (saved searches, autocomplete), so
+# their embeddings are kept in an LRU keyed by the normalized query.
+TEXT_CACHE_SIZE = int(os.getenv("CLIP_TEXT_CACHE_SIZE", "4096"))
+
+_text_cache: "OrderedDict[str, list]" = OrderedDict()
+_text_cache_lock = threading.Lock()
+
+def _clip():
+    """Encoder on the configured backend (CLIP_BACKEND, see clip_backend)."""
+    return clip_backend.get(MODEL_NAME, PRETRAINED)
+
+def warm() -> None:
+    """Load the model and run one text pass so the first real query is fast."""
+    embed_text("a trail camera photo")
+
 def embed_image_bytes(image_bytes: bytes) -> list:
-    _load()
-    img = Image.open(io.BytesIO(image_bytes)).convert("RGB")
-    t = _PRE(img).unsqueeze(0)
-    feats = _MODEL.encode_image(t)
-    feats = feats / feats.norm(dim=-1, keepdim=True)
-    return feats[0].cpu().numpy().tolist()  # len=512
+    return _clip().encode_bytes([image_bytes])[0].tolist()  # len=512
+
+def embed_text(text: str) -> list:
+    """CLIP text-tower embedding in the same space as embed_image_bytes (text → image kNN)."""
+    return _clip().encode_text([text])[0].tolist()  # len=512
+
+def normalize_query(text: str) -> str:
+    """Cache key for a text query: NFKC, case-folded, single-spaced."""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", text)).strip().casefold()
+
+def embed_query(text: str) -> tuple:
+    """embed_text through the LRU cache. Returns (embedding, was_cached)."""
+    key = normalize_query(text)
+    with _text_cache_lock:
+        hit = _text_cache.get(key)
+        if hit is not None:
+            _text_cache.move_to_end(key)
+            return hit, True
+    vec = embed_text(key)
+    with _text_cache_lock:
+        _text_cache[key] = vec
+        _text_cache.move_to_end(key)
+        while len(_text_cache) > TEXT_CACHE_SIZE:
+            _text_cache.popitem(last=False)
+    return vec, False
+
+def text_cache_size() -> int:
+    return len(_text_cache)
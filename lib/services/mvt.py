@@ -0,0 +1,331 @@
+"""
+Minimal Mapbox Vector Tile (MVT 2.1) encoder.
+
+Just enough protobuf to write Tile/Layer/Feature messages for points,
+linestrings and polygons, with clipping to the (buffered) tile and
+per-zoom Douglas–Peucker simplification in tile space.  Avoids pulling
+protobuf + shapely into the API image for what is a few hundred lines of
+wire format.
+
+Geometries are GeoJSON-style dicts in lon/lat (Point, MultiPoint,
+LineString, MultiLineString, Polygon, MultiPolygon).
+"""
+from __future__ import annotations
+import math
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from lib.services.geo_vec import simplify_mask
+
+EXTENT = 4096
+BUFFER = 64                      # tile units kept past each edge
+SIMPLIFY_TOLERANCE = 4.0         # tile units (~0.5px on a 512px tile)
+
+_POINT, _LINESTRING, _POLYGON = 1, 2, 3
+_MOVE_TO, _LINE_TO, _CLOSE_PATH = 1, 2, 7
+
+
+# ---------------- Tile math ----------------
+def tile_bounds(z: int, x: int, y: int, buffer: int = BUFFER) -> Tuple[float, float, float, float]:
+    """(min_lon, min_lat, max_lon, max_lat) of a tile, grown by `buffer` tile units."""
+    n = 2 ** z
+    pad = buffer / EXTENT
+
+    def lon(tx: float) -> float:
+        return tx / n * 360.0 - 180.0
+
+    def lat(ty: float) -> float:
+        ty = min(max(ty, 0.0), float(n))
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * ty / n))))
+
+    return (max(lon(x - pad), -180.0), lat(y + 1 + pad), min(lon(x + 1 + pad), 180.0), lat(y - pad))
+
+
+def project(coords, z: int, x: int, y: int) -> np.ndarray:
+    """[[lon, lat(, alt)], ...] -> (n, 2) float tile coordinates (y down)."""
+    pts = np.asarray(coords, dtype=np.float64)
+    pts = pts.reshape(-1, pts.shape[-1])[:, :2]
+    n = 2 ** z
+    lat = np.radians(np.clip(pts[:, 1], -85.05112878, 85.05112878))
+    out = np.empty_like(pts)
+    out[:, 0] = ((pts[:, 0] + 180.0) / 360.0 * n - x) * EXTENT
+    out[:, 1] = ((1.0 - np.log(np.tan(lat) + 1.0 / np.cos(lat)) / math.pi) / 2.0 * n - y) * EXTENT
+    return out
+
+
+# ---------------- Clipping ----------------
+def _clip_polyline(xy: np.ndarray, lo: float, hi: float) -> List[np.ndarray]:
+    """Split a polyline into the parts inside the square [lo, hi]² (Liang–Barsky per segment)."""
+    parts: List[np.ndarray] = []
+    current: List[Tuple[float, float]] = []
+    for i in range(len(xy) - 1):
+        x0, y0 = xy[i]
+        x1, y1 = xy[i + 1]
+        dx, dy = x1 - x0, y1 - y0
+        t0, t1 = 0.0, 1.0
+        visible = True
+        for p, q in ((-dx, x0 - lo), (dx, hi - x0), (-dy, y0 - lo), (dy, hi - y0)):
+            if p == 0:
+                if q < 0:
+                    visible = False
+                    break
+                continue
+            r = q / p
+            if p < 0:
+                if r > t1:
+                    visible = False
+                    break
+                t0 = max(t0, r)
+            else:
+                if r < t0:
+                    visible = False
+                    break
+                t1 = min(t1, r)
+        if not visible:
+            if current:
+                parts.append(np.asarray(current))
+                current = []
+            continue
+        a = (x0 + t0 * dx, y0 + t0 * dy)
+        b = (x0 + t1 * dx, y0 + t1 * dy)
+        if not current:
+            current.append(a)
+        current.append(b)
+        if t1 < 1.0:                      # segment leaves the box
+            parts.append(np.asarray(current))
+            current = []
+    if current:
+        parts.append(np.asarray(current))
+    return parts
+
+
+def _clip_ring(xy: np.ndarray, lo: float, hi: float) -> np.ndarray:
+    """Sutherland–Hodgman clip of a closed ring against the square [lo, hi]²."""
+    ring = [tuple(p) for p in xy]
+    for axis, bound, keep_below in ((0, lo, False), (0, hi, True), (1, lo, False), (1, hi, True)):
+        if not ring:
+            break
+        inside = (lambda p: p[axis] <= bound) if keep_below else (lambda p: p[axis] >= bound)
+        out = []
+        prev = ring[-1]
+        for cur in ring:
+            if inside(cur):
+                if not inside(prev):
+                    out.append(_intersect(prev, cur, axis, bound))
+                out.append(cur)
+            elif inside(prev):
+                out.append(_intersect(prev, cur, axis, bound))
+            prev = cur
+        ring = out
+    return np.asarray(ring, dtype=np.float64).reshape(-1, 2)
+
+
+def _intersect(a, b, axis: int, bound: float) -> Tuple[float, float]:
+    t = (bound - a[axis]) / (b[axis] - a[axis])
+    return (a[0] + t * (b[0] - a[0]), a[1] + t * (b[1] - a[1]))
+
+
+# ---------------- Geometry encoding ----------------
+def _zigzag(v: int) -> int:
+    return (v << 1) if v >= 0 else ((-v) << 1) - 1
+
+
+def _quantize(xy: np.ndarray) -> np.ndarray:
+    """Round to integer tile units and drop consecutive duplicates."""
+    q = np.rint(xy).astype(np.int64)
+    if len(q) < 2:
+        return q
+    keep = np.ones(len(q), dtype=bool)
+    keep[1:] = np.any(q[1:] != q[:-1], axis=1)
+    return q[keep]
+
+
+def _signed_area(ring: np.ndarray) -> float:
+    x, y = ring[:, 0], ring[:, 1]
+    return float(np.sum(x * np.roll(y, -1) - np.roll(x, -1) * y)) / 2.0
+
+
+class _Cursor:
+    def __init__(self):
+        self.x = 0
+        self.y = 0
+        self.cmds: List[int] = []
+
+    def move_to(self, pts: Sequence[Sequence[int]]):
+        self.cmds.append(_MOVE_TO | (len(pts) << 3))
+        self._params(pts)
+
+    def line_to(self, pts: Sequence[Sequence[int]]):
+        self.cmds.append(_LINE_TO | (len(pts) << 3))
+        self._params(pts)
+
+    def close(self):
+        self.cmds.append(_CLOSE_PATH | (1 << 3))
+
+    def _params(self, pts):
+        for px, py in pts:
+            px, py = int(px), int(py)
+            self.cmds.append(_zigzag(px - self.x))
+            self.cmds.append(_zigzag(py - self.y))
+            self.x, self.y = px, py
+
+
+def encode_geometry(geometry: Dict[str, Any], z: int, x: int, y: int) -> Optional[Tuple[int, List[int]]]:
+    """GeoJSON geometry -> (MVT geom type, command integers), or None if nothing lands in the tile."""
+    gtype = geometry.get("type")
+    coords = geometry.get("coordinates")
+    if not coords:
+        return None
+    lo, hi = -BUFFER, EXTENT + BUFFER
+    cur = _Cursor()
+
+    if gtype in ("Point", "MultiPoint"):
+        pts = project([coords] if gtype == "Point" else coords, z, x, y)
+        inside = np.all((pts >= lo) & (pts <= hi), axis=1)
+        q = np.rint(pts[inside]).astype(np.int64)
+        if not len(q):
+            return None
+        cur.move_to(q)
+        return _POINT, cur.cmds
+
+    if gtype in ("LineString", "MultiLineString"):
+        lines = [coords] if gtype == "LineString" else coords
+        for line in lines:
+            if len(line) < 2:
+                continue
+            for part in _clip_polyline(project(line, z, x, y), lo, hi):
+                part = part[simplify_mask(part, SIMPLIFY_TOLERANCE)]
+                q = _quantize(part)
+                if len(q) < 2:
+                    continue
+                cur.move_to(q[:1])
+                cur.line_to(q[1:])
+        return (_LINESTRING, cur.cmds) if cur.cmds else None
+
+    if gtype in ("Polygon", "MultiPolygon"):
+        polys = [coords] if gtype == "Polygon" else coords
+        for rings in polys:
+            for i, ring in enumerate(rings):
+                if len(ring) < 4:
+                    continue
+                xy = _clip_ring(project(ring, z, x, y), lo, hi)
+                if len(xy) < 3:
+                    if i == 0:
+                        break          # exterior gone: skip the holes too
+                    continue
+                xy = np.vstack([xy, xy[:1]])
+                xy = xy[simplify_mask(xy, SIMPLIFY_TOLERANCE)]
+                q = _quantize(xy)
+                if len(q) > 1 and np.array_equal(q[0], q[-1]):
+                    q = q[:-1]
+                if len(q) < 3:
+                    if i == 0:
+                        break
+                    continue
+                # Exterior rings have positive area in tile space (y down),
+                # interior rings negative.
+                area = _signed_area(q)
+                if area == 0:
+                    continue
+                if (area > 0) != (i == 0):
+                    q = q[::-1]
+                cur.move_to(q[:1])
+                cur.line_to(q[1:])
+                cur.close()
+        return (_POLYGON, cur.cmds) if cur.cmds else None
+
+    return None
+
+
+# ---------------- Protobuf writer ----------------
+def _varint(v: int) -> bytes:
+    out = bytearray()
+    while True:
+        b = v & 0x7F
+        v >>= 7
+        if v:
+            out.append(b | 0x80)
+        else:
+            out.append(b)
+            return bytes(out)
+
+
+def _field(num: int, wire: int) -> bytes:
+    return _varint((num << 3) | wire)
+
+
+def _bytes_field(num: int, payload: bytes) -> bytes:
+    return _field(num, 2) + _varint(len(payload)) + payload
+
+
+def _packed(num: int, values: Iterable[int]) -> bytes:
+    return _bytes_field(num, b"".join(_varint(v) for v in values))
+
+
+def _value(v: Any) -> bytes:
+    if isinstance(v, bool):
+        return _field(7, 0) + _varint(int(v))
+    if isinstance(v, int):
+        if v >= 0:
+            return _field(5, 0) + _varint(v)                         # uint_value
+        return _field(6, 0) + _varint(_zigzag(v))                  # sint_value
+    if isinstance(v, float):
+        return _field(3, 1) + np.float64(v).tobytes()              # double_value (little-endian)
+    return _bytes_field(1, str(v).encode("utf-8"))                 # string_value
+
+
+class Layer:
+    """Collects features for one named MVT layer."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._features: List[bytes] = []
+        self._keys: Dict[str, int] = {}
+        self._values: Dict[Tuple[type, Any], int] = {}
+
+    def __len__(self) -> int:
+        return len(self._features)
+
+    def _tag(self, key: str, value: Any) -> Tuple[int, int]:
+        k = self._keys.setdefault(key, len(self._keys))
+        v = self._values.setdefault((type(value), value), len(self._values))
+        return k, v
+
+    def add(self, geometry: Dict[str, Any], properties: Dict[str, Any], z: int, x: int, y: int,
+            feature_id: Optional[int] = None) -> bool:
+        encoded = encode_geometry(geometry, z, x, y)
+        if encoded is None:
+            return False
+        gtype, cmds = encoded
+        tags: List[int] = []
+        for key, value in properties.items():
+            if value is None or isinstance(value, (dict, list, tuple)):
+                continue
+            tags.extend(self._tag(key, value))
+        msg = b""
+        if feature_id is not None:
+            msg += _field(1, 0) + _varint(feature_id)
+        if tags:
+            msg += _packed(2, tags)
+        msg += _field(3, 0) + _varint(gtype)
+        msg += _packed(4, cmds)
+        self._features.append(msg)
+        return True
+
+    def encode(self) -> bytes:
+        msg = _field(15, 0) + _varint(2)
+        msg += _bytes_field(1, self.name.encode("utf-8"))
+        for f in self._features:
+            msg += _bytes_field(2, f)
+        for k in self._keys:
+            msg += _bytes_field(3, k.encode("utf-8"))
+        for (_, v) in self._values:
+            msg += _bytes_field(4, _value(v))
+        msg += _field(5, 0) + _varint(EXTENT)
+        return msg
+
+
+def encode_tile(layers: Iterable[Layer]) -> bytes:
+    """Serialize non-empty layers into a Tile message."""
+    return b"".join(_bytes_field(3, layer.encode()) for layer in layers if len(layer))
@@ -0,0 +1,47 @@
+"""
+Wire encoding for `embedding` dense vectors.
+
+A 512-dim float32 vector written as a JSON list costs ~5–6 KB of decimal text
+per document and dominates bulk payloads.  Elasticsearch (8.19+ / Serverless)
+also accepts a dense_vector as a base64 string of big-endian float32 values:
+2 KB raw, ~2.7 KB encoded, no float formatting or parsing on either side.
+
+EMBEDDING_WIRE_FORMAT selects what writers send:
+  base64  — compact string (default)
+  floats  — plain JSON list, for clusters older than 8.19
+
+Readers should always go through decode_vector(), which accepts both forms,
+since an index can hold a mix of documents written either way.
+"""
+from __future__ import annotations
+import base64
+import os
+from typing import Any, List, Sequence, Union
+
+import numpy as np
+
+WIRE_FORMAT = os.getenv("EMBEDDING_WIRE_FORMAT", "base64").lower()
+
+_BE_F32 = np.dtype(">f4")
+
+
+def to_base64(vec: Union[Sequence[float], np.ndarray]) -> str:
+    return base64.b64encode(np.asarray(vec, dtype=_BE_F32).tobytes()).decode("ascii")
+
+
+def from_base64(s: str) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(s), dtype=_BE_F32).astype(np.float32)
+
+
+def encode_vector(vec: Union[Sequence[float], np.ndarray]) -> Union[str, List[float]]:
+    """Vector -> the configured wire form for indexing."""
+    if WIRE_FORMAT == "base64":
+        return to_base64(vec)
+    return np.asarray(vec, dtype=np.float32).tolist()
+
+
+def decode_vector(value: Any) -> np.ndarray:
+    """`embedding` as read from _source (list or base64 string) -> float32 array."""
+    if isinstance(value, str):
+        return from_base64(value)
+    return np.asarray(value, dtype=np.float32)
@@ -18,12 +18,20 @@ GPT returns structured JSON:
 
 Results written to:
   ai_species, ai_sex, ai_age_class, ai_labels (list), ai_confidence, ai_analyzed_at
+
+Photos first pass the local pre-filter (sync.prefilter); frames it judges
+empty are recorded with ai_has_animal=false and never reach vision.
+
+Only burst representatives (see sync.bursts) go to vision; the other frames of
+a burst get a copy of the representative's result with ai_burst_source set to
+the doc it came from.
 """
 import base64
 import io
 import json
 import logging
 import os
+from collections import defaultdict
 from datetime import datetime, timezone
 
 import boto3
@@ -31,6 +39,9 @@ import requests
 from botocore.client import Config
 from elasticsearch import Elasticsearch, helpers
 
+from .events import TILE_FIELDS, publish_image_events, tile
+from .prefilter import PREFILTER_MODE, PREFILTER_THRESHOLD, Decision, screen
+
 logger = logging.getLogger(__name__)
 
 IMAGES_INDEX = "tactacam-images"
@@ -39,6 +50,14 @@ OPENAI_ENDPOINT = "https://api.openai.com/v1/chat/completions"
 VISION_MODEL = os.getenv("OPENAI_VISION_MODEL", "gpt-4.1-mini")
 BATCH_SIZE = int(os.getenv("AI_ANALYSIS_BATCH_SIZE", "20"))
 MIN_CONFIDENCE = float(os.getenv("AI_MIN_CONFIDENCE", "0.4"))
+# Rough per-image vision cost, for the pre-filter's cost-saved estimate
+VISION_COST_PER_IMAGE = float(os.getenv("VISION_COST_PER_IMAGE_USD", "0.0005"))
+
+# Fields copied from an analyzed burst frame to its siblings
+AI_FIELDS = (
+    "ai_analyzed_at", "ai_has_animal", "ai_species", "ai_sex", "ai_age_class",
+    "ai_antlers", "ai_confidence", "ai_labels", "ai_notes",
+)
 
 SYSTEM_PROMPT = (
     "You are a wildlife identification assistant for trail-camera images. "
@@ -73,17 +92,20 @@ def _s3():
 
 
 def _unanalyzed_docs(es: Elasticsearch, batch: int) -> list[dict]:
-    """Return docs that haven't been AI-analyzed yet (ai_species absent)."""
+    """Return burst representatives (or unbursted docs) that haven't been AI-analyzed yet."""
     resp = es.search(
         index=IMAGES_INDEX,
         body={
             "size": batch,
-            "query": {"bool": {"must_not": {"term": {"ai_analyzed": True}}}},
+            "query": {"bool": {"must_not": [
+                {"term": {"ai_analyzed": True}},
+                {"term": {"burst_rep": False}},   # siblings get the representative's result
+            ]}},
             "sort": [
                 {"has_headshot": "desc"},   # Tactacam-flagged animal shots first
                 {"@timestamp": "desc"},
             ],
-            "_source": ["s3_key", "filename", "camera_name"],
+            "_source": list(TILE_FIELDS),
         },
     )
     return resp["hits"]["hits"]
@@ -150,6 +172,88 @@ def _build_update(result: dict) -> dict:
     return update
 
 
+def _copy_to_siblings(es: Elasticsearch, limit: int) -> tuple[int, list[dict]]:
+    """
+    Give unanalyzed burst siblings the result of an analyzed frame from the
+    same burst.  A burst whose representative failed analysis gets its
+    earliest waiting sibling promoted to representative for the next batch.
+    Returns (docs copied, their tiles).
+    """
+    resp = es.search(
+        index=IMAGES_INDEX,
+        body={
+            "size": limit,
+            "query": {"bool": {
+                "filter": [{"term": {"burst_rep": False}}],
+                "must_not": [{"term": {"ai_analyzed": True}}],
+            }},
+            "sort": [{"@timestamp": "asc"}],
+            "_source": list(TILE_FIELDS) + ["burst_id"],
+        },
+    )
+    siblings = resp["hits"]["hits"]
+    burst_ids = sorted({h["_source"]["burst_id"] for h in siblings if h["_source"].get("burst_id")})
+    if not burst_ids:
+        return 0, []
+
+    # One analyzed, error-free frame per burst, plus bursts still waiting on their representative
+    sources = es.search(
+        index=IMAGES_INDEX,
+        body={
+            "size": len(burst_ids),
+            "query": {"bool": {
+                "filter": [{"terms": {"burst_id": burst_ids}}, {"term": {"ai_analyzed": True}}],
+                "must_not": [{"exists": {"field": "ai_error"}}],
+            }},
+            "collapse": {"field": "burst_id"},
+            "_source": list(AI_FIELDS) + ["burst_id"],
+        },
+    )["hits"]["hits"]
+    by_burst = {h["_source"]["burst_id"]: h for h in sources}
+    waiting = es.search(
+        index=IMAGES_INDEX,
+        body={
+            "size": 0,
+            "query": {"bool": {
+                "filter": [{"terms": {"burst_id": burst_ids}}, {"term": {"burst_rep": True}}],
+                "must_not": [{"term": {"ai_analyzed": True}}],
+            }},
+            "aggs": {"bursts": {"terms": {"field": "burst_id", "size": len(burst_ids)}}},
+        },
+    )
+    pending = {b["key"] for b in waiting["aggregations"]["bursts"]["buckets"]}
+
+    ops, tiles, promoted = [], [], set()
+    for hit in siblings:
+        burst_id = hit["_source"].get("burst_id")
+        source = by_burst.get(burst_id)
+        if source is not None:
+            copied = {k: source["_source"].get(k) for k in AI_FIELDS}
+            copied.update(ai_analyzed=True, ai_burst_source=source["_id"])
+            ops.append({"_op_type": "update", "_index": IMAGES_INDEX, "_id": hit["_id"], "doc": copied})
+            tiles.append(tile(hit["_id"], {**hit["_source"], **copied}))
+        elif burst_id not in pending and burst_id not in promoted:
+            promoted.add(burst_id)
+            ops.append({"_op_type": "update", "_index": IMAGES_INDEX, "_id": hit["_id"], "doc": {"burst_rep": True}})
+    if ops:
+        helpers.bulk(es, ops)
+    if promoted:
+        logger.info("Promoted a new representative for %d bursts whose analysis failed", len(promoted))
+    return len(tiles), tiles
+
+
+def _skipped_update(decision: Decision) -> dict:
+    """Result recorded for a photo the pre-filter kept away from vision."""
+    return {
+        "ai_analyzed": True,
+        "ai_analyzed_at": datetime.now(timezone.utc).isoformat(),
+        "ai_has_animal": False,
+        "ai_labels": [],
+        "ai_tier": f"{decision.tier}_skip",
+        "prefilter_score": decision.score,
+    }
+
+
 def run_analysis(batch_size: int = BATCH_SIZE) -> dict:
     """
     Analyze one batch of unprocessed images. Returns summary stats.
@@ -160,25 +264,69 @@ def run_analysis(batch_size: int = BATCH_SIZE) -> dict:
 
     docs = _unanalyzed_docs(es, batch_size)
     if not docs:
-        logger.info("No unanalyzed images found")
-        return {"analyzed": 0, "animals": 0, "errors": 0}
-
-    logger.info("Analyzing %d images with %s", len(docs), VISION_MODEL)
-
-    stats = {"analyzed": 0, "animals": 0, "errors": 0}
+        copied, tiles = _copy_to_siblings(es, batch_size * 10)
+        publish_image_events("analysis_complete", tiles)
+        if not copied:
+            logger.info("No unanalyzed images found")
+        return {"analyzed": 0, "animals": 0, "errors": 0, "burst_copies": copied}
+
+    stats = {
+        "analyzed": 0, "animals": 0, "errors": 0, "burst_copies": 0,
+        "vision_calls": 0, "skipped": 0, "tiers": defaultdict(int),
+    }
     bulk_updates = []
-
+    analyzed_tiles = []
+
+    def _failed(doc_id: str, exc: Exception) -> None:
+        # Mark as analyzed with error so we don't retry forever
+        bulk_updates.append({
+            "_op_type": "update",
+            "_index": IMAGES_INDEX,
+            "_id": doc_id,
+            "doc": {
+                "ai_analyzed": True,
+                "ai_analyzed_at": datetime.now(timezone.utc).isoformat(),
+                "ai_error": str(exc),
+            },
+        })
+        stats["errors"] += 1
+
+    fetched = []
     for hit in docs:
+        src = hit["_source"]
+        try:
+            fetched.append((hit, _fetch_image(s3, src.get("s3_key"))))
+        except Exception as exc:
+            logger.error("Fetch failed for %s (%s): %s", src.get("filename", hit["_id"]), src.get("camera_name", "?"), exc)
+            _failed(hit["_id"], exc)
+
+    decisions = screen([(hit["_source"], image_bytes) for hit, image_bytes in fetched])
+    logger.info(
+        "Analyzing %d images: %d to %s after pre-filter",
+        len(fetched), sum(d.to_vision for d in decisions), VISION_MODEL,
+    )
+
+    for (hit, image_bytes), decision in zip(fetched, decisions):
         doc_id = hit["_id"]
         src = hit["_source"]
-        s3_key = src.get("s3_key")
         camera = src.get("camera_name", "?")
         filename = src.get("filename", doc_id)
+        stats["tiers"][decision.tier if decision.to_vision else f"{decision.tier}_skip"] += 1
+
+        if not decision.to_vision:
+            update = _skipped_update(decision)
+            bulk_updates.append({"_op_type": "update", "_index": IMAGES_INDEX, "_id": doc_id, "doc": update})
+            analyzed_tiles.append(tile(doc_id, {**src, **update}))
+            stats["analyzed"] += 1
+            stats["skipped"] += 1
+            logger.debug("Pre-filtered: [%s] %s (score=%s)", camera, filename, decision.score)
+            continue
 
         try:
-            image_bytes = _fetch_image(s3, s3_key)
+            stats["vision_calls"] += 1
             result = _call_vision(image_bytes)
             update = _build_update(result)
+            update.update(ai_tier=decision.tier, prefilter_score=decision.score)
 
             bulk_updates.append({
                 "_op_type": "update",
@@ -186,6 +334,7 @@ def run_analysis(batch_size: int = BATCH_SIZE) -> dict:
                 "_id": doc_id,
                 "doc": update,
             })
+            analyzed_tiles.append(tile(doc_id, {**src, **update}))
 
             stats["analyzed"] += 1
             if result.get("has_animal") and (result.get("confidence") or 0) >= MIN_CONFIDENCE:
@@ -201,24 +350,70 @@ def run_analysis(batch_size: int = BATCH_SIZE) -> dict:
 
         except Exception as exc:
             logger.error("Analysis failed for %s (%s): %s", filename, camera, exc)
-            # Mark as analyzed with error so we don't retry forever
-            bulk_updates.append({
-                "_op_type": "update",
-                "_index": IMAGES_INDEX,
-                "_id": doc_id,
-                "doc": {
-                    "ai_analyzed": True,
-                    "ai_analyzed_at": datetime.now(timezone.utc).isoformat(),
-                    "ai_error": str(exc),
-                },
-            })
-            stats["errors"] += 1
+            _failed(doc_id, exc)
 
     if bulk_updates:
-        helpers.bulk(es, bulk_updates)
+        helpers.bulk(es, bulk_updates, refresh="wait_for")
+        stats["burst_copies"], copied_tiles = _copy_to_siblings(es, batch_size * 10)
+        publish_image_events("analysis_complete", analyzed_tiles + copied_tiles)
 
+    stats["tiers"] = dict(stats["tiers"])
+    stats["est_cost_saved_usd"] = round(stats["skipped"] * VISION_COST_PER_IMAGE, 4)
     logger.info(
-        "Analysis batch done: %d analyzed, %d animals, %d errors",
-        stats["analyzed"], stats["animals"], stats["errors"],
+        "Analysis batch done: %d analyzed (%d vision, %d pre-filtered), %d animals, %d errors, "
+        "%d burst frames copied",
+        stats["analyzed"], stats["vision_calls"], stats["skipped"], stats["animals"], stats["errors"],
+        stats["burst_copies"],
     )
     return stats
+
+
+def tier_metrics(days: int = 30) -> dict:
+    """
+    Per-tier counts over the last `days` of analyses, the vision spend the
+    pre-filter avoided, and how often frames sent on by CLIP turned out
+    empty per score band — the numbers for tuning PREFILTER_THRESHOLD.
+    Burst copies are left out: they never cost a vision call either way.
+    """
+    es = _es()
+    resp = es.search(
+        index=IMAGES_INDEX,
+        body={
+            "size": 0,
+            "query": {"bool": {
+                "filter": [
+                    {"term": {"ai_analyzed": True}},
+                    {"range": {"ai_analyzed_at": {"gte": f"now-{days}d"}}},
+                ],
+                "must_not": [{"exists": {"field": "ai_burst_source"}}],
+            }},
+            "aggs": {
+                # docs analyzed before the pre-filter existed have no ai_tier
+                "tiers": {"terms": {"field": "ai_tier", "missing": "none", "size": 10}},
+                "scores": {
+                    "filter": {"term": {"ai_tier": "clip"}},
+                    "aggs": {"bands": {
+                        "histogram": {"field": "prefilter_score", "interval": 0.1,
+                                      "extended_bounds": {"min": 0, "max": 0.9}},
+                        "aggs": {"animal": {"filter": {"term": {"ai_has_animal": True}}}},
+                    }},
+                },
+            },
+        },
+    )
+    aggs = resp["aggregations"]
+    tiers = {b["key"]: b["doc_count"] for b in aggs["tiers"]["buckets"]}
+    skipped = sum(n for tier, n in tiers.items() if tier.endswith("_skip"))
+    return {
+        "days": days,
+        "mode": PREFILTER_MODE,
+        "threshold": PREFILTER_THRESHOLD,
+        "tiers": tiers,
+        "skipped": skipped,
+        "vision_calls": sum(tiers.values()) - skipped,
+        "est_cost_saved_usd": round(skipped * VISION_COST_PER_IMAGE, 2),
+        "score_bands": [
+            {"from": round(b["key"], 1), "count": b["doc_count"], "animal": b["animal"]["doc_count"]}
+            for b in aggs["scores"]["bands"]["buckets"]
+        ],
+    }
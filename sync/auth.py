@@ -3,37 +3,56 @@ Tactacam / Reveal Cognito authentication.
 
 Tactacam uses AWS Cognito USER_PASSWORD_AUTH (no SRP, no client secret).
 Client ID: 6r9tpojvgvkci5trla0ip14mon
+
+Tokens are shared through a TokenStore file (TACTACAM_TOKEN_FILE) so the
+scheduled sync, /trigger and backfill threads — each of which builds its own
+TactacamAuth — reuse one Cognito session instead of each doing a full
+password login.  Refresh is single-flight and happens REFRESH_MARGIN_SECONDS
+before expiry.
 """
 import os
 import time
 import logging
 import requests
 
+from .token_store import REFRESH_MARGIN_SECONDS, TokenStore
+
 logger = logging.getLogger(__name__)
 
 COGNITO_URL = "https://cognito-idp.us-east-1.amazonaws.com/"
 CLIENT_ID = "6r9tpojvgvkci5trla0ip14mon"
+DEFAULT_TOKEN_FILE = "/data/tactacam_tokens.json"
 
 
 class TactacamAuth:
-    def __init__(self):
+    def __init__(self, token_file: str | None = None):
         self.username = os.environ["TACTACAM_USERNAME"]
         self.password = os.environ["TACTACAM_PASSWORD"]
+        self._store_file = TokenStore(token_file or os.getenv("TACTACAM_TOKEN_FILE", DEFAULT_TOKEN_FILE))
         self._access_token: str | None = None
         self._refresh_token: str | None = None
         self._expires_at: float = 0
+        self._load_tokens()
+
+    def _fresh(self) -> bool:
+        return bool(self._access_token) and time.time() < self._expires_at - REFRESH_MARGIN_SECONDS
 
     def get_token(self) -> str:
-        if self._access_token and time.time() < self._expires_at - 60:
+        if self._fresh():
             return self._access_token
-        if self._refresh_token:
-            try:
-                self._refresh()
+        with self._store_file.locked():
+            # Another thread/process may have refreshed while we waited
+            self._load_tokens()
+            if self._fresh():
                 return self._access_token
-            except Exception:
-                logger.warning("Token refresh failed, re-authenticating")
-        self._authenticate()
-        return self._access_token
+            if self._refresh_token:
+                try:
+                    self._refresh()
+                    return self._access_token
+                except Exception:
+                    logger.warning("Token refresh failed, re-authenticating")
+            self._authenticate()
+            return self._access_token
 
     def _authenticate(self):
         resp = requests.post(
@@ -81,3 +100,22 @@ class TactacamAuth:
         self._expires_at = time.time() + result["ExpiresIn"]
         if "RefreshToken" in result:
             self._refresh_token = result["RefreshToken"]
+        try:
+            self._store_file.write({
+                "username": self.username,
+                "access_token": self._access_token,
+                "refresh_token": self._refresh_token,
+                "expires_at": self._expires_at,
+            })
+        except Exception as exc:
+            logger.warning("Could not persist Tactacam tokens: %s", exc)
+
+    def _load_tokens(self):
+        data = self._store_file.read()
+        # Ignore tokens cached for a different account
+        if not data or data.get("username") != self.username:
+            return
+        if data.get("expires_at", 0) > self._expires_at:
+            self._access_token = data.get("access_token")
+            self._refresh_token = data.get("refresh_token")
+            self._expires_at = data.get("expires_at", 0)
@@ -0,0 +1,104 @@
+"""
+Perceptual hashes and burst grouping for Tactacam photos.
+
+Trail cams fire bursts of 3–10 near-identical frames.  At sync time each photo
+gets a 64-bit pHash (DCT of a 32×32 grayscale thumbnail) and dHash (row
+gradients of a 9×8 thumbnail), stored as hex strings.  Consecutive frames from
+one camera that fall within BURST_WINDOW_S of the burst's first frame and stay
+within BURST_MAX_PHASH / BURST_MAX_DHASH bits of it share a burst:
+
+  burst_id    doc id of the burst's first frame (the representative)
+  burst_rep   true on the representative only
+  burst_size  frame count, kept on the representative
+
+The analyzer sends only representatives to vision and copies their labels to
+the siblings; listings can filter to burst_rep to collapse bursts.  Frames are
+compared to the representative rather than to the previous frame, so a slow
+pan or an animal walking in can't chain a burst into a different scene.
+"""
+import io
+import logging
+import os
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+BURST_WINDOW_S = float(os.getenv("BURST_WINDOW_S", "60"))
+BURST_MAX_PHASH = int(os.getenv("BURST_MAX_PHASH", "10"))
+# dHash flips more bits under sensor noise, so it gets more slack
+BURST_MAX_DHASH = int(os.getenv("BURST_MAX_DHASH", "16"))
+
+_N = 32
+# Orthonormal DCT-II basis for the 32×32 pHash thumbnail
+_DCT = np.sqrt(2.0 / _N) * np.cos(np.pi * (2 * np.arange(_N)[None, :] + 1) * np.arange(_N)[:, None] / (2 * _N))
+_DCT[0] /= np.sqrt(2.0)
+
+
+def _bits_hex(bits: np.ndarray) -> str:
+    return f"{int(''.join('1' if b else '0' for b in bits.ravel()), 2):016x}"
+
+
+def image_hashes(image_bytes: bytes) -> dict:
+    """{"phash": hex, "dhash": hex} for a JPEG/PNG, or {} if it can't be decoded."""
+    try:
+        img = Image.open(io.BytesIO(image_bytes))
+        img.draft("L", (_N * 2, _N * 2))  # JPEG: decode at reduced scale
+        gray = img.convert("L")
+        small = np.asarray(gray.resize((_N, _N), Image.Resampling.LANCZOS), dtype=np.float64)
+        low = (_DCT @ small @ _DCT.T)[:8, :8]
+        phash = low > np.median(low.ravel()[1:])  # DC term would skew the median
+        d = np.asarray(gray.resize((9, 8), Image.Resampling.LANCZOS), dtype=np.int16)
+        dhash = d[:, 1:] > d[:, :-1]
+    except Exception as exc:
+        logger.warning("perceptual hash failed: %s", exc)
+        return {}
+    return {"phash": _bits_hex(phash), "dhash": _bits_hex(dhash)}
+
+
+def distance(a: Optional[str], b: Optional[str]) -> int:
+    """Hamming distance between two hex hashes (64 when either is missing)."""
+    if not a or not b:
+        return 64
+    return bin(int(a, 16) ^ int(b, 16)).count("1")
+
+
+def _ts(value) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+def same_burst(rep: dict, doc: dict) -> bool:
+    rep_ts, ts = _ts(rep.get("@timestamp")), _ts(doc.get("@timestamp"))
+    if rep_ts is None or ts is None or abs(ts - rep_ts) > BURST_WINDOW_S:
+        return False
+    return (distance(rep.get("phash"), doc.get("phash")) <= BURST_MAX_PHASH
+            and distance(rep.get("dhash"), doc.get("dhash")) <= BURST_MAX_DHASH)
+
+
+def assign_bursts(docs: list[tuple[str, dict]], open_burst: Optional[tuple[str, dict]] = None) -> dict[str, int]:
+    """
+    Set burst_id / burst_rep / burst_size on one camera's new (doc_id, source)
+    pairs in place.  `open_burst` is the (rep_id, rep_source) of the camera's
+    latest indexed burst, so a burst split across two syncs stays one burst.
+    Returns {rep_id: new size} for representatives indexed before this batch.
+    """
+    rep_id, rep = open_burst or (None, None)
+    grown: dict[str, int] = {}
+    for doc_id, src in sorted(docs, key=lambda d: _ts(d[1].get("@timestamp")) or 0.0):
+        if rep is not None and same_burst(rep, src):
+            src["burst_id"], src["burst_rep"] = rep_id, False
+            rep["burst_size"] = rep.get("burst_size", 1) + 1
+            if open_burst and rep_id == open_burst[0]:
+                grown[rep_id] = rep["burst_size"]
+            continue
+        rep_id, rep = doc_id, src
+        src.update(burst_id=doc_id, burst_rep=True, burst_size=1)
+    return grown
@@ -7,6 +7,13 @@ to POST the raw email payload to this endpoint. We parse the camera name /
 ID out of the subject, then call the /trigger endpoint on the poller to kick
 off a targeted sync for just that camera.
 
+Tactacam sends one email per camera fire, so a burst of activity arrives as a
+burst of emails. Camera names are collected over a short debounce window
+(EMAIL_DEBOUNCE_SECONDS, capped at EMAIL_DEBOUNCE_MAX_SECONDS) and resolved to
+camera IDs through a cached copy of the poller's /cameras registry. The whole
+burst then becomes ONE targeted `camera_ids` sync that the poller runs in the
+background (wait=false), so webhooks are acknowledged immediately.
+
 Supported email service formats:
   - SendGrid Inbound Parse  (multipart/form-data, field "subject")
   - Postmark inbound        (JSON body, field "Subject")
@@ -14,9 +21,11 @@ Supported email service formats:
 
 Set POLLER_URL to the internal address of the poller service.
 """
+import asyncio
 import logging
 import os
 import re
+import time
 
 import httpx
 from fastapi import FastAPI, Form, Request
@@ -27,6 +36,9 @@ logger = logging.getLogger(__name__)
 app = FastAPI(title="ridgeline-email-trigger")
 
 POLLER_URL = os.getenv("POLLER_URL", "http://sync:8100")
+DEBOUNCE_SECONDS = float(os.getenv("EMAIL_DEBOUNCE_SECONDS", "5"))
+DEBOUNCE_MAX_SECONDS = float(os.getenv("EMAIL_DEBOUNCE_MAX_SECONDS", "30"))
+CAMERA_CACHE_TTL_SECONDS = float(os.getenv("CAMERA_CACHE_TTL_SECONDS", "600"))
 
 # Tactacam email subjects look like:
 #   "New image from Northwest Corner"
@@ -42,20 +54,120 @@ def _extract_camera_name(subject: str) -> str | None:
     return m.group(1).strip() if m else None
 
 
-async def _trigger_sync(camera_name: str | None):
-    async with httpx.AsyncClient(timeout=10) as client:
-        payload = {}
+class _CameraDirectory:
+    """Cached camera name → ID lookup backed by the poller's /cameras endpoint.
+
+    The cache is refreshed when it is older than CAMERA_CACHE_TTL_SECONDS, or
+    early when a name misses (a camera was just added or renamed) — but at most
+    once per minute so a bogus subject can't hammer the poller.
+    """
+
+    _MISS_REFRESH_SECONDS = 60
+
+    def __init__(self):
+        self._ids_by_name: dict[str, str] = {}
+        self._loaded_at: float = float("-inf")
+        self._lock = asyncio.Lock()
+
+    async def _refresh(self, client: httpx.AsyncClient):
+        resp = await client.get(f"{POLLER_URL}/cameras")
+        resp.raise_for_status()
+        self._ids_by_name = {
+            c["name"].strip().lower(): c["camera_id"]
+            for c in resp.json().get("cameras", [])
+            if c.get("name") and c.get("camera_id")
+        }
+        self._loaded_at = time.monotonic()
+        logger.info("Camera directory refreshed: %d cameras", len(self._ids_by_name))
+
+    async def resolve(self, client: httpx.AsyncClient, names: set[str]) -> tuple[set[str], set[str]]:
+        """Return (camera_ids, unresolved_names)."""
+        async with self._lock:
+            age = time.monotonic() - self._loaded_at
+            missing = {n for n in names if n.lower() not in self._ids_by_name}
+            if age > CAMERA_CACHE_TTL_SECONDS or (missing and age > self._MISS_REFRESH_SECONDS):
+                try:
+                    await self._refresh(client)
+                except Exception as exc:
+                    logger.warning("Camera directory refresh failed: %s", exc)
+
+        ids, unresolved = set(), set()
+        for name in names:
+            cid = self._ids_by_name.get(name.lower())
+            if cid:
+                ids.add(cid)
+            else:
+                unresolved.add(name)
+        return ids, unresolved
+
+
+class _SyncCoalescer:
+    """Debounce inbound emails into one targeted sync per burst.
+
+    Every email adds its camera name to the pending set and pushes the flush
+    out by DEBOUNCE_SECONDS; the flush is never delayed more than
+    DEBOUNCE_MAX_SECONDS past the first email of the burst. An email without
+    a recognisable camera (or a name we can't resolve) widens the flush to a
+    full sync.
+    """
+
+    def __init__(self, directory: _CameraDirectory):
+        self._directory = directory
+        self._names: set[str] = set()
+        self._full_sync = False
+        self._first_at: float | None = None
+        self._deadline: float = 0
+        self._task: asyncio.Task | None = None
+        self._in_flight: set[asyncio.Task] = set()
+
+    def add(self, camera_name: str | None):
+        now = time.monotonic()
         if camera_name:
-            # The poller will resolve name → ID during sync; pass as hint
-            logger.info("Email trigger: camera hint '%s'", camera_name)
+            self._names.add(camera_name)
+        else:
+            self._full_sync = True
+        if self._first_at is None:
+            self._first_at = now
+        self._deadline = min(now + DEBOUNCE_SECONDS, self._first_at + DEBOUNCE_MAX_SECONDS)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._wait_and_flush())
+
+    async def _wait_and_flush(self):
+        # The deadline moves while we sleep; keep sleeping until it stops.
+        while (delay := self._deadline - time.monotonic()) > 0:
+            await asyncio.sleep(delay)
+
+        names, full_sync = self._names, self._full_sync
+        self._names, self._full_sync, self._first_at = set(), False, None
+        # Hand off so emails arriving during the POST open a fresh window
+        task = asyncio.create_task(_trigger_sync(self._directory, names, full_sync))
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+
+
+async def _trigger_sync(directory: _CameraDirectory, camera_names: set[str], full_sync: bool):
+    async with httpx.AsyncClient(timeout=10) as client:
+        camera_ids: set[str] = set()
+        if camera_names and not full_sync:
+            camera_ids, unresolved = await directory.resolve(client, camera_names)
+            if unresolved:
+                logger.warning("Email trigger: unknown camera(s) %s — falling back to full sync", sorted(unresolved))
+                full_sync = True
+
+        # /trigger takes camera_ids as the JSON body; null means "all cameras"
+        payload = None if full_sync or not camera_ids else sorted(camera_ids)
+        logger.info("Email trigger: cameras=%s → camera_ids=%s", sorted(camera_names), payload)
         try:
-            resp = await client.post(f"{POLLER_URL}/trigger", json=payload)
+            resp = await client.post(f"{POLLER_URL}/trigger", params={"wait": "false"}, json=payload)
             resp.raise_for_status()
             logger.info("Poller triggered: %s", resp.json())
         except Exception as exc:
             logger.error("Failed to trigger poller: %s", exc)
 
 
+_coalescer = _SyncCoalescer(_CameraDirectory())
+
+
 @app.get("/health")
 def health():
     return {"status": "ok"}
@@ -66,7 +178,7 @@ async def sendgrid_inbound(subject: str = Form(default="")):
     """SendGrid Inbound Parse webhook (multipart/form-data)."""
     camera_name = _extract_camera_name(subject)
     logger.info("SendGrid inbound: subject=%r  camera=%s", subject, camera_name)
-    await _trigger_sync(camera_name)
+    _coalescer.add(camera_name)
     return {"received": True}
 
 
@@ -77,7 +189,7 @@ async def postmark_inbound(request: Request):
     subject = body.get("Subject") or body.get("subject", "")
     camera_name = _extract_camera_name(subject)
     logger.info("Postmark inbound: subject=%r  camera=%s", subject, camera_name)
-    await _trigger_sync(camera_name)
+    _coalescer.add(camera_name)
     return {"received": True}
 
 
@@ -88,7 +200,7 @@ async def generic_inbound(request: Request):
     subject = body.get("subject") or body.get("Subject", "")
     camera_name = _extract_camera_name(subject)
     logger.info("Generic inbound: subject=%r  camera=%s", subject, camera_name)
-    await _trigger_sync(camera_name)
+    _coalescer.add(camera_name)
     return {"received": True}
 
 
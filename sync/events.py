@@ -0,0 +1,92 @@
+"""
+Image-ingest events for live UI updates.
+
+The syncer and analyzer publish small JSON events to a Redis pub/sub channel
+after their bulk writes land in ES; the API tails the channel and pushes them
+to subscribed map/gallery sockets, so clients stop polling
+/trailcams/{id}/images.
+
+Events (one per image):
+  {"type": "new_photo" | "analysis_complete" | "label_updated", "image": {...tile}}
+
+Batches larger than IMAGE_EVENTS_MAX_PER_PUBLISH (initial syncs, backfills)
+are sent as one event per camera instead, telling clients to refetch:
+  {"type": "camera_refresh", "reason": <event type>, "count": n,
+   "image": {camera_id, camera_name, property_id, property_name}}
+
+Publishing is best effort: a missing Redis never fails a sync.
+"""
+import json
+import logging
+import os
+from typing import Iterable, Optional
+
+import redis
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+IMAGE_EVENTS_CHANNEL = os.getenv("IMAGE_EVENTS_CHANNEL", "image_events")
+# Keep well under the API's per-socket queue (IMAGE_EVENTS_QUEUE_SIZE, 256):
+# an overflowing socket is disconnected, which would kick every open map.
+MAX_EVENTS_PER_PUBLISH = int(os.getenv("IMAGE_EVENTS_MAX_PER_PUBLISH", "100"))
+_CAMERA_FIELDS = ("camera_id", "camera_name", "property_id", "property_name")
+
+# Fields a gallery/map tile needs; everything else stays in ES
+TILE_FIELDS = (
+    "camera_id", "camera_name", "property_id", "property_name",
+    "filename", "s3_key", "@timestamp", "has_headshot", "location",
+    "ai_has_animal", "ai_species", "ai_sex", "ai_age_class", "ai_confidence",
+    "human_species", "animal_name", "burst_id", "burst_rep", "burst_size",
+)
+
+_client: Optional[redis.Redis] = None
+
+
+def tile(doc_id: str, src: dict) -> dict:
+    """Tile metadata for one tactacam-images document."""
+    out = {"id": doc_id}
+    for field in TILE_FIELDS:
+        if src.get(field) is not None:
+            out["timestamp" if field == "@timestamp" else field] = src[field]
+    return out
+
+
+def _redis() -> redis.Redis:
+    global _client
+    if _client is None:
+        _client = redis.from_url(REDIS_URL, socket_connect_timeout=2, socket_timeout=2)
+    return _client
+
+
+def _camera_refreshes(event_type: str, tiles: list[dict]) -> list[dict]:
+    """One camera_refresh per camera; "image" carries the camera so socket filters still match."""
+    cameras: dict = {}
+    for t in tiles:
+        cam = cameras.setdefault(t.get("camera_id"), {
+            "type": "camera_refresh", "reason": event_type, "count": 0,
+            "image": {f: t[f] for f in _CAMERA_FIELDS if t.get(f) is not None},
+        })
+        cam["count"] += 1
+    return list(cameras.values())
+
+
+def publish_image_events(event_type: str, tiles: Iterable[dict]) -> int:
+    """Publish one event per tile (or per camera for large batches) in a single round trip.
+    Returns the number of events sent."""
+    tiles = list(tiles)
+    if not tiles:
+        return 0
+    if len(tiles) > MAX_EVENTS_PER_PUBLISH:
+        events = _camera_refreshes(event_type, tiles)
+    else:
+        events = [{"type": event_type, "image": t} for t in tiles]
+    try:
+        pipe = _redis().pipeline(transaction=False)
+        for event in events:
+            pipe.publish(IMAGE_EVENTS_CHANNEL, json.dumps(event))
+        pipe.execute()
+    except Exception as exc:
+        logger.warning("Could not publish %d %s events: %s", len(events), event_type, exc)
+        return 0
+    return len(events)
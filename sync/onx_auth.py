@@ -7,15 +7,20 @@ Client ID: b500432c-9287-4f79-8a49-fb0ac1181370
 First-time setup: run `python -m sync.onx_login` to complete the browser
 login and store tokens to ONX_TOKEN_FILE.  Subsequent runs load from that
 file and refresh automatically.
+
+Hydra rotates refresh tokens, so two refreshes racing with the same refresh
+token would invalidate the session.  The token file is therefore a locked
+TokenStore: refresh is single-flight across threads and processes, and the
+loser of the race simply re-reads the rotated tokens.
 """
-import json
 import logging
 import os
 import time
-from pathlib import Path
 
 import requests
 
+from .token_store import REFRESH_MARGIN_SECONDS, TokenStore
+
 logger = logging.getLogger(__name__)
 
 TOKEN_ENDPOINT = "https://identity.onxmaps.com/oauth2/token"
@@ -25,7 +30,8 @@ DEFAULT_TOKEN_FILE = "/data/onx_tokens.json"
 
 class OnxAuth:
     def __init__(self, token_file: str | None = None):
-        self._token_file = Path(token_file or os.getenv("ONX_TOKEN_FILE", DEFAULT_TOKEN_FILE))
+        self._store = TokenStore(token_file or os.getenv("ONX_TOKEN_FILE", DEFAULT_TOKEN_FILE))
+        self._token_file = self._store.path
         self._access_token: str | None = None
         self._refresh_token: str | None = None
         self._expires_at: float = 0
@@ -35,12 +41,20 @@ class OnxAuth:
     # Public
     # ------------------------------------------------------------------
 
+    def _fresh(self) -> bool:
+        return bool(self._access_token) and time.time() < self._expires_at - REFRESH_MARGIN_SECONDS
+
     def get_token(self) -> str:
-        if self._access_token and time.time() < self._expires_at - 60:
-            return self._access_token
-        if self._refresh_token:
-            self._refresh()
+        if self._fresh():
             return self._access_token
+        with self._store.locked():
+            # Another thread/process may have refreshed while we waited
+            self._load_tokens()
+            if self._fresh():
+                return self._access_token
+            if self._refresh_token:
+                self._refresh()
+                return self._access_token
         raise RuntimeError(
             "No OnX token available. Run `python -m sync.onx_login` to authenticate."
         )
@@ -50,7 +64,8 @@ class OnxAuth:
         self._access_token = access_token
         self._refresh_token = refresh_token
         self._expires_at = time.time() + expires_in
-        self._save_tokens()
+        with self._store.locked():
+            self._save_tokens()
         logger.info("OnX tokens stored to %s", self._token_file)
 
     # ------------------------------------------------------------------
@@ -77,22 +92,15 @@ class OnxAuth:
         logger.debug("OnX token refreshed")
 
     def _load_tokens(self):
-        if not self._token_file.exists():
-            return
-        try:
-            data = json.loads(self._token_file.read_text())
+        data = self._store.read()
+        if data.get("expires_at", 0) >= self._expires_at:
             self._access_token = data.get("access_token")
             self._refresh_token = data.get("refresh_token")
             self._expires_at = data.get("expires_at", 0)
-        except Exception as exc:
-            logger.warning("Could not load OnX token file: %s", exc)
 
     def _save_tokens(self):
-        self._token_file.parent.mkdir(parents=True, exist_ok=True)
-        self._token_file.write_text(
-            json.dumps({
-                "access_token": self._access_token,
-                "refresh_token": self._refresh_token,
-                "expires_at": self._expires_at,
-            })
-        )
+        self._store.write({
+            "access_token": self._access_token,
+            "refresh_token": self._refresh_token,
+            "expires_at": self._expires_at,
+        })
@@ -9,12 +9,16 @@ import logging
 from typing import Any
 
 import requests
+from requests.adapters import HTTPAdapter
 
 from .onx_auth import OnxAuth
 
 logger = logging.getLogger(__name__)
 
 BASE_URL = "https://api.production.onxmaps.com"
+# Safety stop for markup paging (500 x 200 items is far beyond any account)
+_MAX_PAGES = 200
+_CURSOR_FIELDS = ("nextCursor", "next_cursor", "cursor")
 
 # GraphQL query for land areas (property boundaries)
 _LAND_AREAS_QUERY = """
@@ -92,9 +96,14 @@ query GetAllTrailCams($first: Int, $after: String) {
 
 
 class OnxClient:
-    def __init__(self, auth: OnxAuth):
+    """OnX API client.  Safe to share across threads: run_onx_sync fetches all
+    collections concurrently over this one keep-alive connection pool."""
+
+    def __init__(self, auth: OnxAuth, pool_size: int = 8):
         self._auth = auth
         self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self._session.mount("https://", adapter)
 
     def _headers(self) -> dict:
         return {
@@ -126,29 +135,45 @@ class OnxClient:
     # Markups (REST)
     # ------------------------------------------------------------------
 
-    def get_waypoints(self, limit: int = 500) -> list[dict]:
-        data = self._get("/v1/markups/waypoints", {"limit": limit})
-        items = data if isinstance(data, list) else data.get("items", [])
-        logger.info("Fetched %d waypoints from OnX", len(items))
-        return items
-
-    def get_tracks(self, limit: int = 200) -> list[dict]:
-        data = self._get("/v1/markups/tracks", {"limit": limit})
-        items = data if isinstance(data, list) else data.get("items", [])
-        logger.info("Fetched %d tracks from OnX", len(items))
-        return items
-
-    def get_lines(self, limit: int = 200) -> list[dict]:
-        data = self._get("/v1/markups/lines", {"limit": limit})
-        items = data if isinstance(data, list) else data.get("items", [])
-        logger.info("Fetched %d lines from OnX", len(items))
-        return items
-
-    def get_shapes(self, limit: int = 500) -> list[dict]:
-        data = self._get("/v1/markups/shapes", {"limit": limit})
-        items = data if isinstance(data, list) else data.get("items", [])
-        logger.info("Fetched %d shapes from OnX", len(items))
-        return items
+    def _get_markups(self, path: str, kind: str, limit: int) -> tuple[list[dict], bool]:
+        """
+        Page through one markups endpoint.  Returns (items, complete): complete
+        is True only once a short page or an exhausted cursor shows nothing is
+        left, so callers can tell a full listing from a truncated one.
+        """
+        items: list[dict] = []
+        seen: set = set()
+        params: dict = {"limit": limit}
+        for _ in range(_MAX_PAGES):
+            data = self._get(path, params)
+            meta = data if isinstance(data, dict) else {}
+            page = data if isinstance(data, list) else meta.get("items", [])
+            ids = {i.get("uuid") for i in page} - {None}
+            if ids and ids <= seen:
+                # the endpoint ignored the paging params and repeated a page
+                logger.warning("OnX %s: paging did not advance past %d items", kind, len(items))
+                break
+            seen |= ids
+            items.extend(page)
+            cursor = next((meta[f] for f in _CURSOR_FIELDS if meta.get(f)), None)
+            if len(page) < limit or (not cursor and any(f in meta for f in _CURSOR_FIELDS)):
+                logger.info("Fetched %d %s from OnX", len(items), kind)
+                return items, True
+            params = {"limit": limit, "cursor": cursor} if cursor else {"limit": limit, "offset": len(items)}
+        logger.warning("OnX %s: listing incomplete after %d items", kind, len(items))
+        return items, False
+
+    def get_waypoints(self, limit: int = 500) -> tuple[list[dict], bool]:
+        return self._get_markups("/v1/markups/waypoints", "waypoints", limit)
+
+    def get_tracks(self, limit: int = 200) -> tuple[list[dict], bool]:
+        return self._get_markups("/v1/markups/tracks", "tracks", limit)
+
+    def get_lines(self, limit: int = 200) -> tuple[list[dict], bool]:
+        return self._get_markups("/v1/markups/lines", "lines", limit)
+
+    def get_shapes(self, limit: int = 500) -> tuple[list[dict], bool]:
+        return self._get_markups("/v1/markups/shapes", "shapes", limit)
 
     # ------------------------------------------------------------------
     # Land areas + cameras (GraphQL)
@@ -5,17 +5,31 @@ Pulls waypoints, tracks, lines, shapes, land areas, and trail cameras from
 OnX and upserts them into Elasticsearch.  All operations are idempotent —
 running multiple times is safe.
 
+Sync is incremental: every doc carries a `content_hash` of its synced fields
+(everything except ingest_ts).  Each run compares the freshly built docs
+against the hashes already indexed, writes only new/changed docs, and deletes
+docs whose item no longer exists upstream.  Unchanged land-area polygons and
+markup geometry are never re-sent.
+
+The six collections are fetched concurrently on one pooled OnxClient session;
+each collection is diffed and bulk-written as soon as its fetch returns, so a
+sync takes roughly as long as the slowest OnX endpoint.
+
 Indices:
     onx-waypoints    — stands, blinds, parking, food plots, gates, etc.
     onx-markups      — tracks, lines, shapes
     onx-land-areas   — property boundaries with full polygon geometry
     onx-cameras      — trail cameras registered in OnX (cross-ref Tactacam)
 """
+import hashlib
+import json
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone
+from typing import Callable
 
-from elasticsearch import Elasticsearch, helpers
+from elasticsearch import Elasticsearch, NotFoundError, helpers
 
 from .onx_auth import OnxAuth
 from .onx_client import OnxClient
@@ -197,136 +211,135 @@ def _camera_doc(node: dict) -> dict:
     return doc
 
 
+# ── Change detection ──────────────────────────────────────────────────────────
+
+def _content_hash(doc: dict) -> str:
+    """Stable hash of a doc's synced content (ingest_ts excluded)."""
+    stable = {k: v for k, v in doc.items() if k not in ("ingest_ts", "content_hash")}
+    return hashlib.sha1(
+        json.dumps(stable, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+def _indexed_hashes(es: Elasticsearch, index: str, doc_type: str | None = None) -> dict[str, str | None]:
+    """Return {_id: content_hash} for every doc already indexed for this collection."""
+    query = {"match": {"type": doc_type}} if doc_type else {"match_all": {}}
+    hashes: dict[str, str | None] = {}
+    try:
+        for hit in helpers.scan(
+            es,
+            index=index,
+            query={"query": query, "_source": ["content_hash"]},
+            size=1000,
+        ):
+            hashes[hit["_id"]] = (hit.get("_source") or {}).get("content_hash")
+    except NotFoundError:
+        pass  # index doesn't exist yet on first run
+    return hashes
+
+
+def _sync_collection(
+    es: Elasticsearch,
+    name: str,
+    items: list[dict],
+    index: str,
+    id_key: str,
+    build: Callable[[dict], dict],
+    doc_type: str | None = None,
+    complete: bool = True,
+) -> dict[str, int]:
+    """
+    Diff one fetched collection against ES and bulk-apply the changes.
+    Deletes are only issued when `complete` says the fetch listed every item.
+    """
+    existing = _indexed_hashes(es, index, doc_type)
+    stats = {"fetched": len(items), "unchanged": 0, "updated": 0, "created": 0, "deleted": 0}
+    actions = []
+    seen: set[str] = set()
+
+    for item in items:
+        item_id = item.get(id_key)
+        if not item_id:
+            continue
+        seen.add(item_id)
+        doc = build(item)
+        doc["content_hash"] = _content_hash(doc)
+        if item_id in existing:
+            if existing[item_id] == doc["content_hash"]:
+                stats["unchanged"] += 1
+                continue
+            stats["updated"] += 1
+        else:
+            stats["created"] += 1
+        actions.append({"_index": index, "_id": item_id, "_source": doc})
+
+    # An empty fetch is far more likely an API hiccup than the user deleting
+    # everything, and a truncated one would delete every item past the last
+    # page, so only propagate deletes from a complete, non-empty listing.
+    if items and complete:
+        for stale_id in existing.keys() - seen:
+            actions.append({"_op_type": "delete", "_index": index, "_id": stale_id})
+            stats["deleted"] += 1
+
+    if actions:
+        helpers.bulk(es, actions, raise_on_error=False)
+
+    logger.info(
+        "OnX %s: %d fetched, %d unchanged, %d updated, %d created, %d deleted",
+        name, stats["fetched"], stats["unchanged"], stats["updated"],
+        stats["created"], stats["deleted"],
+    )
+    return stats
+
+
 # ── Sync entry point ──────────────────────────────────────────────────────────
 
-def run_onx_sync() -> dict[str, int]:
+def run_onx_sync() -> dict[str, dict[str, int]]:
     """
-    Pull all OnX data and upsert to Elasticsearch.
-    Returns counts per data type.
+    Pull all OnX data and incrementally sync it to Elasticsearch.
+    Returns per-type counters (fetched / unchanged / updated / created / deleted).
     """
     auth = OnxAuth()
     client = OnxClient(auth)
     es = _es()
 
-    results: dict[str, int] = {}
-    bulk_docs = []
-
-    # ── Waypoints ──
-    try:
-        waypoints = client.get_waypoints()
-        for item in waypoints:
-            uuid = item.get("uuid")
-            if not uuid:
-                continue
-            bulk_docs.append({
-                "_index": WAYPOINTS_INDEX,
-                "_id": uuid,
-                "_source": _waypoint_doc(item),
-            })
-        results["waypoints"] = len(waypoints)
-    except Exception as exc:
-        logger.error("Failed to sync waypoints: %s", exc)
-        results["waypoints"] = 0
-
-    # ── Tracks ──
-    try:
-        tracks = client.get_tracks()
-        for item in tracks:
-            uuid = item.get("uuid")
-            if not uuid:
-                continue
-            bulk_docs.append({
-                "_index": MARKUPS_INDEX,
-                "_id": uuid,
-                "_source": _markup_doc(item, "track"),
-            })
-        results["tracks"] = len(tracks)
-    except Exception as exc:
-        logger.error("Failed to sync tracks: %s", exc)
-        results["tracks"] = 0
-
-    # ── Lines ──
-    try:
-        lines = client.get_lines()
-        for item in lines:
-            uuid = item.get("uuid")
-            if not uuid:
-                continue
-            bulk_docs.append({
-                "_index": MARKUPS_INDEX,
-                "_id": uuid,
-                "_source": _markup_doc(item, "line"),
-            })
-        results["lines"] = len(lines)
-    except Exception as exc:
-        logger.error("Failed to sync lines: %s", exc)
-        results["lines"] = 0
-
-    # ── Shapes ──
-    try:
-        shapes = client.get_shapes()
-        for item in shapes:
-            uuid = item.get("uuid")
-            if not uuid:
-                continue
-            bulk_docs.append({
-                "_index": MARKUPS_INDEX,
-                "_id": uuid,
-                "_source": _markup_doc(item, "shape"),
-            })
-        results["shapes"] = len(shapes)
-    except Exception as exc:
-        logger.error("Failed to sync shapes: %s", exc)
-        results["shapes"] = 0
-
-    # ── Land areas ──
-    try:
-        land_areas = client.get_land_areas()
-        for item in land_areas:
-            area_id = item.get("id")
-            if not area_id:
-                continue
-            bulk_docs.append({
-                "_index": LAND_AREAS_INDEX,
-                "_id": area_id,
-                "_source": _land_area_doc(item),
-            })
-        results["land_areas"] = len(land_areas)
-    except Exception as exc:
-        logger.error("Failed to sync land areas: %s", exc)
-        results["land_areas"] = 0
-
-    # ── Trail cameras ──
-    try:
-        cameras = client.get_trail_cams()
-        for node in cameras:
-            cam_id = node.get("id")
-            if not cam_id:
-                continue
-            bulk_docs.append({
-                "_index": CAMERAS_INDEX,
-                "_id": cam_id,
-                "_source": _camera_doc(node),
-            })
-        results["cameras"] = len(cameras)
-    except Exception as exc:
-        logger.error("Failed to sync trail cameras: %s", exc)
-        results["cameras"] = 0
-
-    # ── Bulk write ──
-    if bulk_docs:
-        helpers.bulk(es, bulk_docs)
-        logger.info(
-            "OnX sync complete: %d waypoints, %d tracks, %d lines, %d shapes, "
-            "%d land_areas, %d cameras",
-            results.get("waypoints", 0),
-            results.get("tracks", 0),
-            results.get("lines", 0),
-            results.get("shapes", 0),
-            results.get("land_areas", 0),
-            results.get("cameras", 0),
-        )
-    else:
-        logger.info("OnX sync: nothing to index")
-
+    # (name, fetch, index, id field, doc builder, markup type filter); markup
+    # fetches return (items, complete), the GraphQL ones a full list
+    collections = [
+        ("waypoints", client.get_waypoints, WAYPOINTS_INDEX, "uuid", _waypoint_doc, None),
+        ("tracks", client.get_tracks, MARKUPS_INDEX, "uuid",
+         lambda item: _markup_doc(item, "track"), "track"),
+        ("lines", client.get_lines, MARKUPS_INDEX, "uuid",
+         lambda item: _markup_doc(item, "line"), "line"),
+        ("shapes", client.get_shapes, MARKUPS_INDEX, "uuid",
+         lambda item: _markup_doc(item, "shape"), "shape"),
+        ("land_areas", client.get_land_areas, LAND_AREAS_INDEX, "id", _land_area_doc, None),
+        ("cameras", client.get_trail_cams, CAMERAS_INDEX, "id", _camera_doc, None),
+    ]
+
+    def _fetch_and_sync(name, fetch, index, id_key, build, doc_type):
+        fetched = fetch()
+        items, complete = fetched if isinstance(fetched, tuple) else (fetched, True)
+        return _sync_collection(es, name, items, index, id_key, build, doc_type, complete)
+
+    results: dict[str, dict[str, int]] = {}
+    with ThreadPoolExecutor(max_workers=len(collections)) as executor:
+        futures = {
+            executor.submit(_fetch_and_sync, *spec): spec[0]
+            for spec in collections
+        }
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                results[name] = future.result()
+            except Exception as exc:
+                logger.error("Failed to sync %s: %s", name, exc)
+                results[name] = {"fetched": 0, "unchanged": 0, "updated": 0, "created": 0, "deleted": 0}
+
+    logger.info(
+        "OnX sync complete: %d written, %d unchanged, %d deleted",
+        sum(r["updated"] + r["created"] for r in results.values()),
+        sum(r["unchanged"] for r in results.values()),
+        sum(r["deleted"] for r in results.values()),
+    )
     return results
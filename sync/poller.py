@@ -17,8 +17,8 @@ from apscheduler.triggers.interval import IntervalTrigger
 from fastapi import FastAPI
 import uvicorn
 
-from .syncer import run_sync
-from .analyzer import run_analysis
+from .syncer import CAMERAS_INDEX, _es, run_sync
+from .analyzer import run_analysis, tier_metrics
 from .onx_syncer import run_onx_sync
 
 logger = logging.getLogger(__name__)
@@ -29,20 +29,90 @@ ONX_SYNC_INTERVAL_HOURS = int(os.getenv("ONX_SYNC_INTERVAL_HOURS", "6"))
 app = FastAPI(title="ridgeline-sync-poller")
 _scheduler: BackgroundScheduler | None = None
 
+# Background (wait=false) triggers: at most one sync runs at a time.  Triggers
+# that arrive while it runs are merged into a single follow-up run; None in
+# _followup_cameras means "all cameras".
+_bg_lock = threading.Lock()
+_bg_running = False
+_followup_queued = False
+_followup_cameras: set[str] | None = None
+
 
 @app.get("/health")
 def health():
     return {"status": "ok", "poll_interval_minutes": POLL_INTERVAL_MINUTES}
 
 
+@app.get("/cameras")
+def cameras():
+    """Camera name → ID registry (from tactacam-cameras) for email_trigger lookups."""
+    resp = _es().search(
+        index=CAMERAS_INDEX,
+        body={"size": 500, "_source": ["camera_id", "name"]},
+    )
+    return {
+        "cameras": [
+            {"camera_id": h["_source"].get("camera_id") or h["_id"], "name": h["_source"].get("name")}
+            for h in resp["hits"]["hits"]
+        ]
+    }
+
+
+def _sync_and_analyze(camera_ids=None, backfill_days=None, since_date=None):
+    try:
+        synced = run_sync(camera_ids=camera_ids, backfill_days=backfill_days, since_date=since_date)
+        ai_stats = run_analysis()
+        logger.info("Background sync complete: synced=%s ai=%s", synced, ai_stats)
+    except Exception as exc:
+        logger.error("Background sync failed: %s", exc, exc_info=True)
+
+
+def _start_background_sync(camera_ids: list[str] | None) -> str:
+    """Start a background sync, or fold camera_ids into the follow-up of the running one."""
+    global _bg_running, _followup_queued, _followup_cameras
+    with _bg_lock:
+        if _bg_running:
+            if not _followup_queued:
+                _followup_queued, _followup_cameras = True, set(camera_ids) if camera_ids else None
+            elif _followup_cameras is not None:
+                _followup_cameras = _followup_cameras | set(camera_ids) if camera_ids else None
+            return "sync_queued"
+        _bg_running = True
+    threading.Thread(target=_background_sync, args=(camera_ids,), daemon=True).start()
+    return "sync_started"
+
+
+def _background_sync(camera_ids: list[str] | None) -> None:
+    global _bg_running, _followup_queued, _followup_cameras
+    try:
+        while True:
+            _sync_and_analyze(camera_ids)
+            with _bg_lock:
+                if not _followup_queued:
+                    return
+                camera_ids = sorted(_followup_cameras) if _followup_cameras is not None else None
+                _followup_queued, _followup_cameras = False, None
+            logger.info("Running queued follow-up sync, camera_ids=%s", camera_ids)
+    finally:
+        with _bg_lock:
+            _bg_running = False
+
+
 @app.post("/trigger")
 def trigger(
     camera_ids: list[str] | None = None,
     backfill_days: int | None = None,
     since_date: str | None = None,
+    wait: bool = True,
 ):
     """Fire an immediate sync + AI analysis outside the scheduled window.
 
+    camera_ids (JSON body) limits the sync to those cameras. Pass wait=false to
+    get an immediate acknowledgement while the sync runs in the background —
+    the email trigger does this so webhooks never block on Tactacam.  Only one
+    background sync runs at a time; triggers during it are merged into one
+    follow-up run ("sync_queued").
+
     For a full historical backfill use since_date (preferred):
         POST /trigger?since_date=2022-12-13
 
@@ -53,23 +123,17 @@ def trigger(
     immediately — check container logs for progress.
     """
     logger.info(
-        "Manual trigger received, camera_ids=%s, backfill_days=%s, since_date=%s",
-        camera_ids, backfill_days, since_date,
+        "Manual trigger received, camera_ids=%s, backfill_days=%s, since_date=%s, wait=%s",
+        camera_ids, backfill_days, since_date, wait,
     )
     is_backfill = backfill_days is not None or since_date is not None
 
     if is_backfill:
         # Backfills can take minutes to hours — run async so the caller gets
         # an immediate acknowledgement instead of a timeout.
-        def _run():
-            try:
-                synced = run_sync(camera_ids=camera_ids, backfill_days=backfill_days, since_date=since_date)
-                ai_stats = run_analysis()
-                logger.info("Backfill complete: synced=%s ai=%s", synced, ai_stats)
-            except Exception as exc:
-                logger.error("Backfill failed: %s", exc, exc_info=True)
-
-        threading.Thread(target=_run, daemon=True).start()
+        threading.Thread(
+            target=_sync_and_analyze, args=(camera_ids, backfill_days, since_date), daemon=True,
+        ).start()
         return {
             "status": "backfill_started",
             "since_date": since_date,
@@ -78,6 +142,9 @@ def trigger(
             "message": "Backfill running in background — follow logs for progress.",
         }
 
+    if not wait:
+        return {"status": _start_background_sync(camera_ids), "camera_ids": camera_ids}
+
     synced = run_sync(camera_ids=camera_ids)
     ai_stats = run_analysis()
     return {"synced": synced, "ai": ai_stats}
@@ -90,6 +157,12 @@ def analyze():
     return {"ai": stats}
 
 
+@app.get("/analyze/metrics")
+def analyze_metrics(days: int = 30):
+    """Pre-filter tier counts, estimated vision spend saved and per-score hit rates."""
+    return tier_metrics(days)
+
+
 @app.post("/trigger/onx")
 def trigger_onx():
     """Fire an immediate OnX sync (waypoints, shapes, tracks, land areas, cameras)."""
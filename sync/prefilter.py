@@ -0,0 +1,142 @@
+"""
+Local pre-filter that decides which photos are worth a paid vision call.
+
+Most trail-cam triggers are wind, rain or nothing at all.  Before a batch goes
+to the vision model each photo passes through cheap tiers, first match wins:
+
+  headshot  Tactacam's on-camera detector flagged an animal -> vision
+  clip      CLIP zero-shot on CPU: P(animal prompts) vs empty-scene prompts.
+            >= PREFILTER_THRESHOLD -> vision, below -> recorded as empty
+  none      pre-filter off or CLIP unavailable -> vision
+
+PREFILTER_MODE selects the tiers: "clip", "headshot" (only flagged photos
+reach vision) or "off".  open_clip is an optional install
+(requirements-clip.txt); the default is "clip" when it is installed and
+"headshot" otherwise.  torch/open_clip are imported on first use; if an
+explicit "clip" can't load them, everything goes to vision.
+
+Every analyzed doc records ai_tier ("headshot", "clip", "none", or
+"<tier>_skip" when vision was skipped) and prefilter_score, so the threshold
+can be tuned from ES (see analyzer.tier_metrics).
+"""
+import importlib.util
+import io
+import logging
+import os
+import threading
+from typing import NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# find_spec only locates the package; nothing heavy is imported here
+_HAS_OPEN_CLIP = importlib.util.find_spec("open_clip") is not None
+PREFILTER_MODE = os.getenv("PREFILTER_MODE", "clip" if _HAS_OPEN_CLIP else "headshot").lower()
+PREFILTER_THRESHOLD = float(os.getenv("PREFILTER_THRESHOLD", "0.3"))
+PREFILTER_THREADS = int(os.getenv("PREFILTER_THREADS", "2"))
+CLIP_MODEL = os.getenv("PREFILTER_CLIP_MODEL", "ViT-B-32")
+CLIP_PRETRAINED = os.getenv("PREFILTER_CLIP_PRETRAINED", "laion2b_s34b_b79k")
+
+ANIMAL_PROMPTS = (
+    "a trail camera photo of a deer",
+    "a trail camera photo of a buck with antlers",
+    "a trail camera photo of a turkey",
+    "a trail camera photo of a wild animal",
+    "a trail camera photo of a bear",
+    "a trail camera photo of a coyote",
+    "a trail camera photo of a wild hog",
+    "a trail camera photo of a person",
+)
+EMPTY_PROMPTS = (
+    "a trail camera photo of an empty forest",
+    "a trail camera photo of an empty field",
+    "a trail camera photo of branches and grass blowing in the wind",
+    "a blurry trail camera photo of rain or snow",
+    "a dark night-time trail camera photo with nothing in it",
+)
+
+
+class Decision(NamedTuple):
+    tier: str                 # "headshot" | "clip" | "none"
+    score: Optional[float]    # CLIP animal probability, when computed
+    to_vision: bool
+
+
+class _Clip:
+    """CLIP image tower plus the prompt embeddings, loaded once per process."""
+    _lock = threading.Lock()
+    _loaded = False
+    model = pre = text = torch = None
+
+    @classmethod
+    def get(cls):
+        if not cls._loaded:
+            with cls._lock:
+                if not cls._loaded:
+                    try:
+                        import open_clip
+                        import torch
+
+                        torch.set_num_threads(PREFILTER_THREADS)
+                        model, _, pre = open_clip.create_model_and_transforms(CLIP_MODEL, pretrained=CLIP_PRETRAINED)
+                        model.eval()
+                        tok = open_clip.get_tokenizer(CLIP_MODEL)
+                        with torch.inference_mode():
+                            text = model.encode_text(tok(list(ANIMAL_PROMPTS + EMPTY_PROMPTS)))
+                        cls.model, cls.pre, cls.torch = model, pre, torch
+                        cls.text = text / text.norm(dim=-1, keepdim=True)
+                    except Exception as exc:  # ImportError, or weights that can't be fetched
+                        logger.warning("CLIP pre-filter unavailable (%s); sending all photos to vision", exc)
+                    cls._loaded = True
+        return cls if cls.model is not None else None
+
+
+def clip_scores(images: list[bytes]) -> list[Optional[float]]:
+    """P(animal) per image from one batched CLIP pass; None where unavailable."""
+    clip = _Clip.get()
+    if clip is None or not images:
+        return [None] * len(images)
+    from PIL import Image
+
+    batch, ok = [], []
+    for raw in images:
+        try:
+            img = Image.open(io.BytesIO(raw))
+            img.draft("RGB", (448, 448))  # JPEG: decode near model resolution
+            batch.append(clip.pre(img.convert("RGB")))
+            ok.append(True)
+        except Exception as exc:
+            logger.warning("pre-filter could not decode image: %s", exc)
+            ok.append(False)
+    if not batch:
+        return [None] * len(images)
+    with clip.torch.inference_mode():
+        feats = clip.model.encode_image(clip.torch.stack(batch))
+        feats = feats / feats.norm(dim=-1, keepdim=True)
+        probs = (100.0 * feats @ clip.text.T).softmax(dim=-1)
+        animal = probs[:, :len(ANIMAL_PROMPTS)].sum(dim=-1).tolist()
+    it = iter(animal)
+    return [round(next(it), 4) if good else None for good in ok]
+
+
+def screen(photos: list[tuple[dict, bytes]]) -> list[Decision]:
+    """Decide, per (source, image bytes), whether the photo goes to vision."""
+    if PREFILTER_MODE == "off":
+        return [Decision("none", None, True) for _ in photos]
+
+    decisions: list[Optional[Decision]] = [None] * len(photos)
+    pending = []
+    for i, (src, _) in enumerate(photos):
+        if src.get("has_headshot"):
+            decisions[i] = Decision("headshot", None, True)
+        elif PREFILTER_MODE == "headshot":
+            decisions[i] = Decision("headshot", None, False)
+        else:
+            pending.append(i)
+
+    scores = clip_scores([photos[i][1] for i in pending])
+    for i, score in zip(pending, scores):
+        if score is None:
+            decisions[i] = Decision("none", None, True)
+        else:
+            decisions[i] = Decision("clip", score, score >= PREFILTER_THRESHOLD)
+    return decisions
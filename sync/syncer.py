@@ -20,7 +20,9 @@ from botocore.client import Config
 from elasticsearch import Elasticsearch, helpers
 
 from .auth import TactacamAuth
+from .bursts import assign_bursts, image_hashes
 from .client import TactacamClient
+from .events import publish_image_events, tile
 
 logger = logging.getLogger(__name__)
 
@@ -87,6 +89,35 @@ def _last_sync_ts_all(es: Elasticsearch, camera_ids: list[str]) -> dict[str, dat
     return result
 
 
+def _open_bursts(es: Elasticsearch, camera_ids: list[str]) -> dict[str, tuple[str, dict]]:
+    """
+    Each camera's most recent burst representative, so photos continuing a
+    burst that started in the previous sync join it instead of starting anew.
+    """
+    if not camera_ids:
+        return {}
+    try:
+        resp = es.search(
+            index=IMAGES_INDEX,
+            body={
+                "size": len(camera_ids),
+                "query": {"bool": {"filter": [
+                    {"terms": {"camera_id": camera_ids}},
+                    {"term": {"burst_rep": True}},
+                ]}},
+                "collapse": {"field": "camera_id"},
+                "sort": [{"@timestamp": "desc"}],
+                "_source": ["camera_id", "@timestamp", "phash", "dhash", "burst_size"],
+            },
+        )
+    except Exception:
+        return {}  # index doesn't exist yet on first run
+    return {
+        hit["_source"]["camera_id"]: (hit["_id"], hit["_source"])
+        for hit in resp["hits"]["hits"]
+    }
+
+
 def _upsert_cameras(es: Elasticsearch, cameras: list[dict], last_sync_map: dict):
     docs = []
     for camera in cameras:
@@ -246,15 +277,19 @@ def run_sync(
     # Now process each camera's collected photos
     results: dict[str, int] = {}
     all_bulk_docs = []
+    rep_updates = []
+    open_bursts = _open_bursts(es, list(photo_buckets)) if not dry_run else {}
 
     for cid, photos in photo_buckets.items():
         camera = active_cameras.get(cid, {})
         camera_results = 0
+        camera_docs = []
 
         for photo in photos:
             filename = photo.get("filename") or photo.get("photoId")
             key = _s3_key(cid, filename)
 
+            hashes = {}
             if not dry_run:
                 try:
                     img_bytes = requests.get(photo["photoUrl"], timeout=60).content
@@ -267,15 +302,24 @@ def run_sync(
                 except Exception as exc:
                     logger.error("Camera %s: failed to store %s: %s", cid, filename, exc)
                     continue
+                hashes = image_hashes(img_bytes)
 
             doc = _build_index_doc(photo, camera, key)
-            all_bulk_docs.append({
-                "_index": IMAGES_INDEX,
-                "_id": f"{cid}_{filename}",
-                "_source": doc,
-            })
+            doc.update(hashes)
+            camera_docs.append((f"{cid}_{filename}", doc))
             camera_results += 1
 
+        # Group near-identical frames so only one per burst goes to vision
+        grown = assign_bursts(camera_docs, open_bursts.get(cid))
+        rep_updates.extend(
+            {"_op_type": "update", "_index": IMAGES_INDEX, "_id": rep_id, "doc": {"burst_size": size}}
+            for rep_id, size in grown.items()
+        )
+        all_bulk_docs.extend(
+            {"_index": IMAGES_INDEX, "_id": doc_id, "_source": doc}
+            for doc_id, doc in camera_docs
+        )
+
         results[cid] = camera_results
         logger.info("Camera %s (%s): %d new photos", cid, camera.get("name"), camera_results)
 
@@ -285,8 +329,12 @@ def run_sync(
             results[cid] = 0
 
     if all_bulk_docs and not dry_run:
-        helpers.bulk(es, all_bulk_docs)
-        logger.info("Indexed %d total photos to ES", len(all_bulk_docs))
+        helpers.bulk(es, all_bulk_docs + rep_updates)
+        logger.info(
+            "Indexed %d total photos to ES (%d bursts)",
+            len(all_bulk_docs), sum(1 for d in all_bulk_docs if d["_source"].get("burst_rep")),
+        )
+        publish_image_events("new_photo", (tile(d["_id"], d["_source"]) for d in all_bulk_docs))
 
     # Upsert camera registry
     if not dry_run:
@@ -0,0 +1,71 @@
+"""
+Process-shared OAuth token cache.
+
+The poller runs scheduled syncs, /trigger syncs and backfills on separate
+threads, and `python -m sync.onx_login` runs as a separate process — all of
+them need the same Tactacam / OnX tokens.  Tokens live in a small JSON file on
+the sync volume, guarded by an flock'd sidecar `.lock` file so that only one
+thread in one process refreshes at a time (single-flight).  Everyone else
+waits on the lock and then picks up the freshly written tokens instead of
+logging in again.
+
+Writes go to a temp file + os.replace, so readers never see a torn file.
+"""
+import fcntl
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Refresh this many seconds before the access token actually expires, so a
+# sync that starts just before expiry doesn't fail halfway through.
+REFRESH_MARGIN_SECONDS = int(os.getenv("TOKEN_REFRESH_MARGIN_SECONDS", "300"))
+
+# flock only excludes other open file descriptions; pair it with a per-path
+# thread lock so threads sharing a process queue up cheaply.
+_thread_locks: dict[str, threading.Lock] = {}
+_thread_locks_guard = threading.Lock()
+
+
+def _thread_lock(path: Path) -> threading.Lock:
+    with _thread_locks_guard:
+        return _thread_locks.setdefault(str(path), threading.Lock())
+
+
+class TokenStore:
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._lock_path = self.path.with_name(self.path.name + ".lock")
+
+    def read(self) -> dict:
+        if not self.path.exists():
+            return {}
+        try:
+            return json.loads(self.path.read_text())
+        except Exception as exc:
+            logger.warning("Could not read token file %s: %s", self.path, exc)
+            return {}
+
+    def write(self, data: dict):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
+
+    @contextmanager
+    def locked(self):
+        """Exclusive lock across threads and processes for a refresh cycle."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with _thread_lock(self.path):
+            with open(self._lock_path, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# tools/startup_bench.py
+"""
+Startup-time report for the API and worker entry points.
+
+Imports each target in a fresh interpreter under `python -X importtime`, takes
+the best of --repeat runs, and prints the total import time, the slowest
+top-level imports, and any heavy optional dependency (torch, open_clip,
+onnxruntime, anthropic, boto3, redis, requests, ...) that got pulled in at
+import time.  Those should load on first use, not at boot.
+
+Exits 1 when the API import exceeds --api-budget or an ML module is imported
+eagerly, so it can run in CI.
+
+Usage:
+    python tools/startup_bench.py
+    python tools/startup_bench.py --target app.main --top 25 --json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+# Same layout as the containers: repo root for lib/, plus each service dir
+PYTHONPATH = os.pathsep.join(str(p) for p in (ROOT, ROOT / "backend", ROOT / "worker"))
+
+API_TARGET = "app.main"
+DEFAULT_TARGETS = [
+    API_TARGET,
+    "vision_consumer",
+    "worker_app.jobs.images",
+    "worker_app.jobs.embed_tactacam",
+    "lib.services.image_analyzer",
+    "lib.images.ai",
+]
+ML_MODULES = {"torch", "open_clip", "onnxruntime", "onnx", "transformers", "timm"}
+# informational: elasticsearch's transport itself pulls in requests/aiohttp when installed
+HEAVY_MODULES = ML_MODULES | {"anthropic", "openai", "boto3", "botocore", "redis", "requests", "aiohttp"}
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s+)(\S+)$")
+
+
+def _importtime(target: str) -> list[tuple[int, int, str]]:
+    """[(cumulative_us, depth, module)] for one fresh import of target."""
+    env = dict(os.environ, PYTHONPATH=PYTHONPATH + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        capture_output=True, text=True, env=env, cwd=ROOT,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            rows.append((int(m.group(2)), (len(m.group(3)) - 1) // 2, m.group(4)))
+    if proc.returncode != 0:
+        tail = "\n".join(l for l in proc.stderr.splitlines() if not l.startswith("import time:"))[-1500:]
+        raise RuntimeError(f"import {target} failed:\n{tail}")
+    return rows
+
+
+def report(target: str, repeat: int, top: int) -> dict:
+    best = None
+    for _ in range(repeat):
+        rows = _importtime(target)
+        total = next((cum for cum, depth, mod in reversed(rows) if mod == target), 0)
+        if best is None or total < best[0]:
+            best = (total, rows)
+    total, rows = best
+    direct = sorted(((cum, mod) for cum, depth, mod in rows if depth == 1), reverse=True)[:top]
+    loaded = {mod.split(".")[0] for _, _, mod in rows}
+    return {
+        "target": target,
+        "import_s": round(total / 1e6, 3),
+        "slowest": [{"module": mod, "ms": round(cum / 1e3, 1)} for cum, mod in direct],
+        "heavy_loaded": sorted(loaded & HEAVY_MODULES),
+        "ml_loaded": sorted(loaded & ML_MODULES),
+    }
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Report import-time startup cost of the API and worker modules")
+    ap.add_argument("--target", action="append", help=f"module to import (repeatable; default: {', '.join(DEFAULT_TARGETS)})")
+    ap.add_argument("--repeat", type=int, default=3, help="runs per target; the fastest is reported")
+    ap.add_argument("--top", type=int, default=10, help="slowest direct imports to list")
+    ap.add_argument("--api-budget", type=float, default=1.0, help="max seconds to import the API app")
+    ap.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = ap.parse_args()
+
+    results, failed = [], False
+    for target in args.target or DEFAULT_TARGETS:
+        try:
+            r = report(target, args.repeat, args.top)
+        except RuntimeError as exc:
+            # missing deps for a service that isn't installed here: report, don't fail the run
+            print(f"{target}: skipped ({exc})", file=sys.stderr)
+            continue
+        problems = []
+        if r["ml_loaded"]:
+            problems.append(f"ML modules imported eagerly: {', '.join(r['ml_loaded'])}")
+        if target == API_TARGET and r["import_s"] > args.api_budget:
+            problems.append(f"over the {args.api_budget:.2f}s API budget")
+        r["problems"] = problems
+        failed |= bool(problems)
+        results.append(r)
+
+        if not args.json:
+            print(f"\n{target}: {r['import_s']:.3f}s")
+            for s in r["slowest"]:
+                print(f"  {s['ms']:8.1f} ms  {s['module']}")
+            print(f"  heavy deps at import: {', '.join(r['heavy_loaded']) or 'none'}")
+            for p in problems:
+                print(f"  !! {p}")
+    if args.json:
+        print(json.dumps(results, indent=2))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -57,6 +57,9 @@ interface CameraImage {
   human_notes?: string;
   animal_name?: string;
   animal_id?: string;
+  burst_id?: string;
+  burst_rep?: boolean;
+  burst_size?: number;
 }
 
 interface ActivityHour { hour: number; count: number; }
@@ -170,7 +173,7 @@ function CameraPanel({ camera, onClose }: PanelProps) {
 
     const cid = encodeURIComponent(camera.camera_id);
     Promise.all([
-      fetch(`${API_BASE}/api/trailcams/${cid}/images?limit=12&animals_only=${animalsOnly}`).then(r => r.json()),
+      fetch(`${API_BASE}/api/trailcams/${cid}/images?limit=12&animals_only=${animalsOnly}&collapse_bursts=true`).then(r => r.json()),
       fetch(`${API_BASE}/api/trailcams/${cid}/stats`).then(r => r.json()),
       fetch(`${API_BASE}/api/trailcams/${cid}/activity`).then(r => r.json()),
     ])
@@ -183,6 +186,41 @@ function CameraPanel({ camera, onClose }: PanelProps) {
       .finally(() => setLoading(false));
   }, [camera, animalsOnly]);
 
+  // Live tiles: new photos, finished analysis and label edits for this camera
+  useEffect(() => {
+    if (!camera) return;
+    const cid = encodeURIComponent(camera.camera_id);
+    const ws = new WebSocket(`${API_BASE.replace(/^http/, 'ws')}/api/trailcams/events?camera_id=${cid}`);
+    ws.onmessage = (ev) => {
+      let msg: any;
+      try { msg = JSON.parse(ev.data); } catch { return; }
+      const img = msg?.image as (Partial<CameraImage> & { id: string; camera_id?: string }) | undefined;
+      if (msg?.type === 'camera_refresh' && img?.camera_id === camera.camera_id) {
+        // large sync/backfill: one summary event instead of per-photo tiles
+        fetch(`${API_BASE}/api/trailcams/${cid}/images?limit=12&animals_only=${animalsOnly}&collapse_bursts=true`)
+          .then(r => r.json())
+          .then(imgs => setImages(imgs.images ?? []))
+          .catch(console.error);
+        return;
+      }
+      if (!img?.id || img.camera_id !== camera.camera_id) return;
+      if (msg.type === 'new_photo') {
+        if (animalsOnly || img.burst_rep === false) return;
+        setImages(prev => prev.some(i => i.id === img.id) ? prev : [img as CameraImage, ...prev].slice(0, 12));
+      } else if (msg.type === 'analysis_complete' || msg.type === 'label_updated') {
+        setImages(prev => {
+          const merged = prev.map(i => i.id === img.id ? { ...i, ...img } : i);
+          if (animalsOnly && msg.type === 'analysis_complete' && img.ai_has_animal && !prev.some(i => i.id === img.id)) {
+            return [img as CameraImage, ...merged].slice(0, 12);
+          }
+          return merged;
+        });
+        setSelected(prev => prev && prev.id === img.id ? { ...prev, ...img } : prev);
+      }
+    };
+    return () => ws.close();
+  }, [camera, animalsOnly]);
+
   if (!camera) return null;
 
   const confPct = selected?.ai_confidence != null ? Math.round(selected.ai_confidence * 100) : null;
@@ -973,6 +1011,24 @@ export default function MapClient() {
         paint: { 'text-color': '#111827', 'text-halo-color': '#fff', 'text-halo-width': 1 },
       });
     }
+    if (!map.getLayer('wpt-clusters')) {
+      map.addLayer({
+        id: 'wpt-clusters', type: 'circle', source: 'geo',
+        filter: ['==', ['get', 'kind'], 'cluster'],
+        paint: {
+          'circle-color': '#0ea5e9', 'circle-opacity': 0.8, 'circle-stroke-color': '#fff', 'circle-stroke-width': 1.5,
+          'circle-radius': ['interpolate', ['linear'], ['get', 'count'], 2, 12, 50, 18, 500, 26],
+        },
+      });
+    }
+    if (!map.getLayer('wpt-cluster-counts')) {
+      map.addLayer({
+        id: 'wpt-cluster-counts', type: 'symbol', source: 'geo',
+        filter: ['==', ['get', 'kind'], 'cluster'],
+        layout: { 'text-field': ['to-string', ['get', 'count']], 'text-size': 11 },
+        paint: { 'text-color': '#fff' },
+      });
+    }
     if (!map.getLayer('trk-lines')) {
       map.addLayer({
         id: 'trk-lines', type: 'line', source: 'geo',
@@ -982,14 +1038,74 @@ export default function MapClient() {
     }
   };
 
+  // OnX land areas + markups come from vector tiles: only visible tiles are
+  // fetched and Mapbox reuses them while panning.
+  const ensureOnxTileLayers = (map: mapboxgl.Map) => {
+    if (!map.getSource('geo-tiles')) {
+      map.addSource('geo-tiles', {
+        type: 'vector',
+        tiles: [`${API_BASE}/api/geo/tiles/{z}/{x}/{y}.mvt`],
+        maxzoom: 16,
+        promoteId: 'id',
+      });
+    }
+    const before = map.getLayer('wpt-circles') ? 'wpt-circles' : undefined;
+    if (!map.getLayer('onx-land-fill')) {
+      map.addLayer({
+        id: 'onx-land-fill', type: 'fill', source: 'geo-tiles', 'source-layer': 'land_areas',
+        paint: { 'fill-color': ['coalesce', ['get', 'color'], '#f59e0b'], 'fill-opacity': 0.12 },
+      }, before);
+    }
+    if (!map.getLayer('onx-land-outline')) {
+      map.addLayer({
+        id: 'onx-land-outline', type: 'line', source: 'geo-tiles', 'source-layer': 'land_areas',
+        paint: { 'line-color': ['coalesce', ['get', 'color'], '#f59e0b'], 'line-width': 2 },
+      }, before);
+    }
+    if (!map.getLayer('onx-markups')) {
+      map.addLayer({
+        id: 'onx-markups', type: 'line', source: 'geo-tiles', 'source-layer': 'markups',
+        paint: { 'line-color': ['coalesce', ['get', 'color'], '#a855f7'], 'line-width': 2 },
+      }, before);
+    }
+  };
+
+  const geoDataRef = useRef<FC>({ type: 'FeatureCollection', features: [] });
+
+  const setGeoData = (map: mapboxgl.Map, data: FC) => {
+    geoDataRef.current = data;
+    (map.getSource('geo') as mapboxgl.GeoJSONSource | undefined)?.setData(data as any);
+    const f = data.features;
+    const w = f.reduce((n: number, x: any) =>
+      n + (x.properties?.kind === 'wpt' ? 1 : x.properties?.kind === 'cluster' ? x.properties.count : 0), 0);
+    const t = f.filter((x: any) => x.properties?.kind === 'trk').length;
+    setCounts({ features: w + t });
+  };
+
+  // Patch the loaded features in place from a geo_delta WebSocket event
+  const applyGeoDelta = (map: mapboxgl.Map, changes: any[]) => {
+    const byId = new Map<string, any>(geoDataRef.current.features.map((f: any) => [String(f.id), f]));
+    for (const c of changes) {
+      const id = String(c.id);
+      if (c.op === 'deleted') { byId.delete(id); continue; }
+      const prev = byId.get(id);
+      if (c.op === 'updated' && prev) {
+        byId.set(id, {
+          ...prev,
+          geometry: c.feature?.geometry ?? prev.geometry,
+          properties: { ...prev.properties, ...(c.feature?.properties ?? {}) },
+        });
+      } else if (c.op === 'created' && c.feature?.geometry) {
+        byId.set(id, c.feature);
+      }
+    }
+    setGeoData(map, { type: 'FeatureCollection', features: Array.from(byId.values()) });
+  };
+
   const refresh = async (map: mapboxgl.Map) => {
     try {
-      const data = await j<FC>(`${API_BASE}/api/geo/features?bbox=${encodeURIComponent(bboxParam())}`);
-      (map.getSource('geo') as mapboxgl.GeoJSONSource).setData(data as any);
-      const f = data.features;
-      const w = f.filter((x: any) => x.properties?.kind === 'wpt').length;
-      const t = f.filter((x: any) => x.properties?.kind === 'trk').length;
-      setCounts({ features: w + t });
+      const data = await j<FC>(`${API_BASE}/api/geo/features?bbox=${encodeURIComponent(bboxParam())}&zoom=${Math.floor(map.getZoom())}`);
+      setGeoData(map, data);
     } catch (e) { console.warn('refresh failed', e); }
   };
 
@@ -1028,10 +1144,16 @@ export default function MapClient() {
 
     map.on('load', () => {
       ensureWaypointLayers(map);
+      ensureOnxTileLayers(map);
       refresh(map);
       if (camerasRef.current.length > 0) loadCameraLayer(map, camerasRef.current);
     });
     map.on('moveend', () => refresh(map));
+    map.on('click', 'wpt-clusters', e => {
+      const c = e.features?.[0];
+      if (!c) return;
+      map.easeTo({ center: (c.geometry as any).coordinates, zoom: map.getZoom() + 2 });
+    });
 
     map.on('click', async e => {
       if (modeRef.current !== 'add') return;
@@ -1090,7 +1212,32 @@ export default function MapClient() {
 
     mapRef.current = map;
 
+    // Live geo deltas; on reconnect resume from the last version we applied
+    let ws: WebSocket | null = null;
+    let closed = false;
+    let version: number | null = null;
+    let epoch: string | null = null;
+    const connect = () => {
+      const qs = version != null && epoch ? `?since=${version}&epoch=${epoch}` : '';
+      ws = new WebSocket(`${API_BASE.replace(/^http/, 'ws')}/api/geo/ws${qs}`);
+      ws.onmessage = ev => {
+        const msg = JSON.parse(ev.data);
+        if (msg.type === 'hello') {
+          if (version == null) { version = msg.version; epoch = msg.epoch; }
+        } else if (msg.type === 'geo_delta' || msg.type === 'geo_refresh') {
+          if (version != null && epoch === msg.epoch && msg.version <= version) return;
+          version = msg.version; epoch = msg.epoch;
+          if (msg.type === 'geo_delta') applyGeoDelta(map, msg.changes);
+          else refresh(map);
+        }
+      };
+      ws.onclose = () => { if (!closed) setTimeout(connect, 2000); };
+    };
+    connect();
+
     return () => {
+      closed = true;
+      ws?.close();
       map.remove();
       mapRef.current = null;
     };
@@ -13,6 +13,7 @@ from elasticsearch import Elasticsearch, ApiError
 
 from lib.services.image_analyzer import analyze_bytes
 from lib.search.images_index import ensure_index
+from lib.services.vector_codec import encode_vector
 
 logger = logging.getLogger("vision_consumer")
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
@@ -20,6 +21,8 @@ logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(me
 # --- Env/config ---
 REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
 CHANNEL = os.getenv("IMAGE_UPLOADED_CHANNEL", "image_uploaded")
+# Live UI events (see sync/events.py); the API pushes these to open sockets
+EVENTS_CHANNEL = os.getenv("IMAGE_EVENTS_CHANNEL", "image_events")
 
 ELASTIC_HOST = os.getenv("ELASTIC_SEARCH_HOST")
 ELASTIC_KEY = os.getenv("ELASTIC_SEARCH_API_KEY")
@@ -110,7 +113,20 @@ def _resolve_index_name(index_from_msg, es_client) -> str:
         return DEFAULT_IMAGES_INDEX
 
 
-async def process_message(message: dict):
+async def _publish_analysis_complete(redis, index_name: str, doc_id: str, body: dict):
+    """Tell live map/gallery clients the image now has analysis (best effort)."""
+    event = {
+        "type": "analysis_complete",
+        "image": {"id": doc_id, "index": index_name, "analysis": body.get("analysis"),
+                  "updated_at": body.get("updated_at")},
+    }
+    try:
+        await redis.publish(EVENTS_CHANNEL, json.dumps(event))
+    except Exception as e:
+        logger.warning("Could not publish analysis_complete for %s: %s", doc_id, e)
+
+
+async def process_message(message: dict, redis=None):
     """
     Process a single image_uploaded event:
       - Fetch the image bytes (S3 if bucket+key, else HTTP URL)
@@ -160,13 +176,18 @@ async def process_message(message: dict):
         updated_at = result.get("timestamp") or datetime.now(timezone.utc).isoformat()
         body = {
             "analysis": result.get("analysis"),
-            "embedding": result.get("embedding"),
+            "embedding": encode_vector(result["embedding"]) if result.get("embedding") is not None else None,
             "updated_at": updated_at,
             "processed": True,
         }
+        if body["embedding"] is not None:
+            # watermark for the API's local ANN index (updated_at may be the capture time)
+            body["embedded_at"] = datetime.now(timezone.utc).isoformat()
 
         await _es_update(index_name, doc_id, body)
         logger.info("✅ Updated ES doc %s in %s", doc_id, index_name)
+        if redis is not None:
+            await _publish_analysis_complete(redis, index_name, doc_id, body)
 
     except ApiError as e:
         logger.exception("Elasticsearch API error updating %s/%s: %s", index_name, doc_id, e)
@@ -194,7 +215,7 @@ async def consume_once():
                 logger.warning("Received non-JSON message on %s: %r", CHANNEL, data)
                 continue
 
-            await process_message(payload)
+            await process_message(payload, redis)
 
     finally:
         try:
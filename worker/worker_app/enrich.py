@@ -21,6 +21,7 @@ import io
 import sys
 import argparse
 import hashlib
+from datetime import datetime, timezone
 from typing import List, Dict, Any, Optional, Tuple
 
 import boto3
@@ -29,6 +30,9 @@ from PIL import Image
 
 from elasticsearch import Elasticsearch
 
+from lib.services import clip_backend
+from lib.services.vector_codec import encode_vector
+
 # ---- Config (env) -----------------------------------------------------------
 ES_HOST = os.getenv("ELASTIC_SEARCH_HOST")
 ES_API_KEY = os.getenv("ELASTIC_SEARCH_API_KEY")
@@ -81,26 +85,14 @@ def download_image(bucket: str, key: str) -> bytes:
     return r["Body"].read()
 
 
-# ---- Embedding (open-clip optional) ----------------------------------------
+# ---- Embedding (CLIP optional) ----------------------------------------------
 def try_open_clip_embed(img: Image.Image) -> Optional[List[float]]:
     """
-    If open-clip + torch are available, use CLIP embeddings.
-    If not, return None and we’ll fallback.
+    If a CLIP backend is available (torch or ONNX, see CLIP_BACKEND), use CLIP
+    embeddings. If not, return None and we’ll fallback.
     """
     try:
-        import torch
-        import open_clip
-
-        model, _, preprocess = open_clip.create_model_and_transforms(
-            "ViT-B-32", pretrained="openai"
-        )
-        model.eval()
-        with torch.no_grad():
-            image = preprocess(img).unsqueeze(0)
-            features = model.encode_image(image)
-            features = features / features.norm(dim=-1, keepdim=True)
-            vec = features.squeeze(0).cpu().numpy().astype(np.float32)
-            return vec.tolist()
+        return clip_backend.get("ViT-B-32", "openai").encode_images([img])[0].tolist()
     except Exception:
         return None
 
@@ -193,7 +185,8 @@ def process_one(es: Elasticsearch, doc: Dict[str, Any]) -> bool:
         emb = embed_image(img_bytes)
         is_deer, animal, sex, age, prob = classify_whitetail(img_bytes)
         update_doc(es, _id, {
-            "embedding": emb,
+            "embedding": encode_vector(emb),
+            "embedded_at": datetime.now(timezone.utc).isoformat(),  # API ANN refresh watermark
             "is_deer": is_deer,
             "animal": animal if is_deer else None,
             "sex": sex if is_deer else "unknown",
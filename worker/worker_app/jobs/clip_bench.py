@@ -0,0 +1,134 @@
+"""
+Compare CLIP inference backends: cold start and images/sec.
+
+For each backend:
+  startup_s   fresh interpreter: import + model load + first embedding,
+              i.e. what a worker pays before its first job
+  images/s    warm end-to-end throughput (JPEG decode, preprocess, encode)
+              in batches of --batch
+
+plus a decode-only section (no model): the old full-resolution decode +
+open_clip-style resize, lib.images.preprocess in-process, and its process
+pool with --workers.
+
+Usage:
+    docker compose exec worker python -m worker_app.jobs.clip_bench --images /data/samples
+    docker compose exec worker python -m worker_app.jobs.clip_bench --backend torch --backend onnx-int8 --threads 4
+"""
+from __future__ import annotations
+
+import argparse
+import glob
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+from lib.images import preprocess
+from lib.services import clip_backend
+
+_COLD = (
+    "import time; t = time.perf_counter(); "
+    "from lib.services import clip_backend; from PIL import Image; "
+    "clip_backend.get({model!r}, {pretrained!r}, backend={backend!r})"
+    ".encode_images([Image.new('RGB', (640, 480))]); "
+    "print(time.perf_counter() - t)"
+)
+
+
+def _images(images_dir: str | None, n: int) -> list[bytes]:
+    paths = sorted(glob.glob(os.path.join(images_dir, "*.jp*g")))[:n] if images_dir else []
+    if paths:
+        return [open(p, "rb").read() for p in paths]
+    rng = np.random.default_rng(0)
+    out = []
+    for _ in range(n):
+        buf = io.BytesIO()
+        Image.fromarray((rng.random((48, 64, 3)) * 255).astype(np.uint8)).resize((1920, 1080)).save(buf, "JPEG")
+        out.append(buf.getvalue())
+    return out
+
+
+def _startup(backend: str, model: str, pretrained: str, env: dict) -> float | None:
+    proc = subprocess.run(
+        [sys.executable, "-c", _COLD.format(model=model, pretrained=pretrained, backend=backend)],
+        capture_output=True, text=True, env=env,
+    )
+    if proc.returncode != 0:
+        print(proc.stderr[-2000:], file=sys.stderr)
+        return None
+    return round(float(proc.stdout.strip().splitlines()[-1]), 2)
+
+
+def _naive_decode(image_bytes: bytes) -> np.ndarray:
+    # what every embedding path did before lib.images.preprocess
+    img = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+    return preprocess.from_image(img)
+
+
+def decode_bench(images: list[bytes], batch: int, workers: int) -> dict:
+    def rate(fn) -> float:
+        t0 = time.perf_counter()
+        fn()
+        return round(len(images) / (time.perf_counter() - t0), 1)
+
+    row = {
+        "full_decode_per_s": rate(lambda: [_naive_decode(b) for b in images]),
+        "draft_decode_per_s": rate(lambda: [preprocess.decode(b) for b in images]),
+    }
+    with preprocess.Preprocessor(batch, workers=workers) as pre:
+        pre.load(images[:batch])  # spawn workers
+        row[f"pool_{workers}_per_s"] = rate(
+            lambda: [pre.load(images[i:i + batch]) for i in range(0, len(images), batch)])
+    print(f"{'decode':10s} {row}", file=sys.stderr)
+    return row
+
+
+def run(backends: list[str], model: str, pretrained: str, images: list[bytes], batch: int, threads: int,
+        workers: int = preprocess.PREPROCESS_WORKERS) -> dict:
+    env = dict(os.environ)
+    if threads:
+        env.update(CLIP_ONNX_THREADS=str(threads), OMP_NUM_THREADS=str(threads))
+        clip_backend.ONNX_THREADS = threads
+        try:
+            import torch
+            torch.set_num_threads(threads)
+        except ImportError:
+            pass
+
+    report = {"model": f"{model}/{pretrained}", "images": len(images), "batch": batch, "threads": threads, "backends": {}}
+    report["decode"] = decode_bench(images, batch, workers)
+    for backend in backends:
+        row: dict = {"startup_s": _startup(backend, model, pretrained, env)}
+        enc = clip_backend.get(model, pretrained, backend=backend)
+        if enc.name != backend:
+            row["note"] = f"fell back to {enc.name}"
+        enc.encode_bytes(images[:1])  # warm-up
+        t0 = time.perf_counter()
+        for i in range(0, len(images), batch):
+            enc.encode_bytes(images[i:i + batch])
+        row["images_per_s"] = round(len(images) / (time.perf_counter() - t0), 1)
+        report["backends"][backend] = row
+        print(f"{backend:10s} {row}", file=sys.stderr)
+    return report
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Benchmark CLIP backends")
+    ap.add_argument("--backend", action="append", help="torch | onnx | onnx-int8 (repeatable; default all)")
+    ap.add_argument("--model", default="ViT-B-32")
+    ap.add_argument("--pretrained", default="laion2b_s34b_b79k")
+    ap.add_argument("--images", help="directory of JPEGs (default: synthetic 1080p frames)")
+    ap.add_argument("-n", type=int, default=64, help="images to embed per backend")
+    ap.add_argument("--batch", type=int, default=16)
+    ap.add_argument("--threads", type=int, default=0, help="intra-op threads for torch and ORT (0 = default)")
+    ap.add_argument("--workers", type=int, default=preprocess.PREPROCESS_WORKERS, help="decode pool processes")
+    args = ap.parse_args()
+    result = run(args.backend or ["torch", "onnx", "onnx-int8"], args.model, args.pretrained,
+                 _images(args.images, args.n), args.batch, args.threads, args.workers)
+    print(json.dumps(result, indent=2))
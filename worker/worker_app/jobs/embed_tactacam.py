@@ -3,45 +3,45 @@ Backfill CLIP embeddings for tactacam-images documents.
 
 Finds analyzed images missing the `embedding` field, downloads each from S3,
 generates a 512-dim CLIP (ViT-B-32) embedding, and writes it back to ES.
+Non-representative burst frames (burst_rep=false) are near-duplicates of their
+representative and are skipped.
+
+Images are processed --batch at a time: S3 downloads run on a thread pool,
+JPEG decode + preprocess on --workers processes (lib.images.preprocess), and
+each batch goes through the encoder in one call.
 
 Usage:
     docker compose exec worker python -m worker_app.jobs.embed_tactacam
     docker compose exec worker python -m worker_app.jobs.embed_tactacam --limit 100 --batch 10
+    docker compose exec worker python -m worker_app.jobs.embed_tactacam --limit 5000 --batch 64 --workers 6
 """
 from __future__ import annotations
 
 import argparse
-import io
 import logging
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 
 import boto3
-import torch
-import open_clip
-from PIL import Image
 from botocore.client import Config
 from elasticsearch import Elasticsearch, helpers
 
+from lib.images import preprocess
+from lib.services import clip_backend
+from lib.services.vector_codec import encode_vector
+
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 logger = logging.getLogger(__name__)
 
 IMAGES_INDEX = "tactacam-images"
 S3_BUCKET = os.getenv("S3_BUCKET", "trailcam-images")
+S3_FETCH_THREADS = int(os.getenv("S3_FETCH_THREADS", "8"))
 
-_MODEL = None
-_PREPROCESS = None
-
-
-def _load_clip():
-    global _MODEL, _PREPROCESS
-    if _MODEL is None:
-        logger.info("Loading CLIP ViT-B-32...")
-        _MODEL, _, _PREPROCESS = open_clip.create_model_and_transforms(
-            "ViT-B-32", pretrained="laion2b_s34b_b79k"
-        )
-        _MODEL.eval()
-        logger.info("CLIP loaded")
+# Must match lib.services.image_embed (the API embeds queries with it)
+CLIP_MODEL = "ViT-B-32"
+CLIP_PRETRAINED = "laion2b_s34b_b79k"
 
 
 def _es() -> Elasticsearch:
@@ -62,16 +62,6 @@ def _s3():
     )
 
 
-@torch.inference_mode()
-def _embed(image_bytes: bytes) -> list[float]:
-    _load_clip()
-    img = Image.open(io.BytesIO(image_bytes)).convert("RGB")
-    t = _PREPROCESS(img).unsqueeze(0)
-    feats = _MODEL.encode_image(t)
-    feats = feats / feats.norm(dim=-1, keepdim=True)
-    return feats[0].cpu().numpy().tolist()
-
-
 def _fetch_candidates(es: Elasticsearch, limit: int) -> list[dict]:
     resp = es.search(
         index=IMAGES_INDEX,
@@ -80,7 +70,10 @@ def _fetch_candidates(es: Elasticsearch, limit: int) -> list[dict]:
             "query": {
                 "bool": {
                     "must": [{"term": {"ai_analyzed": True}}],
-                    "must_not": [{"exists": {"field": "embedding"}}],
+                    "must_not": [
+                        {"exists": {"field": "embedding"}},
+                        {"term": {"burst_rep": False}},
+                    ],
                 }
             },
             "sort": [{"ai_analyzed_at": "desc"}],
@@ -90,7 +83,19 @@ def _fetch_candidates(es: Elasticsearch, limit: int) -> list[dict]:
     return resp["hits"]["hits"]
 
 
-def run(limit: int = 500, batch_size: int = 20) -> dict:
+def _download(s3, hit: dict) -> bytes | None:
+    s3_key = hit["_source"].get("s3_key")
+    if not s3_key:
+        logger.warning("Doc %s has no s3_key, skipping", hit["_id"])
+        return None
+    try:
+        return s3.get_object(Bucket=S3_BUCKET, Key=s3_key)["Body"].read()
+    except Exception as exc:
+        logger.error("Failed %s (%s): %s", hit["_id"], hit["_source"].get("camera_name", "?"), exc)
+        return None
+
+
+def run(limit: int = 500, batch_size: int = 20, workers: int = preprocess.PREPROCESS_WORKERS) -> dict:
     es = _es()
     s3 = _s3()
 
@@ -99,45 +104,47 @@ def run(limit: int = 500, batch_size: int = 20) -> dict:
         logger.info("No documents missing embeddings")
         return {"processed": 0, "errors": 0}
 
-    logger.info("Embedding %d images with CLIP ViT-B-32", len(docs))
+    logger.info("Embedding %d images with CLIP ViT-B-32 (%d decode workers)", len(docs), workers)
     stats = {"processed": 0, "errors": 0}
-    bulk_ops = []
-
-    for hit in docs:
-        doc_id = hit["_id"]
-        s3_key = hit["_source"].get("s3_key")
-        camera = hit["_source"].get("camera_name", "?")
-
-        if not s3_key:
-            logger.warning("Doc %s has no s3_key, skipping", doc_id)
-            stats["errors"] += 1
-            continue
-
-        try:
-            obj = s3.get_object(Bucket=S3_BUCKET, Key=s3_key)
-            image_bytes = obj["Body"].read()
-            embedding = _embed(image_bytes)
-
-            bulk_ops.append({
-                "_op_type": "update",
-                "_index": IMAGES_INDEX,
-                "_id": doc_id,
-                "doc": {"embedding": embedding},
-            })
-            stats["processed"] += 1
-
-            if len(bulk_ops) >= batch_size:
-                helpers.bulk(es, bulk_ops)
-                logger.info("  flushed %d embeddings", len(bulk_ops))
-                bulk_ops.clear()
-
-        except Exception as exc:
-            logger.error("Failed %s (%s): %s", doc_id, camera, exc)
-            stats["errors"] += 1
-
-    if bulk_ops:
-        helpers.bulk(es, bulk_ops)
-        logger.info("  flushed %d embeddings", len(bulk_ops))
+    # backend chosen by CLIP_BACKEND (torch | onnx | onnx-int8)
+    clip = clip_backend.get(CLIP_MODEL, CLIP_PRETRAINED)
+
+    with preprocess.Preprocessor(batch_size, workers=workers) as pre, \
+            ThreadPoolExecutor(max_workers=S3_FETCH_THREADS) as fetch:
+        for start in range(0, len(docs), batch_size):
+            chunk = docs[start:start + batch_size]
+            blobs = list(fetch.map(lambda hit: _download(s3, hit), chunk))
+            fetched = [(hit, b) for hit, b in zip(chunk, blobs) if b is not None]
+            stats["errors"] += len(chunk) - len(fetched)
+            if not fetched:
+                continue
+
+            batch, ok = pre.load([b for _, b in fetched])
+            stats["errors"] += int((~ok).sum())
+            if not ok.any():
+                continue
+            try:
+                embeddings = clip.encode_batch(batch)
+            except Exception as exc:
+                logger.error("Encoding batch at %d failed: %s", start, exc)
+                stats["errors"] += int(ok.sum())
+                continue
+
+            now = datetime.now(timezone.utc).isoformat()
+            hits = [hit for (hit, _), good in zip(fetched, ok) if good]
+            bulk_ops = [
+                {
+                    "_op_type": "update",
+                    "_index": IMAGES_INDEX,
+                    "_id": hit["_id"],
+                    # embedded_at is the watermark the API's local ANN index refreshes from
+                    "doc": {"embedding": encode_vector(emb), "embedded_at": now},
+                }
+                for hit, emb in zip(hits, embeddings)
+            ]
+            helpers.bulk(es, bulk_ops)
+            stats["processed"] += len(bulk_ops)
+            logger.info("  flushed %d embeddings", len(bulk_ops))
 
     logger.info("Done: %d embedded, %d errors", stats["processed"], stats["errors"])
     return stats
@@ -146,7 +153,9 @@ def run(limit: int = 500, batch_size: int = 20) -> dict:
 if __name__ == "__main__":
     ap = argparse.ArgumentParser(description="Backfill CLIP embeddings for tactacam-images")
     ap.add_argument("--limit", type=int, default=500, help="max docs to process")
-    ap.add_argument("--batch", type=int, default=20, help="ES bulk flush size")
+    ap.add_argument("--batch", type=int, default=20, help="images per encoder batch / ES bulk flush")
+    ap.add_argument("--workers", type=int, default=preprocess.PREPROCESS_WORKERS,
+                    help="decode processes (0 = decode in-process)")
     args = ap.parse_args()
-    result = run(limit=args.limit, batch_size=args.batch)
+    result = run(limit=args.limit, batch_size=args.batch, workers=args.workers)
     sys.exit(0 if result["errors"] == 0 else 1)
@@ -0,0 +1,169 @@
+"""
+Export a CLIP model to ONNX for the onnx / onnx-int8 backends.
+
+Writes <CLIP_ONNX_DIR>/<model>-<pretrained>/:
+  visual.onnx        image tower, dynamic batch, input "image" (N,3,224,224)
+  visual.int8.onnx   dynamically int8-quantized image tower (--int8)
+  textual.onnx       text tower, dynamic batch, input "text" (N,77) int64
+  meta.json          export settings and the tolerance check results
+
+The check embeds sample images (and a few prompts) with the torch backend and
+each exported variant and reports the cosine between them.  The export fails
+(exit 1) if any variant falls under its --min-cos, so a bad export never gets
+picked up by CLIP_BACKEND=onnx.
+
+Usage:
+    docker compose exec worker python -m worker_app.jobs.export_clip_onnx --int8 --images /data/samples
+    docker compose exec worker python -m worker_app.jobs.export_clip_onnx --pretrained openai
+"""
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+from lib.services import clip_backend
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+logger = logging.getLogger(__name__)
+
+PROMPTS = [
+    "a trail camera photo of a deer",
+    "a whitetail buck with antlers at night",
+    "an empty field in the rain",
+]
+
+
+def _export(model_name: str, pretrained: str, out: str, opset: int) -> None:
+    import open_clip
+    import torch
+
+    model, _, _ = open_clip.create_model_and_transforms(model_name, pretrained=pretrained)
+    model.eval()
+    tok = open_clip.get_tokenizer(model_name)
+
+    class Visual(torch.nn.Module):
+        def __init__(self, m):
+            super().__init__()
+            self.m = m
+
+        def forward(self, image):
+            return self.m.encode_image(image)
+
+    class Textual(Visual):
+        def forward(self, text):
+            return self.m.encode_text(text)
+
+    # Trace with batch 2: a batch-1 example gets specialized and loses the dynamic axis
+    with torch.inference_mode():
+        torch.onnx.export(
+            Visual(model), (torch.randn(2, 3, clip_backend.IMAGE_SIZE, clip_backend.IMAGE_SIZE),),
+            os.path.join(out, "visual.onnx"),
+            input_names=["image"], output_names=["image_embeds"],
+            dynamic_axes={"image": {0: "batch"}, "image_embeds": {0: "batch"}},
+            opset_version=opset,
+        )
+        torch.onnx.export(
+            Textual(model), (tok(PROMPTS[:2]),),
+            os.path.join(out, "textual.onnx"),
+            input_names=["text"], output_names=["text_embeds"],
+            dynamic_axes={"text": {0: "batch"}, "text_embeds": {0: "batch"}},
+            opset_version=opset,
+        )
+
+
+def _quantize(out: str) -> None:
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    # Weight-only dynamic quantization: MatMul/Gemm weights to int8, activations
+    # quantized on the fly, so no calibration set is needed.
+    quantize_dynamic(
+        os.path.join(out, "visual.onnx"),
+        os.path.join(out, "visual.int8.onnx"),
+        weight_type=QuantType.QInt8,
+    )
+
+
+def _sample_images(pattern_dir: str | None, n: int) -> list[Image.Image]:
+    paths = sorted(glob.glob(os.path.join(pattern_dir, "*.jp*g")))[:n] if pattern_dir else []
+    if paths:
+        return [Image.open(p).convert("RGB") for p in paths]
+    logger.warning("No --images given; checking on synthetic images (use real photos for a meaningful check)")
+    rng = np.random.default_rng(0)
+    return [
+        Image.fromarray((rng.random((48, 64, 3)) * 255).astype(np.uint8)).resize((640, 480), Image.Resampling.BICUBIC)
+        for _ in range(n)
+    ]
+
+
+def _check(model_name: str, pretrained: str, images: list[Image.Image], variants: list[str]) -> dict:
+    ref = clip_backend.get(model_name, pretrained, backend="torch")
+    ref_img, ref_txt = ref.encode_images(images), ref.encode_text(PROMPTS)
+    results = {}
+    for backend in variants:
+        enc = clip_backend.OnnxClip(model_name, pretrained, int8=backend == "onnx-int8")
+        cos = np.sum(enc.encode_images(images) * ref_img, axis=1)
+        results[backend] = {"image_cos_min": round(float(cos.min()), 5), "image_cos_mean": round(float(cos.mean()), 5)}
+        if backend == "onnx":
+            txt = np.sum(enc.encode_text(PROMPTS) * ref_txt, axis=1)
+            results[backend]["text_cos_min"] = round(float(txt.min()), 5)
+        logger.info("%s vs torch: %s", backend, results[backend])
+    return results
+
+
+def run(model_name: str, pretrained: str, int8: bool, images_dir: str | None, n_images: int,
+        min_cos: float, min_cos_int8: float, opset: int) -> dict:
+    out = clip_backend.model_dir(model_name, pretrained)
+    os.makedirs(out, exist_ok=True)
+    t0 = time.perf_counter()
+    _export(model_name, pretrained, out, opset)
+    if int8:
+        _quantize(out)
+    logger.info("Exported %s/%s to %s in %.1fs", model_name, pretrained, out, time.perf_counter() - t0)
+
+    variants = ["onnx"] + (["onnx-int8"] if int8 else [])
+    check = _check(model_name, pretrained, _sample_images(images_dir, n_images), variants)
+    thresholds = {"onnx": min_cos, "onnx-int8": min_cos_int8}
+    ok = all(
+        min(v for k, v in r.items() if k.endswith("_min")) >= thresholds[b]
+        for b, r in check.items()
+    )
+    meta = {
+        "model": model_name, "pretrained": pretrained, "opset": opset,
+        "exported_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "check": check, "thresholds": thresholds, "ok": ok,
+    }
+    with open(os.path.join(out, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+    if not ok:
+        # don't leave an out-of-tolerance export where the backend would load it
+        for name in ("visual.onnx", "visual.int8.onnx", "textual.onnx"):
+            path = os.path.join(out, name)
+            if os.path.exists(path):
+                os.replace(path, path + ".rejected")
+        logger.error("Export outside tolerance; files renamed *.rejected")
+    return meta
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Export CLIP to ONNX and check it against torch")
+    ap.add_argument("--model", default="ViT-B-32")
+    ap.add_argument("--pretrained", default="laion2b_s34b_b79k")
+    ap.add_argument("--int8", action="store_true", help="also write a dynamically int8-quantized image tower")
+    ap.add_argument("--images", help="directory of sample JPEGs for the tolerance check")
+    ap.add_argument("--n-images", type=int, default=32)
+    ap.add_argument("--min-cos", type=float, default=0.999, help="min cosine vs torch for fp32 ONNX")
+    ap.add_argument("--min-cos-int8", type=float, default=0.98, help="min cosine vs torch for int8 ONNX")
+    ap.add_argument("--opset", type=int, default=17)
+    args = ap.parse_args()
+    result = run(args.model, args.pretrained, args.int8, args.images, args.n_images,
+                 args.min_cos, args.min_cos_int8, args.opset)
+    print(json.dumps(result, indent=2))
+    sys.exit(0 if result["ok"] else 1)
@@ -2,8 +2,9 @@ import time, json
 from datetime import datetime, timezone
 from elasticsearch import Elasticsearch
 from lib.images.io import parse_exif
-from lib.images.ai import image_embedding_and_scores
+from lib.images.ai import classify_images
 from lib.search.images_bootstrap import IMAGES_INDEX, ensure_index
+from lib.services.vector_codec import encode_vector
 
 def process_and_index_image(*, es_url: str, es_api_key: str, doc: dict, raw: bytes):
     es = Elasticsearch(es_url, api_key=es_api_key, request_timeout=60)
@@ -15,7 +16,7 @@ def process_and_index_image(*, es_url: str, es_api_key: str, doc: dict, raw: byt
     except Exception:
         pass
 
-    emb, contains_deer, deer_kind, age_bucket, scores = image_embedding_and_scores(raw)
+    result = classify_images([raw])[0]
 
     doc["ingested_at"] = datetime.now(timezone.utc).isoformat()
     if "gps" not in doc and "gps" in exif:
@@ -27,12 +28,15 @@ def process_and_index_image(*, es_url: str, es_api_key: str, doc: dict, raw: byt
     doc["camera_make"]  = doc.get("camera_make")  or exif.get("camera_make")
     doc["camera_model"] = doc.get("camera_model") or exif.get("camera_model")
     doc["ai"] = {
-        "contains_deer": contains_deer,
-        "deer_kind": deer_kind,
-        "age_bucket": age_bucket,
-        "scores": scores
+        "contains_deer": result["contains_deer"],
+        "deer_kind": result["deer_kind"],
+        "age_bucket": result["age_bucket"],
+        "scores": result["scores"],
+        "labels": result["labels"],
+        "label_scores": result["label_scores"],
     }
-    doc["embedding"] = emb.tolist()
+    doc["embedding"] = encode_vector(result["embedding"])
+    doc["embedded_at"] = datetime.now(timezone.utc).isoformat()  # API ANN refresh watermark
 
     es.index(index=IMAGES_INDEX, id=doc["image_id"], document=doc)
     return {"indexed": True, "id": doc["image_id"], "ai": doc["ai"]}
@@ -0,0 +1,359 @@
+"""
+Suggest individual-animal ids for deer photos by clustering CLIP embeddings.
+
+Hunters name bucks by hand (label_image sets animal_id / animal_name).  This
+job groups the rest of the deer photos around those labels, per property:
+
+  * every human animal_id is a seeded cluster whose centroid is the mean of
+    its labeled embeddings;
+  * an unlabeled photo joins the most similar centroid if cosine >= --threshold,
+    otherwise it opens a new unnamed cluster (leader clustering), so each
+    photo costs one dot product per existing cluster;
+  * unnamed clusters that have drifted within --merge of a seed are folded
+    into it.
+
+Centroids persist in tactacam-animal-clusters, so a normal run only looks at
+photos without a suggestion yet; --full re-clusters everything.  Suggestions
+go to reid_animal_id / reid_animal_name / reid_score and never overwrite the
+human animal_id.
+
+Whole-frame CLIP embeddings carry a lot of background, so photos of different
+deer from the same camera still score high: keep --threshold conservative and
+treat the output as suggestions to confirm.
+
+Usage:
+    docker compose exec worker python -m worker_app.jobs.reid_cluster
+    docker compose exec worker python -m worker_app.jobs.reid_cluster --property <property_id> --full
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import sys
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Optional
+
+import numpy as np
+from elasticsearch import Elasticsearch, helpers
+
+from lib.services.vector_codec import decode_vector, encode_vector
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+logger = logging.getLogger(__name__)
+
+IMAGES_INDEX = "tactacam-images"
+CLUSTERS_INDEX = "tactacam-animal-clusters"
+DIM = 512
+DEER_SPECIES = ("White-tailed deer", "Mule deer")
+
+CLUSTERS_MAPPING = {
+    "properties": {
+        "property_id": {"type": "keyword"},
+        "animal_id": {"type": "keyword"},
+        "animal_name": {"type": "keyword"},
+        "seeded": {"type": "boolean"},
+        "count": {"type": "integer"},
+        "centroid": {"type": "dense_vector", "dims": DIM, "index": False},
+        "updated_at": {"type": "date"},
+    }
+}
+
+
+def _es() -> Elasticsearch:
+    return Elasticsearch(
+        hosts=[os.environ["ELASTIC_SEARCH_HOST"]],
+        api_key=os.environ["ELASTIC_SEARCH_API_KEY"],
+        request_timeout=120,
+    )
+
+
+def _unit(m: np.ndarray) -> np.ndarray:
+    n = np.linalg.norm(m, axis=-1, keepdims=True)
+    return m / np.where(n == 0, 1, n)
+
+
+def _scope(property_id: str) -> dict:
+    """Filter for one property ("" = photos with no property_id)."""
+    if property_id:
+        return {"term": {"property_id": property_id}}
+    return {"bool": {"must_not": [{"exists": {"field": "property_id"}}]}}
+
+
+class ClusterSet:
+    """Cluster centroids for one property, kept as running sums."""
+
+    def __init__(self, property_id: str):
+        self.property_id = property_id
+        self.ids: list[str] = []
+        self.names: list[Optional[str]] = []
+        self.seeded = np.zeros(0, dtype=bool)
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.sums = np.zeros((0, DIM), dtype=np.float32)
+        self.removed: set[int] = set()
+
+    def add(self, animal_id: str, name: Optional[str], seeded: bool, vec_sum: np.ndarray, count: int) -> int:
+        self.ids.append(animal_id)
+        self.names.append(name)
+        self.seeded = np.append(self.seeded, seeded)
+        self.counts = np.append(self.counts, count)
+        self.sums = np.vstack([self.sums, vec_sum.reshape(1, DIM).astype(np.float32)])
+        return len(self.ids) - 1
+
+    def _live(self) -> np.ndarray:
+        live = np.ones(len(self.ids), dtype=bool)
+        live[list(self.removed)] = False
+        return live
+
+    def assign(self, vecs: np.ndarray, threshold: float) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Cluster row + cosine for each (unit) vector, in order.  Matches against
+        the existing centroids are one matmul; only photos that open or join a
+        cluster created in this batch are handled one by one.
+        """
+        n = vecs.shape[0]
+        rows = np.full(n, -1, dtype=np.int64)
+        scores = np.zeros(n, dtype=np.float32)
+        start = len(self.ids)
+        if start:
+            sims = vecs @ _unit(self.sums).T
+            sims[:, ~self._live()] = -1.0
+            best = sims.argmax(axis=1)
+            best_sim = sims[np.arange(n), best]
+            hit = best_sim >= threshold
+            rows[hit], scores[hit] = best[hit], best_sim[hit]
+
+        for i in np.flatnonzero(rows < 0):
+            if len(self.ids) > start:
+                sims = _unit(self.sums[start:]) @ vecs[i]
+                j = int(sims.argmax())
+                if sims[j] >= threshold:
+                    rows[i], scores[i] = start + j, sims[j]
+                    self.sums[start + j] += vecs[i]
+                    self.counts[start + j] += 1
+                    continue
+            rows[i] = self.add(f"unk-{uuid.uuid4().hex[:10]}", None, False, vecs[i], 1)
+            scores[i] = 1.0
+
+        # Seeds stay the mean of human-labeled photos; suggestions don't move them.
+        grow = (rows < start) & ~self.seeded[rows]
+        np.add.at(self.sums, rows[grow], vecs[grow])
+        np.add.at(self.counts, rows[grow], 1)
+        return rows, scores
+
+    def merge_into_seeds(self, threshold: float) -> dict[int, int]:
+        """Fold unnamed clusters that sit within `threshold` of a seed. Returns {from_row: seed_row}."""
+        live = self._live()
+        seeds = np.flatnonzero(self.seeded & live)
+        free = np.flatnonzero(~self.seeded & live)
+        if not len(seeds) or not len(free):
+            return {}
+        unit = _unit(self.sums)
+        sims = unit[free] @ unit[seeds].T
+        best = sims.argmax(axis=1)
+        merged = {}
+        for f, b, s in zip(free, best, sims[np.arange(len(free)), best]):
+            if s >= threshold:
+                merged[int(f)] = int(seeds[b])
+                self.removed.add(int(f))
+        return merged
+
+
+def _ensure_clusters_index(es: Elasticsearch) -> None:
+    if not es.indices.exists(index=CLUSTERS_INDEX):
+        es.indices.create(index=CLUSTERS_INDEX, mappings=CLUSTERS_MAPPING)
+
+
+def _base_query(property_id: Optional[str]) -> list:
+    return [{"exists": {"field": "embedding"}}] + ([_scope(property_id)] if property_id is not None else [])
+
+
+def _load_seeds(es: Elasticsearch, property_id: Optional[str]) -> dict[str, dict[str, dict]]:
+    """Human animal_id groups -> {property: {animal_id: {sum, count, name, ts}}}."""
+    seeds: dict[str, dict[str, dict]] = defaultdict(dict)
+    query = {"bool": {"filter": _base_query(property_id) + [{"exists": {"field": "animal_id"}}]}}
+    for hit in helpers.scan(es, index=IMAGES_INDEX, size=1000, query={
+        "query": query, "_source": ["embedding", "property_id", "animal_id", "animal_name", "@timestamp"],
+    }):
+        src = hit["_source"]
+        vec = decode_vector(src["embedding"])
+        if vec.shape != (DIM,):
+            continue
+        seed = seeds[src.get("property_id") or ""].setdefault(
+            src["animal_id"], {"sum": np.zeros(DIM, dtype=np.float32), "count": 0, "name": None, "ts": ""})
+        seed["sum"] += _unit(vec)
+        seed["count"] += 1
+        # latest labeled photo wins the display name
+        if src.get("animal_name") and (src.get("@timestamp") or "") >= seed["ts"]:
+            seed["name"], seed["ts"] = src["animal_name"], src.get("@timestamp") or ""
+    return seeds
+
+
+def _load_clusters(es: Elasticsearch, property_id: Optional[str], full: bool) -> dict[str, ClusterSet]:
+    """Stored unnamed clusters keyed by property (none with --full: they are rebuilt)."""
+    sets: dict[str, ClusterSet] = {}
+    if full or not es.indices.exists(index=CLUSTERS_INDEX):
+        return sets
+    query = {"bool": {"filter": [{"term": {"seeded": False}}] + ([_scope(property_id)] if property_id is not None else [])}}
+    for hit in helpers.scan(es, index=CLUSTERS_INDEX, size=1000, query={"query": query}):
+        src = hit["_source"]
+        pid = src.get("property_id") or ""
+        cs = sets.setdefault(pid, ClusterSet(pid))
+        cs.add(src["animal_id"], src.get("animal_name"), False,
+               decode_vector(src["centroid"]) * src["count"], src["count"])
+    return sets
+
+
+def _stored_seed_names(es: Elasticsearch) -> dict[tuple[str, str], Optional[str]]:
+    names = {}
+    for hit in helpers.scan(es, index=CLUSTERS_INDEX, size=1000,
+                            query={"query": {"term": {"seeded": True}}, "_source": ["property_id", "animal_id", "animal_name"]}):
+        src = hit["_source"]
+        names[(src.get("property_id") or "", src["animal_id"])] = src.get("animal_name")
+    return names
+
+
+def _fetch_unlabeled(es: Elasticsearch, property_id: Optional[str], species: list[str], full: bool):
+    must_not = [{"exists": {"field": "animal_id"}}]
+    if not full:
+        must_not.append({"exists": {"field": "reid_at"}})
+    query = {"bool": {
+        "filter": _base_query(property_id) + [{"bool": {"should": [
+            {"terms": {"human_species": species}},
+            {"bool": {"filter": [{"terms": {"ai_species": species}}],
+                      "must_not": [{"exists": {"field": "human_species"}}]}},
+        ], "minimum_should_match": 1}}],
+        "must_not": must_not,
+    }}
+    by_property: dict[str, list] = defaultdict(list)
+    for hit in helpers.scan(es, index=IMAGES_INDEX, size=1000, query={
+        "query": query, "_source": ["embedding", "property_id", "@timestamp"],
+    }):
+        src = hit["_source"]
+        vec = decode_vector(src["embedding"])
+        if vec.shape == (DIM,):
+            by_property[src.get("property_id") or ""].append((src.get("@timestamp") or "", hit["_id"], vec))
+    return by_property
+
+
+def _rename(es: Elasticsearch, property_id: str, old_ids: list[str], animal_id: str, name: Optional[str]) -> None:
+    es.update_by_query(
+        index=IMAGES_INDEX,
+        query={"bool": {"filter": [_scope(property_id), {"terms": {"reid_animal_id": old_ids}}]}},
+        script={
+            "source": "ctx._source.reid_animal_id = params.id; ctx._source.reid_animal_name = params.name",
+            "params": {"id": animal_id, "name": name},
+        },
+        conflicts="proceed",
+        refresh=True,
+    )
+
+
+def run(property_id: Optional[str] = None, species: Optional[list[str]] = None, threshold: float = 0.9,
+        merge: float = 0.92, full: bool = False, dry_run: bool = False) -> dict:
+    es = _es()
+    species = species or list(DEER_SPECIES)
+    if not dry_run:
+        _ensure_clusters_index(es)
+
+    seeds = _load_seeds(es, property_id)
+    sets = _load_clusters(es, property_id, full)
+    old_names = _stored_seed_names(es) if es.indices.exists(index=CLUSTERS_INDEX) else {}
+    pending = _fetch_unlabeled(es, property_id, species, full)
+    now = datetime.now(timezone.utc).isoformat()
+    stats = {"photos": 0, "seeded_matches": 0, "new_clusters": 0, "merged": 0, "clusters": 0}
+
+    doc_ops, cluster_ops = [], []
+    for pid in sorted(set(seeds) | set(sets) | set(pending)):
+        cs = sets.setdefault(pid, ClusterSet(pid))
+        for animal_id, seed in seeds.get(pid, {}).items():
+            cs.add(animal_id, seed["name"], True, seed["sum"], seed["count"])
+            old = old_names.get((pid, animal_id), seed["name"])
+            if old != seed["name"] and not dry_run:
+                _rename(es, pid, [animal_id], animal_id, seed["name"])
+
+        items = sorted(pending.get(pid, []), key=lambda t: t[0])
+        if items:
+            before = len(cs.ids)
+            vecs = _unit(np.stack([v for _, _, v in items]))
+            rows, scores = cs.assign(vecs, threshold)
+            stats["photos"] += len(items)
+            stats["seeded_matches"] += int(cs.seeded[rows].sum())
+            stats["new_clusters"] += len(cs.ids) - before
+            for (_, doc_id, _), row, score in zip(items, rows, scores):
+                doc_ops.append({
+                    "_op_type": "update",
+                    "_index": IMAGES_INDEX,
+                    "_id": doc_id,
+                    "doc": {
+                        "reid_animal_id": cs.ids[row],
+                        "reid_animal_name": cs.names[row],
+                        "reid_score": round(float(score), 4),
+                        "reid_at": now,
+                    },
+                })
+
+        merged = cs.merge_into_seeds(merge)
+        stats["merged"] += len(merged)
+        by_seed: dict[int, list[str]] = defaultdict(list)
+        for src_row, seed_row in merged.items():
+            by_seed[seed_row].append(cs.ids[src_row])
+            cluster_ops.append({"_op_type": "delete", "_index": CLUSTERS_INDEX, "_id": f"{pid}:{cs.ids[src_row]}"})
+        # pending photos of a merged cluster can be pointed at the seed before writing
+        remap = {cs.ids[s]: (cs.ids[t], cs.names[t]) for s, t in merged.items()}
+        for op in doc_ops:
+            target = remap.get(op["doc"]["reid_animal_id"])
+            if target:
+                op["doc"]["reid_animal_id"], op["doc"]["reid_animal_name"] = target
+
+        for row, animal_id in enumerate(cs.ids):
+            if row in cs.removed:
+                continue
+            stats["clusters"] += 1
+            cluster_ops.append({
+                "_op_type": "index",
+                "_index": CLUSTERS_INDEX,
+                "_id": f"{pid}:{animal_id}",
+                "_source": {
+                    "property_id": pid or None,
+                    "animal_id": animal_id,
+                    "animal_name": cs.names[row],
+                    "seeded": bool(cs.seeded[row]),
+                    "count": int(cs.counts[row]),
+                    "centroid": encode_vector(cs.sums[row] / max(int(cs.counts[row]), 1)),
+                    "updated_at": now,
+                },
+            })
+        if not dry_run:
+            for seed_row, old_ids in by_seed.items():
+                _rename(es, pid, old_ids, cs.ids[seed_row], cs.names[seed_row])
+
+    if dry_run:
+        logger.info("Dry run: %d suggestions, %d clusters not written", len(doc_ops), stats["clusters"])
+        return stats
+
+    if full:
+        scope = [_scope(property_id)] if property_id is not None else []
+        es.delete_by_query(index=CLUSTERS_INDEX, conflicts="proceed", refresh=True,
+                           query={"bool": {"filter": [{"term": {"seeded": False}}] + scope}})
+    ok, errors = helpers.bulk(es, doc_ops + cluster_ops, chunk_size=500, raise_on_error=False)
+    stats["errors"] = len(errors)
+    logger.info("Wrote %d suggestions and %d cluster docs (%d errors)", len(doc_ops), stats["clusters"], len(errors))
+    return stats
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Cluster deer photos into suggested individual animals")
+    ap.add_argument("--property", help="only this property_id (default: all)")
+    ap.add_argument("--species", action="append", help=f"species to cluster (repeatable, default: {', '.join(DEER_SPECIES)})")
+    ap.add_argument("--threshold", type=float, default=0.9, help="min cosine to join a cluster")
+    ap.add_argument("--merge", type=float, default=0.92, help="min cosine to fold an unnamed cluster into a named one")
+    ap.add_argument("--full", action="store_true", help="re-cluster every unlabeled photo, not just new ones")
+    ap.add_argument("--dry-run", action="store_true")
+    args = ap.parse_args()
+    result = run(args.property, args.species, args.threshold, args.merge, args.full, args.dry_run)
+    print(json.dumps(result, indent=2))
+    sys.exit(0 if not result.get("errors") else 1)
@@ -0,0 +1,136 @@
+"""
+Migrate an images index to quantized HNSW vectors.
+
+Changing `embedding.index_options` only affects segments written afterwards,
+so existing vectors stay float32 HNSW until they are rewritten.  This job
+creates a copy of the index with the requested index_options (mapping copied
+from the source), runs a server-side _reindex, checks the doc counts and can
+then swap the copy in under the original name as an alias.
+
+Usage:
+    docker compose exec worker python -m worker_app.jobs.reindex_vectors --source tactacam-images
+    docker compose exec worker python -m worker_app.jobs.reindex_vectors --source images-v1 --type bbq_hnsw
+    docker compose exec worker python -m worker_app.jobs.reindex_vectors --source tactacam-images \\
+        --dest tactacam-images-int8_hnsw --swap --yes
+
+int8_hnsw keeps ~4x less vector memory than float32 with near-identical
+recall; bbq_hnsw (ES 8.18+) is ~32x smaller and relies on rescoring.  Check
+with worker_app.jobs.vector_recall before swapping.
+"""
+from __future__ import annotations
+
+import argparse
+import copy
+import logging
+import os
+import sys
+import time
+
+from elasticsearch import Elasticsearch
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+logger = logging.getLogger(__name__)
+
+INDEX_TYPES = ("int8_hnsw", "int4_hnsw", "bbq_hnsw", "hnsw")
+
+
+def _es() -> Elasticsearch:
+    return Elasticsearch(
+        hosts=[os.environ["ELASTIC_SEARCH_HOST"]],
+        api_key=os.environ["ELASTIC_SEARCH_API_KEY"],
+        request_timeout=120,
+    )
+
+
+def _quantized_mappings(es: Elasticsearch, source: str, index_type: str) -> dict:
+    resp = es.indices.get_mapping(index=source)
+    # `source` may be an alias; take the concrete index behind it
+    mappings = copy.deepcopy(next(iter(resp.values()))["mappings"])
+    field = mappings.get("properties", {}).get("embedding")
+    if not field or field.get("type") != "dense_vector":
+        raise SystemExit(f"{source} has no dense_vector `embedding` field")
+    field["index"] = True
+    field.setdefault("similarity", "cosine")
+    field["index_options"] = {"type": index_type}
+    if index_type != "bbq_hnsw":
+        field["index_options"].update({"m": 16, "ef_construction": 100})
+    return mappings
+
+
+def _wait(es: Elasticsearch, task_id: str, poll_s: float = 10.0) -> dict:
+    while True:
+        task = es.tasks.get(task_id=task_id)
+        status = task["task"]["status"]
+        logger.info(
+            "  reindex: %d/%d docs (created=%d updated=%d)",
+            status.get("created", 0) + status.get("updated", 0), status.get("total", 0),
+            status.get("created", 0), status.get("updated", 0),
+        )
+        if task.get("completed"):
+            return task
+        time.sleep(poll_s)
+
+
+def run(source: str, dest: str, index_type: str, swap: bool = False, slices: str = "auto") -> dict:
+    es = _es()
+    if es.indices.exists(index=dest):
+        raise SystemExit(f"{dest} already exists; pick another --dest or delete it first")
+
+    mappings = _quantized_mappings(es, source, index_type)
+    logger.info("Creating %s with embedding index_options=%s", dest, mappings["properties"]["embedding"]["index_options"])
+    es.indices.create(index=dest, mappings=mappings)
+
+    resp = es.reindex(
+        source={"index": source},
+        dest={"index": dest},
+        wait_for_completion=False,
+        slices=slices,
+        refresh=True,
+    )
+    task = _wait(es, resp["task"])
+    failures = (task.get("response") or {}).get("failures") or []
+    if task.get("error") or failures:
+        logger.error("Reindex failed: %s", task.get("error") or failures[:5])
+        return {"ok": False, "dest": dest}
+
+    src_count = es.count(index=source)["count"]
+    dst_count = es.count(index=dest)["count"]
+    logger.info("Doc counts: %s=%d %s=%d", source, src_count, dest, dst_count)
+    if src_count != dst_count:
+        logger.error("Doc counts differ; not swapping")
+        return {"ok": False, "dest": dest, "source_count": src_count, "dest_count": dst_count}
+
+    if swap:
+        if es.indices.exists_alias(name=source):
+            old = list(es.indices.get_alias(name=source).keys())
+            es.indices.update_aliases(actions=(
+                [{"remove": {"index": i, "alias": source}} for i in old]
+                + [{"add": {"index": dest, "alias": source}}]
+            ))
+            logger.info("Alias %s moved %s -> %s (old indices kept)", source, old, dest)
+        else:
+            # A concrete index can't share its name with an alias: drop it and
+            # alias the copy in one call so readers never see a gap.
+            es.indices.update_aliases(actions=[
+                {"remove_index": {"index": source}},
+                {"add": {"index": dest, "alias": source}},
+            ])
+            logger.info("Replaced index %s with alias -> %s", source, dest)
+
+    return {"ok": True, "dest": dest, "docs": dst_count, "swapped": swap}
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Reindex an images index with quantized HNSW vectors")
+    ap.add_argument("--source", default="tactacam-images", help="index (or alias) to migrate")
+    ap.add_argument("--dest", help="new index name (default: <source>-<type>)")
+    ap.add_argument("--type", default="int8_hnsw", choices=INDEX_TYPES, help="embedding index_options type")
+    ap.add_argument("--slices", default="auto", help="reindex slices")
+    ap.add_argument("--swap", action="store_true", help="serve the new index under the source name when done")
+    ap.add_argument("--yes", action="store_true", help="confirm --swap (deletes a concrete source index)")
+    args = ap.parse_args()
+    if args.swap and not args.yes:
+        ap.error("--swap replaces the source index; re-run with --yes to confirm")
+    result = run(args.source, args.dest or f"{args.source}-{args.type}", args.type,
+                 swap=args.swap, slices=args.slices)
+    sys.exit(0 if result["ok"] else 1)
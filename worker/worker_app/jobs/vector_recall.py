@@ -0,0 +1,128 @@
+"""
+Recall@k benchmark for quantized `embedding` indices.
+
+Samples stored image vectors as queries, computes the exact float32 top-k for
+each with a brute-force script_score (cosineSimilarity reads the raw float
+vectors, so this is the true baseline whatever the index_options), then runs
+the approximate kNN search on each index under test and reports recall@k and
+latency.  Also reports the wire size of the sampled vectors as JSON floats vs
+base64 (lib.services.vector_codec).
+
+Usage:
+    docker compose exec worker python -m worker_app.jobs.vector_recall \\
+        --baseline tactacam-images --index tactacam-images-int8_hnsw --index tactacam-images-bbq_hnsw
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import time
+
+import numpy as np
+from elasticsearch import Elasticsearch
+
+from lib.services.vector_codec import decode_vector, to_base64
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+logger = logging.getLogger(__name__)
+
+
+def _es() -> Elasticsearch:
+    return Elasticsearch(
+        hosts=[os.environ["ELASTIC_SEARCH_HOST"]],
+        api_key=os.environ["ELASTIC_SEARCH_API_KEY"],
+        request_timeout=120,
+    )
+
+
+def _sample_queries(es: Elasticsearch, index: str, n: int, seed: int) -> list[tuple[str, np.ndarray]]:
+    resp = es.search(
+        index=index,
+        size=n,
+        query={"function_score": {
+            "query": {"exists": {"field": "embedding"}},
+            "random_score": {"seed": seed, "field": "_seq_no"},
+        }},
+        source=["embedding"],
+    )
+    return [(h["_id"], decode_vector(h["_source"]["embedding"])) for h in resp["hits"]["hits"]]
+
+
+def _exact(es: Elasticsearch, index: str, doc_id: str, vec: np.ndarray, k: int) -> list[str]:
+    resp = es.search(
+        index=index,
+        size=k,
+        query={"script_score": {
+            "query": {"bool": {
+                "filter": [{"exists": {"field": "embedding"}}],
+                "must_not": [{"ids": {"values": [doc_id]}}],
+            }},
+            "script": {
+                "source": "cosineSimilarity(params.q, 'embedding') + 1.0",
+                "params": {"q": vec.tolist()},
+            },
+        }},
+        source=False,
+    )
+    return [h["_id"] for h in resp["hits"]["hits"]]
+
+
+def _approx(es: Elasticsearch, index: str, doc_id: str, vec: np.ndarray, k: int, num_candidates: int):
+    t0 = time.perf_counter()
+    resp = es.search(
+        index=index,
+        knn={
+            "field": "embedding",
+            "query_vector": vec.tolist(),
+            "k": k,
+            "num_candidates": max(num_candidates, k),
+            "filter": {"bool": {"must_not": [{"ids": {"values": [doc_id]}}]}},
+        },
+        size=k,
+        source=False,
+    )
+    return [h["_id"] for h in resp["hits"]["hits"]], (time.perf_counter() - t0) * 1000
+
+
+def run(baseline: str, indices: list[str], queries: int, k: int, num_candidates: int, seed: int) -> dict:
+    es = _es()
+    sample = _sample_queries(es, baseline, queries, seed)
+    if not sample:
+        raise SystemExit(f"No documents with embeddings in {baseline}")
+    logger.info("Computing exact float32 top-%d for %d queries on %s", k, len(sample), baseline)
+    truth = {doc_id: set(_exact(es, baseline, doc_id, vec, k)) for doc_id, vec in sample}
+
+    report: dict = {"k": k, "queries": len(sample), "num_candidates": num_candidates, "indices": {}}
+    for index in [baseline, *indices]:
+        recalls, latencies = [], []
+        for doc_id, vec in sample:
+            ids, ms = _approx(es, index, doc_id, vec, k, num_candidates)
+            expected = truth[doc_id]
+            if expected:
+                recalls.append(len(expected.intersection(ids)) / len(expected))
+            latencies.append(ms)
+        report["indices"][index] = {
+            f"recall@{k}": round(float(np.mean(recalls)), 4) if recalls else None,
+            "p50_ms": round(float(np.percentile(latencies, 50)), 1),
+            "p95_ms": round(float(np.percentile(latencies, 95)), 1),
+        }
+        logger.info("%s: %s", index, report["indices"][index])
+
+    json_bytes = np.mean([len(json.dumps(v.tolist())) for _, v in sample])
+    b64_bytes = np.mean([len(to_base64(v)) + 2 for _, v in sample])
+    report["wire_bytes_per_vector"] = {"json_floats": int(json_bytes), "base64": int(b64_bytes)}
+    return report
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Recall@k of quantized kNN vs exact float32")
+    ap.add_argument("--baseline", default="tactacam-images", help="index used for queries and exact top-k")
+    ap.add_argument("--index", action="append", default=[], help="index under test (repeatable)")
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("-k", type=int, default=10)
+    ap.add_argument("--num-candidates", type=int, default=100)
+    ap.add_argument("--seed", type=int, default=42)
+    args = ap.parse_args()
+    print(json.dumps(run(args.baseline, args.index, args.queries, args.k, args.num_candidates, args.seed), indent=2))